@@ -0,0 +1,191 @@
+"""密码哈希模块
+
+bcrypt 每次哈希/校验需要约 100ms CPU，直接在异步路由中调用会阻塞事件循环，
+登录高峰时整个后台管理进程的其他请求都会停顿。这里把哈希和校验放到专用的有界线程池中执行：
+bcrypt 的 C 实现在计算期间释放 GIL，线程池即可利用多核，无需进程间传递数据。
+
+等待执行的任务数超过上限时直接拒绝（PasswordHashBusy），避免请求无限堆积；
+线程池的排队数、执行数和耗时通过 Prometheus 指标暴露。
+bcrypt 成本参数调整后，用户登录时可透明地用新参数重新生成哈希。
+"""
+
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
+from utils import metrics
+from utils.logger import setup_logger
+
+# 设置日志记录器
+logger = setup_logger("password_hashing", "auth")
+
+# 密码哈希配置
+PASSWORD_HASH_CONFIG = {
+    # 哈希线程数
+    "workers": int(os.getenv("ADMIN_PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    # 允许排队等待的最大任务数，超出后拒绝请求
+    "max_pending": int(os.getenv("ADMIN_PASSWORD_HASH_MAX_PENDING", "64")),
+    # bcrypt 成本参数
+    "bcrypt_rounds": int(os.getenv("ADMIN_PASSWORD_BCRYPT_ROUNDS", "12")),
+    # 登录时发现哈希使用旧的成本参数则重新生成
+    "rehash_on_login": os.getenv("ADMIN_PASSWORD_REHASH_ON_LOGIN", "true").lower() == "true",
+}
+
+# 密码加密工具，成本参数与配置不一致的哈希视为需要更新
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=PASSWORD_HASH_CONFIG["bcrypt_rounds"],
+    bcrypt__min_rounds=PASSWORD_HASH_CONFIG["bcrypt_rounds"],
+    bcrypt__max_rounds=PASSWORD_HASH_CONFIG["bcrypt_rounds"],
+)
+
+PASSWORD_HASH_QUEUED = Gauge(
+    "password_hash_queued",
+    "等待执行的密码哈希任务数",
+    ["service"],
+)
+PASSWORD_HASH_RUNNING = Gauge(
+    "password_hash_running",
+    "正在执行的密码哈希任务数",
+    ["service"],
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds",
+    "密码哈希任务排队耗时",
+    ["service", "operation"],
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "密码哈希任务执行耗时",
+    ["service", "operation"],
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "因排队已满被拒绝的密码哈希任务数",
+    ["service", "operation"],
+)
+
+
+class PasswordHashBusy(Exception):
+    """密码哈希线程池排队已满"""
+
+
+class PasswordHasher:
+    """在有界线程池中执行密码哈希和校验"""
+
+    def __init__(self, context: CryptContext, workers: int, max_pending: int, rehash_on_login: bool):
+        self.context = context
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.rehash_on_login = rehash_on_login
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """首次使用时创建线程池"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self.executor
+
+    def update_gauges(self) -> None:
+        PASSWORD_HASH_QUEUED.labels(metrics.service_name).set(self.queued)
+        PASSWORD_HASH_RUNNING.labels(metrics.service_name).set(self.running)
+
+    async def run(self, operation: str, func: Callable, *args, admit: bool = True):
+        """在线程池中执行哈希任务
+
+        Args:
+            operation: 操作名称，用于指标标签
+            func: 要执行的函数
+            admit: 是否检查排队上限，批量任务自行限制并发时传 False
+
+        Raises:
+            PasswordHashBusy: 排队已满
+        """
+        with self.lock:
+            if admit and self.queued + self.running >= self.max_pending:
+                PASSWORD_HASH_REJECTED.labels(metrics.service_name, operation).inc()
+                raise PasswordHashBusy("密码校验繁忙，请稍后重试")
+            self.queued += 1
+        self.update_gauges()
+        submitted_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            self.update_gauges()
+            PASSWORD_HASH_WAIT.labels(metrics.service_name, operation).observe(started_at - submitted_at)
+            try:
+                return func(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                self.update_gauges()
+                PASSWORD_HASH_DURATION.labels(metrics.service_name, operation).observe(time.perf_counter() - started_at)
+
+        return await asyncio.get_running_loop().run_in_executor(self.get_executor(), task)
+
+    async def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return await self.run("hash", self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """校验密码
+
+        Returns:
+            Tuple[bool, Optional[str]]: 是否匹配，以及需要替换的新哈希（成本参数已变化且开启登录时重新哈希）
+        """
+        if not self.rehash_on_login:
+            return await self.run("verify", self.context.verify, plain_password, hashed_password), None
+        return await self.run("verify", self.context.verify_and_update, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[Optional[str]]) -> List[Optional[str]]:
+        """批量生成密码哈希，None 原样返回
+
+        同时提交的任务不超过线程数，批量请求不会占满排队上限而导致登录被拒绝。
+        """
+        hashed: List[Optional[str]] = [None] * len(passwords)
+        pending = [(index, password) for index, password in enumerate(passwords) if password is not None]
+        for start in range(0, len(pending), self.workers):
+            chunk = pending[start:start + self.workers]
+            results = await asyncio.gather(*(
+                self.run("hash", self.context.hash, password, admit=False) for _, password in chunk
+            ))
+            for (index, _), value in zip(chunk, results):
+                hashed[index] = value
+        return hashed
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def get_stats(self) -> dict:
+        """获取线程池状态"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queued": self.queued,
+            "running": self.running,
+        }
+
+
+# 全局密码哈希器
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=PASSWORD_HASH_CONFIG["workers"],
+    max_pending=PASSWORD_HASH_CONFIG["max_pending"],
+    rehash_on_login=PASSWORD_HASH_CONFIG["rehash_on_login"],
+)
@@ -1,35 +1,40 @@
+import os
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db, AsyncSessionLocal
 from ..users.models import User
 from . import schemas
+from .hashing import pwd_context, password_hasher, PasswordHashBusy
 from utils.logger import setup_logger
+from utils.revocation import revocation_list
 
 # 设置日志记录器
 logger = setup_logger("auth_security", "auth")
 
-# 密码加密工具
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT配置
 SECRET_KEY = "your-secret-key"  # 应该从环境变量获取
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# 访问令牌有效期默认与原登录接口一致（7天），前端使用刷新令牌后可缩短
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(7 * 24 * 60)))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
 # OAuth2配置
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
+    """验证密码（同步，供脚本和同步会话使用；异步路由使用 password_hasher）"""
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """获取密码哈希值"""
+    """获取密码哈希值（同步，供脚本和同步会话使用；异步路由使用 password_hasher）"""
     return pwd_context.hash(password)
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -57,17 +62,85 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         logger.error(f"用户验证失败: {str(e)}")
         return None
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """创建访问令牌"""
+async def authenticate_user_async(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    """使用异步会话验证用户，密码校验在哈希线程池中执行
+
+    Raises:
+        PasswordHashBusy: 哈希线程池排队已满
+    """
+    try:
+        user = await db.scalar(select(User).where(User.username == username))
+        if not user:
+            logger.warning(f"用户不存在: {username}")
+            return None
+        
+        valid, new_hash = await password_hasher.verify(password, user.hashed_password)
+        if not valid:
+            logger.warning(f"密码错误: {username}")
+            return None
+        
+        if not user.is_active:
+            logger.warning(f"用户未激活: {username}")
+            return None
+        
+        if new_hash:
+            # 成本参数已变化，用新参数重新保存哈希；使用独立会话，失败不影响登录
+            try:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+                    await session.commit()
+                logger.info(f"用户密码哈希已更新: {username}")
+            except Exception as e:
+                logger.warning(f"更新用户密码哈希失败: {username} - {str(e)}")
+        
+        return user
+        
+    except PasswordHashBusy:
+        raise
+    except Exception as e:
+        logger.error(f"用户验证失败: {str(e)}")
+        return None
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, token_type: str = "access") -> str:
+    """创建访问令牌
+
+    令牌带有唯一的 jti（用于单个令牌吊销）和精确到小数的签发时间 iat（用于按用户吊销）。
+    """
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex, "type": token_type})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token(data: dict) -> str:
+    """创建刷新令牌"""
+    return create_access_token(data, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), token_type="refresh")
+
+def create_token_pair(user_id: int) -> dict:
+    """为用户签发访问令牌和刷新令牌"""
+    return {
+        "access_token": create_access_token(
+            data={"sub": str(user_id)}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        ),
+        "refresh_token": create_refresh_token(data={"sub": str(user_id)}),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """解析刷新令牌，令牌无效、类型不符或已吊销时返回 None"""
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        logger.warning(f"刷新令牌验证失败: {str(e)}")
+        return None
+    if claims.get("type") != "refresh" or revocation_list.is_revoked(claims):
+        return None
+    return claims
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -0,0 +1,301 @@
+"""用户授权快照模块
+
+把用户的菜单编码、前端路由列表和权限编码预先计算为一份授权快照并缓存，
+避免每次获取当前用户信息时逐个角色查询菜单、逐个菜单查询父级。
+
+快照带有全局版本号和用户版本号：角色菜单、角色、权限或菜单变更时递增全局版本
+使所有快照失效，用户角色变更时只递增该用户的版本。构建快照前先读取版本号并随快照
+一起保存，构建期间发生的失效不会被随后写入的旧快照覆盖。默认缓存在进程内存中，
+多实例部署时可开启 Redis 后端（redis.asyncio），使各实例共享快照和版本号。
+"""
+
+import os
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.logger import setup_logger
+from utils.metrics import instrument_redis
+from .menus.tree import menu_tree
+
+# 设置日志记录器
+logger = setup_logger("admin_authz", "admin")
+
+# 授权快照缓存配置
+AUTHZ_CONFIG = {
+    "ttl": int(os.getenv("ADMIN_AUTHZ_CACHE_TTL", "300")),
+    "max_entries": int(os.getenv("ADMIN_AUTHZ_CACHE_SIZE", "10000")),
+    "redis": os.getenv("ADMIN_AUTHZ_CACHE_REDIS", "false").lower() == "true",
+}
+
+# Redis 中的全局版本号键
+VERSION_KEY = "admin:authz:version"
+
+# 超级管理员角色编码
+SUPER_ADMIN_ROLE = "fcadmin"
+
+# 数据库没有菜单时使用的默认菜单编码
+DEFAULT_MENU_CODES = ["dashboard", "system", "system:user", "system:role", "system:permission", "system:menu", "system:service"]
+
+# 数据库没有菜单时使用的默认路由
+DEFAULT_MENU_ROUTES = [
+    {
+        "path": "/dashboard",
+        "name": "Dashboard",
+        "component": "Dashboard",
+        "meta": {
+            "title": "首页",
+            "icon": "HomeFilled",
+            "menuCode": "dashboard"
+        }
+    },
+    {
+        "path": "/system/users",
+        "name": "SystemUsers",
+        "component": "system/Users",
+        "meta": {
+            "title": "用户管理",
+            "icon": "User",
+            "menuCode": "system:user",
+            "parent": "system"
+        }
+    },
+    {
+        "path": "/system/roles",
+        "name": "SystemRoles",
+        "component": "system/Roles",
+        "meta": {
+            "title": "角色管理",
+            "icon": "UserFilled",
+            "menuCode": "system:role",
+            "parent": "system"
+        }
+    },
+    {
+        "path": "/system/permissions",
+        "name": "SystemPermissions",
+        "component": "system/Permissions",
+        "meta": {
+            "title": "权限管理",
+            "icon": "Lock",
+            "menuCode": "system:permission",
+            "parent": "system"
+        }
+    },
+    {
+        "path": "/system/menus",
+        "name": "SystemMenus",
+        "component": "system/Menus",
+        "meta": {
+            "title": "菜单管理",
+            "icon": "Menu",
+            "menuCode": "system:menu",
+            "parent": "system"
+        }
+    },
+    {
+        "path": "/system/services",
+        "name": "SystemServices",
+        "component": "system/Services",
+        "meta": {
+            "title": "服务管理",
+            "icon": "Monitor",
+            "menuCode": "system:service",
+            "parent": "system"
+        }
+    }
+]
+
+# 一次查询取出用户全部角色的菜单编码和权限编码
+USER_GRANTS_SQL = text("""
+    SELECT r.code, 'menu', rm.menu_code
+    FROM user_roles ur
+    JOIN roles r ON r.id = ur.role_id
+    LEFT JOIN role_menus rm ON rm.role_id = r.id
+    WHERE ur.user_id = :user_id
+    UNION ALL
+    SELECT r.code, 'permission', p.code
+    FROM user_roles ur
+    JOIN roles r ON r.id = ur.role_id
+    JOIN permissions p ON p.role_id = r.id
+    WHERE ur.user_id = :user_id
+""")
+
+
+def build_snapshot(db: Session, user_id: int) -> Dict[str, Any]:
+    """构建用户授权快照
+
+    Returns:
+        Dict[str, Any]: 包含 role_codes、menu_codes、permission_codes 和 routes
+    """
+    role_codes = set()
+    menu_codes = set()
+    permission_codes = set()
+    for role_code, kind, code in db.execute(USER_GRANTS_SQL, {"user_id": user_id}):
+        role_codes.add(role_code)
+        if code is None:
+            continue
+        if kind == "menu":
+            menu_codes.add(code)
+        else:
+            permission_codes.add(code)
+
+    menu_tree.ensure_loaded(db)
+    all_menu_codes = menu_tree.get_codes()
+    routes = menu_tree.get_routes()
+    if SUPER_ADMIN_ROLE in role_codes:
+        # 超级管理员拥有所有菜单权限，数据库没有菜单时使用默认菜单编码
+        menu_codes = set(all_menu_codes or DEFAULT_MENU_CODES)
+    if not routes:
+        routes = DEFAULT_MENU_ROUTES
+
+    return {
+        "role_codes": sorted(role_codes),
+        "menu_codes": sorted(menu_codes),
+        "permission_codes": sorted(permission_codes),
+        "routes": [route for route in routes if route["meta"]["menuCode"] in menu_codes],
+    }
+
+
+class AuthzCache:
+    """带版本号的用户授权快照缓存"""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = 0
+        # 用户ID -> 用户版本号，只记录角色变更过的用户
+        self.user_versions: Dict[int, int] = {}
+        # 用户ID -> ((全局版本号, 用户版本号), 过期时间, 快照)
+        self.entries: "OrderedDict[int, Tuple[Tuple[int, int], float, Dict[str, Any]]]" = OrderedDict()
+        self.redis = None
+        self.stats = {"hits": 0, "misses": 0}
+
+    async def start(self, use_redis: bool) -> None:
+        """初始化 Redis 后端，Redis 不可用时使用进程内缓存"""
+        if not use_redis:
+            return
+        try:
+            import redis.asyncio as aioredis
+            from utils.config import get_redis_settings
+
+            settings = get_redis_settings()
+            self.redis = aioredis.Redis(
+                host=settings.host,
+                port=settings.port,
+                password=settings.password or None,
+                db=settings.db,
+            )
+            instrument_redis(self.redis)
+            await self.redis.ping()
+            logger.info("授权快照缓存已使用 Redis 后端")
+        except Exception as e:
+            logger.warning(f"Redis 授权快照缓存初始化失败，使用进程内缓存: {str(e)}")
+            self.redis = None
+
+    async def close(self) -> None:
+        """关闭 Redis 连接"""
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    def _user_key(self, user_id: int) -> str:
+        return f"admin:authz:user:{user_id}"
+
+    def _user_version_key(self, user_id: int) -> str:
+        # 不设过期时间，避免版本号回退后旧快照重新生效
+        return f"admin:authz:user_version:{user_id}"
+
+    async def _lookup(self, user_id: int) -> Tuple[Optional[Dict[str, Any]], Tuple[int, int]]:
+        """查找缓存的快照，返回快照（未命中时为 None）和当前的 (全局版本号, 用户版本号)"""
+        if self.redis is not None:
+            try:
+                version, user_version, cached = await self.redis.mget(
+                    VERSION_KEY, self._user_version_key(user_id), self._user_key(user_id)
+                )
+                versions = (int(version or 0), int(user_version or 0))
+                if cached is not None:
+                    cached = json.loads(cached)
+                    if tuple(cached["versions"]) == versions:
+                        return cached["snapshot"], versions
+                return None, versions
+            except Exception as e:
+                logger.warning(f"读取 Redis 授权快照失败: {str(e)}")
+
+        versions = (self.version, self.user_versions.get(user_id, 0))
+        cached = self.entries.get(user_id)
+        if cached is not None:
+            cached_versions, expires_at, snapshot = cached
+            if cached_versions == versions and expires_at > time.monotonic():
+                self.entries.move_to_end(user_id)
+                return snapshot, versions
+            del self.entries[user_id]
+        return None, versions
+
+    async def _store(self, user_id: int, versions: Tuple[int, int], snapshot: Dict[str, Any]) -> None:
+        """保存快照，versions 为构建前读取的版本号，构建期间发生失效时快照在下次读取时被丢弃"""
+        if self.redis is not None:
+            try:
+                await self.redis.set(
+                    self._user_key(user_id),
+                    json.dumps({"versions": list(versions), "snapshot": snapshot}, ensure_ascii=False),
+                    ex=self.ttl
+                )
+                return
+            except Exception as e:
+                logger.warning(f"写入 Redis 授权快照失败: {str(e)}")
+
+        self.entries[user_id] = (versions, time.monotonic() + self.ttl, snapshot)
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_snapshot(self, db: AsyncSession, user_id: int) -> Dict[str, Any]:
+        """获取用户授权快照，未命中或版本过期时重新构建
+
+        Redis 读写直接在事件循环中异步执行，只有构建快照的 SQL 查询通过 run_sync 执行。
+        """
+        snapshot, versions = await self._lookup(user_id)
+        if snapshot is not None:
+            self.stats["hits"] += 1
+            return snapshot
+        self.stats["misses"] += 1
+        snapshot = await db.run_sync(build_snapshot, user_id)
+        await self._store(user_id, versions, snapshot)
+        return snapshot
+
+    async def invalidate_user(self, user_id: int) -> None:
+        """用户角色变更后递增该用户的版本号"""
+        self.user_versions[user_id] = self.user_versions.get(user_id, 0) + 1
+        self.entries.pop(user_id, None)
+        if self.redis is not None:
+            try:
+                await self.redis.incr(self._user_version_key(user_id))
+            except Exception as e:
+                logger.warning(f"更新 Redis 用户授权版本失败: {str(e)}")
+
+    async def invalidate_all(self) -> None:
+        """角色菜单、角色、权限或菜单变更后递增全局版本号，使所有快照失效"""
+        self.version += 1
+        self.entries.clear()
+        if self.redis is not None:
+            try:
+                await self.redis.incr(VERSION_KEY)
+            except Exception as e:
+                logger.warning(f"更新 Redis 授权快照版本失败: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            **self.stats,
+            "backend": "redis" if self.redis is not None else "memory",
+            "version": self.version,
+            "entries": len(self.entries),
+        }
+
+
+# 全局授权快照缓存
+authz_cache = AuthzCache(ttl=AUTHZ_CONFIG["ttl"], max_entries=AUTHZ_CONFIG["max_entries"])
@@ -0,0 +1,357 @@
+"""批量 RBAC 操作模块
+
+批量创建/更新用户、分配用户角色和设置角色菜单。每批请求项共用一次 IN 查询
+获取用户和角色，关联表通过 executemany 批量写入，每批在一个事务中提交，
+并为每个请求项返回独立的处理结果。
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import text, or_, bindparam, tuple_
+from sqlalchemy.orm import Session
+from utils.logger import setup_logger
+from . import models, schemas
+from .users.models import User
+
+# 设置日志记录器
+logger = setup_logger("admin_bulk", "admin")
+
+# 批量操作配置
+BULK_CONFIG = {
+    # 每个事务处理的请求项数量
+    "batch_size": int(os.getenv("ADMIN_BULK_BATCH_SIZE", "500")),
+    # 单次请求允许的最大请求项数量
+    "max_items": int(os.getenv("ADMIN_BULK_MAX_ITEMS", "10000")),
+}
+
+INSERT_ROLE_MENU_SQL = text("INSERT INTO role_menus (role_id, menu_code) VALUES (:role_id, :menu_code)")
+DELETE_ROLE_MENUS_SQL = text("DELETE FROM role_menus WHERE role_id IN :role_ids").bindparams(
+    bindparam("role_ids", expanding=True)
+)
+
+
+class BulkResult:
+    """批量操作结果"""
+
+    def __init__(self, total: int):
+        self.items: List[Optional[Dict[str, Any]]] = [None] * total
+
+    def ok(self, index: int, **data) -> None:
+        self.items[index] = {"index": index, "success": True, **data}
+
+    def fail(self, index: int, error: str, **data) -> None:
+        self.items[index] = {"index": index, "success": False, "error": error, **data}
+
+    def to_dict(self) -> Dict[str, Any]:
+        succeeded = sum(1 for item in self.items if item and item["success"])
+        return {
+            "total": len(self.items),
+            "succeeded": succeeded,
+            "failed": len(self.items) - succeeded,
+            "results": self.items,
+        }
+
+
+def run_batches(
+    db: Session,
+    items: Sequence[Any],
+    result: BulkResult,
+    process: Callable[[Session, List[Tuple[int, Any]], BulkResult], List[int]],
+    on_commit: Optional[Callable[[List[int]], None]] = None
+) -> BulkResult:
+    """按批次处理请求项，每批一个事务
+
+    Args:
+        db: 数据库会话
+        items: 请求项
+        result: 结果收集器
+        process: 处理一批 (序号, 请求项)，返回本批发生变化的对象ID
+        on_commit: 事务提交后的回调，参数为本批发生变化的对象ID
+    """
+    batch_size = max(1, BULK_CONFIG["batch_size"])
+    for start in range(0, len(items), batch_size):
+        batch = list(enumerate(items[start:start + batch_size], start))
+        try:
+            succeeded = process(db, batch, result)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"批量操作第 {start // batch_size + 1} 批失败: {str(e)}")
+            for index, _ in batch:
+                if result.items[index] is None or result.items[index]["success"]:
+                    result.fail(index, f"批次事务失败: {str(e)}")
+            continue
+        if on_commit is not None and succeeded:
+            on_commit(succeeded)
+    return result
+
+
+def load_roles(db: Session, role_ids: Set[int]) -> Dict[int, models.Role]:
+    """一次 IN 查询获取角色"""
+    if not role_ids:
+        return {}
+    roles = db.query(models.Role).filter(models.Role.id.in_(role_ids)).all()
+    return {role.id: role for role in roles}
+
+
+def load_users(db: Session, user_ids: Set[int]) -> Dict[int, User]:
+    """一次 IN 查询获取用户"""
+    if not user_ids:
+        return {}
+    users = db.query(User).filter(User.id.in_(user_ids)).all()
+    return {user.id: user for user in users}
+
+
+def load_taken_identities(db: Session, usernames: Set[str], emails: Set[str]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """一次查询获取已被占用的用户名和邮箱
+
+    Returns:
+        Tuple[Dict[str, int], Dict[str, int]]: 用户名 -> 用户ID、邮箱 -> 用户ID
+    """
+    conditions = []
+    if usernames:
+        conditions.append(User.username.in_(usernames))
+    if emails:
+        conditions.append(User.email.in_(emails))
+    if not conditions:
+        return {}, {}
+    rows = db.query(User.id, User.username, User.email).filter(or_(*conditions)).all()
+    return (
+        {username: user_id for user_id, username, _ in rows},
+        {email: user_id for user_id, _, email in rows},
+    )
+
+
+def insert_user_roles(db: Session, pairs: List[Tuple[int, int]]) -> None:
+    """通过 executemany 写入用户角色关联"""
+    if pairs:
+        db.execute(
+            models.user_roles.insert(),
+            [{"user_id": user_id, "role_id": role_id} for user_id, role_id in pairs]
+        )
+
+
+def delete_user_roles(db: Session, user_ids: Set[int]) -> None:
+    """删除用户的全部角色关联"""
+    if user_ids:
+        db.execute(models.user_roles.delete().where(models.user_roles.c.user_id.in_(user_ids)))
+
+
+def check_role_ids(role_ids: Optional[List[int]], roles: Dict[int, models.Role]) -> Optional[str]:
+    """检查角色是否都存在，返回错误信息"""
+    missing = sorted(set(role_ids or []) - set(roles))
+    return f"角色不存在: {missing}" if missing else None
+
+
+def bulk_create_users(db: Session, users: List[schemas.UserCreate], hashed_passwords: List[str]) -> BulkResult:
+    """批量创建用户
+
+    Args:
+        hashed_passwords: 与 users 一一对应的密码哈希，由调用方在哈希线程池中预先计算
+    """
+    result = BulkResult(len(users))
+
+    def process(db: Session, batch, result: BulkResult) -> List[int]:
+        taken_usernames, taken_emails = load_taken_identities(
+            db, {user.username for _, user in batch}, {user.email for _, user in batch}
+        )
+        roles = load_roles(db, {role_id for _, user in batch for role_id in user.role_ids or []})
+
+        created: List[Tuple[int, User, List[int]]] = []
+        seen_usernames, seen_emails = set(), set()
+        for index, user in batch:
+            if user.username in taken_usernames or user.username in seen_usernames:
+                result.fail(index, "用户名已存在", username=user.username)
+                continue
+            if user.email in taken_emails or user.email in seen_emails:
+                result.fail(index, "邮箱已存在", username=user.username)
+                continue
+            error = check_role_ids(user.role_ids, roles)
+            if error:
+                result.fail(index, error, username=user.username)
+                continue
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+            created.append((index, User(
+                username=user.username,
+                email=user.email,
+                full_name=user.full_name,
+                hashed_password=hashed_passwords[index],
+                is_active=user.is_active,
+                is_superuser=user.is_superuser
+            ), sorted(set(user.role_ids or []))))
+
+        db.add_all([new_user for _, new_user, _ in created])
+        db.flush()  # 获取用户ID
+        insert_user_roles(db, [(new_user.id, role_id) for _, new_user, role_ids in created for role_id in role_ids])
+        for index, new_user, _ in created:
+            result.ok(index, id=new_user.id, username=new_user.username)
+        return [new_user.id for _, new_user, _ in created]
+
+    return run_batches(db, users, result, process)
+
+
+def bulk_update_users(
+    db: Session,
+    users: List[schemas.UserBulkUpdateItem],
+    hashed_passwords: List[Optional[str]],
+    on_commit: Callable[[List[int]], None]
+) -> BulkResult:
+    """批量更新用户
+
+    Args:
+        hashed_passwords: 与 users 一一对应的新密码哈希，未修改密码的项为 None
+        on_commit: 事务提交后的回调，参数为角色发生变化的用户ID
+    """
+    result = BulkResult(len(users))
+
+    def process(db: Session, batch, result: BulkResult) -> List[int]:
+        updates = [(index, user.id, user.dict(exclude_unset=True)) for index, user in batch]
+        db_users = load_users(db, {user_id for _, user_id, _ in updates})
+        taken_usernames, taken_emails = load_taken_identities(
+            db,
+            {data["username"] for _, _, data in updates if data.get("username")},
+            {data["email"] for _, _, data in updates if data.get("email")},
+        )
+        roles = load_roles(db, {role_id for _, _, data in updates for role_id in data.get("role_ids") or []})
+
+        role_changes: Dict[int, List[int]] = {}
+        seen_ids = set()
+        for index, user_id, data in updates:
+            data.pop("id", None)
+            db_user = db_users.get(user_id)
+            if db_user is None:
+                result.fail(index, "用户不存在", id=user_id)
+                continue
+            if user_id in seen_ids:
+                result.fail(index, "同一批次中重复的用户", id=user_id)
+                continue
+            if taken_usernames.get(data.get("username"), user_id) != user_id:
+                result.fail(index, "用户名已存在", id=user_id)
+                continue
+            if taken_emails.get(data.get("email"), user_id) != user_id:
+                result.fail(index, "邮箱已存在", id=user_id)
+                continue
+            if "role_ids" in data:
+                error = check_role_ids(data["role_ids"], roles)
+                if error:
+                    result.fail(index, error, id=user_id)
+                    continue
+                role_changes[user_id] = sorted(set(data.pop("role_ids") or []))
+            if data.pop("password", None) is not None:
+                data["hashed_password"] = hashed_passwords[index]
+            for key, value in data.items():
+                setattr(db_user, key, value)
+            seen_ids.add(user_id)
+            result.ok(index, id=user_id)
+
+        db.flush()
+        delete_user_roles(db, set(role_changes))
+        insert_user_roles(db, [(user_id, role_id) for user_id, role_ids in role_changes.items() for role_id in role_ids])
+        return list(role_changes)
+
+    return run_batches(db, users, result, process, on_commit)
+
+
+def bulk_assign_roles(
+    db: Session,
+    assignments: List[schemas.UserRoleAssignment],
+    mode: str,
+    on_commit: Callable[[List[int]], None]
+) -> BulkResult:
+    """批量分配用户角色
+
+    Args:
+        mode: replace 替换用户的全部角色，add 追加，remove 移除
+        on_commit: 事务提交后的回调，参数为角色发生变化的用户ID
+    """
+    result = BulkResult(len(assignments))
+
+    def process(db: Session, batch, result: BulkResult) -> List[int]:
+        user_ids = load_users(db, {item.user_id for _, item in batch})
+        roles = load_roles(db, {role_id for _, item in batch for role_id in item.role_ids})
+
+        valid: Dict[int, Set[int]] = {}
+        for index, item in batch:
+            if item.user_id not in user_ids:
+                result.fail(index, "用户不存在", user_id=item.user_id)
+                continue
+            error = check_role_ids(item.role_ids, roles)
+            if error:
+                result.fail(index, error, user_id=item.user_id)
+                continue
+            valid.setdefault(item.user_id, set()).update(item.role_ids)
+            result.ok(index, user_id=item.user_id)
+
+        if mode == "replace":
+            delete_user_roles(db, set(valid))
+            insert_user_roles(db, [(user_id, role_id) for user_id, role_ids in valid.items() for role_id in sorted(role_ids)])
+            return list(valid)
+
+        # 追加或移除前一次查询出已有的关联
+        existing = set()
+        if valid:
+            rows = db.execute(
+                models.user_roles.select().where(models.user_roles.c.user_id.in_(set(valid)))
+            )
+            existing = {(row.user_id, row.role_id) for row in rows}
+        requested = {(user_id, role_id) for user_id, role_ids in valid.items() for role_id in role_ids}
+        if mode == "add":
+            insert_user_roles(db, sorted(requested - existing))
+        else:
+            to_remove = requested & existing
+            if to_remove:
+                db.execute(
+                    models.user_roles.delete().where(
+                        tuple_(models.user_roles.c.user_id, models.user_roles.c.role_id).in_(sorted(to_remove))
+                    )
+                )
+        return list(valid)
+
+    return run_batches(db, assignments, result, process, on_commit)
+
+
+def bulk_set_role_menus(
+    db: Session,
+    bindings: List[schemas.RoleMenuBinding],
+    super_admin_role: str,
+    on_commit: Callable[[List[int]], None]
+) -> BulkResult:
+    """批量设置角色菜单，替换每个角色的全部菜单编码
+
+    Args:
+        super_admin_role: 超级管理员角色编码，其菜单权限不可修改
+        on_commit: 事务提交后的回调，参数为菜单发生变化的角色ID
+    """
+    result = BulkResult(len(bindings))
+
+    def process(db: Session, batch, result: BulkResult) -> List[int]:
+        roles = load_roles(db, {binding.role_id for _, binding in batch})
+
+        valid: Dict[int, Set[str]] = {}
+        for index, binding in batch:
+            role = roles.get(binding.role_id)
+            if role is None:
+                result.fail(index, "角色不存在", role_id=binding.role_id)
+                continue
+            if role.code == super_admin_role:
+                result.fail(index, "超级管理员权限不可修改", role_id=binding.role_id)
+                continue
+            if binding.role_id in valid:
+                result.fail(index, "同一批次中重复的角色", role_id=binding.role_id)
+                continue
+            valid[binding.role_id] = set(binding.menu_codes)
+            result.ok(index, role_id=binding.role_id, menu_count=len(valid[binding.role_id]))
+
+        if valid:
+            db.execute(DELETE_ROLE_MENUS_SQL, {"role_ids": list(valid)})
+            params = [
+                {"role_id": role_id, "menu_code": menu_code}
+                for role_id, menu_codes in valid.items()
+                for menu_code in sorted(menu_codes)
+            ]
+            if params:
+                db.execute(INSERT_ROLE_MENU_SQL, params)
+        return list(valid)
+
+    return run_batches(db, bindings, result, process, on_commit)
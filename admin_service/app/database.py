@@ -4,8 +4,10 @@ import os
 from sqlalchemy import create_engine, inspect, text, Table, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from utils.logger import setup_logger
 from utils.config import SQLALCHEMY_DATABASE_URL, DB_CONFIG
+from utils.metrics import instrument_sqlalchemy
 
 # 设置日志记录器
 logger = setup_logger("admin_database", "admin_database")
@@ -20,9 +22,32 @@ engine = create_engine(
     echo=False
 )
 
+# 记录SQL执行耗时
+instrument_sqlalchemy(engine)
+
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步数据库引擎，供路由处理函数使用，同步引擎保留给 scripts/ 和启动时的表检查
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_CONFIG["pool_size"],
+    max_overflow=DB_CONFIG["max_overflow"],
+    pool_timeout=DB_CONFIG["pool_timeout"],
+    pool_recycle=DB_CONFIG["pool_recycle"],
+    echo=False
+)
+instrument_sqlalchemy(async_engine.sync_engine)
+
+# 异步会话工厂，提交后不过期对象，避免在响应序列化时触发隐式 IO
+AsyncSessionLocal = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # 创建基类
 Base = declarative_base()
 
@@ -73,6 +98,26 @@ def add_column(table_name: str, column):
         logger.error(f"表 {table_name} 添加字段 {column.name} 失败: {str(e)}")
         raise
 
+def get_missing_indexes(table_name: str, table_class) -> list:
+    """获取模型定义但数据库中缺失的索引
+
+    按索引列比较而不是按名称，已有同样列顺序的索引（包括主键和唯一约束）时不再重复创建。
+    """
+    table = table_class if isinstance(table_class, Table) else table_class.__table__
+    inspector = inspect(engine)
+    existing = {tuple(index["column_names"]) for index in inspector.get_indexes(table_name)}
+    existing.update(tuple(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table_name))
+    existing.add(tuple(inspector.get_pk_constraint(table_name).get("constrained_columns") or ()))
+    return [index for index in table.indexes if tuple(column.name for column in index.columns) not in existing]
+
+def create_index(table_name: str, index):
+    """创建单个索引，失败时只记录日志，不影响服务启动"""
+    try:
+        index.create(engine)
+        logger.info(f"表 {table_name} 创建索引 {index.name} 成功")
+    except Exception as e:
+        logger.error(f"表 {table_name} 创建索引 {index.name} 失败: {str(e)}")
+
 def create_table(table_name: str, table_class):
     """创建单个表"""
     try:
@@ -123,18 +168,22 @@ def init_db():
                 logger.info(f"表 {table_name} 不存在，开始创建...")
                 create_table(table_name, table_info["class"])
             else:
-                # 检查是否有缺失的字段
-                if isinstance(table_info["class"], Table):
-                    # 对于关联表，我们跳过字段检查
-                    continue
-                    
-                missing_columns = get_missing_columns(table_name, table_info["class"])
-                if missing_columns:
-                    logger.info(f"表 {table_name} 存在 {len(missing_columns)} 个缺失字段，开始添加...")
-                    for column in missing_columns:
-                        add_column(table_name, column)
-                else:
-                    logger.info(f"表 {table_name} 已存在且字段完整")
+                # 检查是否有缺失的字段，关联表跳过字段检查
+                if not isinstance(table_info["class"], Table):
+                    missing_columns = get_missing_columns(table_name, table_info["class"])
+                    if missing_columns:
+                        logger.info(f"表 {table_name} 存在 {len(missing_columns)} 个缺失字段，开始添加...")
+                        for column in missing_columns:
+                            add_column(table_name, column)
+                    else:
+                        logger.info(f"表 {table_name} 已存在且字段完整")
+                
+                # 检查列表筛选、排序所需的索引
+                missing_indexes = get_missing_indexes(table_name, table_info["class"])
+                if missing_indexes:
+                    logger.info(f"表 {table_name} 存在 {len(missing_indexes)} 个缺失索引，开始创建...")
+                    for index in missing_indexes:
+                        create_index(table_name, index)
         
         logger.info("数据库表检查完成")
     except Exception as e:
@@ -147,4 +196,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
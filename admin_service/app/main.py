@@ -1,6 +1,8 @@
 """后台管理服务主应用"""
 
 import os
+import json
+import asyncio
 from fastapi import FastAPI, Request, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import (
@@ -9,10 +11,12 @@ from fastapi.openapi.docs import (
     get_swagger_ui_oauth2_redirect_html,
 )
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select
+from datetime import datetime
 from typing import Optional, List
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -20,19 +24,34 @@ import psutil
 from admin_service.app import schemas
 from admin_service.app import models
 from admin_service.app.users.models import User
-from admin_service.app.database import SessionLocal, get_db, engine, Base, init_db
-from admin_service.app.auth.security import create_access_token, verify_password, authenticate_user, get_password_hash
+from admin_service.app.database import get_async_db, engine, async_engine, Base, init_db
+from admin_service.app.auth.security import authenticate_user_async, create_token_pair, decode_refresh_token
+from admin_service.app.auth.hashing import password_hasher, PasswordHashBusy
+from admin_service.app.authz import authz_cache, AUTHZ_CONFIG
+from admin_service.app.menus.tree import menu_tree, menu_to_node
+from admin_service.app.service_jobs import service_jobs, ServiceBusy, JOB_SUCCEEDED
+from admin_service.app.pagination import CursorError, clamp_limit, fetch_page, count_cache, count_matching
+from admin_service.app.search import (
+    SearchError, USER_SORTS, ROLE_SORTS, get_sort_key, user_conditions, role_conditions
+)
+from admin_service.app.bulk import (
+    BULK_CONFIG, load_roles, bulk_create_users, bulk_update_users, bulk_assign_roles, bulk_set_role_menus
+)
 from utils.logger import setup_logger
-from utils.response import success_response, error_response, unauthorized_error, not_found_error, server_error
+from utils.response import (
+    success_response, error_response, unauthorized_error, not_found_error, server_error, etag_response, page_response
+)
 from utils.auth import verify_token
+from utils.revocation import revocation_list
 from utils.tracing import init_tracing, create_span, add_span_attribute, set_span_status, end_span
+from utils.metrics import setup_metrics
+from utils.compression import setup_compression
 from opentelemetry.trace import StatusCode
 
 # 设置日志记录器
 logger = setup_logger("admin_service", "admin")
 
 # 导入所有模型以注册到 Base.metadata (避免重复定义)
-from admin_service.app.users.models import User
 from admin_service.app.menus.models import Menu
 # 导入其他模型 (Role, Permission等)
 from admin_service.app.models import Role, Permission, user_roles
@@ -61,6 +80,12 @@ app = FastAPI(
 # 初始化链路追踪
 init_tracing(app, "admin-service")
 
+# 初始化指标采集
+setup_metrics(app, "admin")
+
+# 启用响应压缩
+setup_compression(app)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -91,6 +116,12 @@ async def custom_redoc_html():
         title=app.title + " - ReDoc",
     )
 
+# 健康检查端点（供网关或外部监控使用）
+@app.get("/health", include_in_schema=False)
+async def health_check():
+    """简单的健康检查接口，返回服务可用状态"""
+    return success_response({"status": "ok"})
+
 # 全局异常处理
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -111,200 +142,103 @@ async def startup_event():
     """服务启动时初始化"""
     logger.info("初始化后台管理服务...")
     init_db()
+    await authz_cache.start(AUTHZ_CONFIG["redis"])
+    from .service_manager import service_manager
+    service_manager.start_sampler()
     logger.info("后台管理服务初始化完成")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """服务关闭时清理资源"""
     logger.info("关闭后台管理服务...")
+    await async_engine.dispose()
+    password_hasher.shutdown()
+    await revocation_list.close()
+    await authz_cache.close()
+    from .service_manager import service_manager
+    await service_jobs.shutdown()
+    await service_manager.stop_sampler()
     logger.info("后台管理服务已关闭")
 
-# 依赖项
-def get_db():
-    """获取数据库会话"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # 用户认证相关路由
 @app.post("/auth/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
     with create_span("user_login") as span:
         logger.info(f"用户登录: {form_data.username}")
         add_span_attribute(span, "username", form_data.username)
         
         try:
-            user = authenticate_user(db, form_data.username, form_data.password)
+            user = await authenticate_user_async(db, form_data.username, form_data.password)
             if not user:
                 logger.warning(f"登录失败: 用户名或密码错误 - {form_data.username}")
                 add_span_attribute(span, "login.status", "failed")
                 set_span_status(span, StatusCode.ERROR, "用户名或密码错误")
                 return unauthorized_error("用户名或密码错误")
             
-            access_token_expires = timedelta(days=7)
-            access_token = create_access_token(
-                data={"sub": str(user.id)}, expires_delta=access_token_expires
-            )
             logger.info(f"用户登录成功: {form_data.username}")
             add_span_attribute(span, "login.status", "success")
             set_span_status(span, StatusCode.OK)
-            return success_response({
-                "access_token": access_token,
-                "token_type": "bearer"
-            })
+            return success_response(create_token_pair(user.id))
+        except PasswordHashBusy as e:
+            logger.warning(f"登录被拒绝: {str(e)} - {form_data.username}")
+            set_span_status(span, StatusCode.ERROR, str(e))
+            return error_response(str(e), status_code=503)
         except Exception as e:
             logger.error(f"登录失败: {str(e)}")
             add_span_attribute(span, "error", str(e))
             set_span_status(span, StatusCode.ERROR, str(e))
             return server_error("登录失败")
 
+@app.post("/auth/refresh")
+async def refresh_token(payload: schemas.TokenRefresh, db: AsyncSession = Depends(get_async_db)):
+    """使用刷新令牌换取新的访问令牌和刷新令牌，旧刷新令牌随即失效"""
+    claims = decode_refresh_token(payload.refresh_token)
+    if claims is None:
+        return unauthorized_error("刷新令牌无效或已失效")
+    # 先原子地认领旧刷新令牌，并发的重复刷新只有一个能换到新令牌
+    if not await revocation_list.claim_token(claims.get("jti"), claims["exp"]):
+        return unauthorized_error("刷新令牌无效或已失效")
+    try:
+        user = await db.scalar(select(User).where(User.id == int(claims["sub"])))
+        if not user or not user.is_active:
+            return unauthorized_error("用户不存在或未激活")
+        return success_response(create_token_pair(user.id))
+    except Exception as e:
+        logger.error(f"刷新令牌失败: {str(e)}")
+        return server_error("刷新令牌失败")
+
+@app.post("/auth/logout")
+async def logout(payload: Optional[schemas.LogoutRequest] = None, token_data: dict = Depends(verify_token)):
+    """注销：吊销当前访问令牌和传入的刷新令牌"""
+    await revocation_list.revoke_token(token_data.get("jti"), token_data["exp"])
+    if payload is not None and payload.refresh_token:
+        claims = decode_refresh_token(payload.refresh_token)
+        if claims is not None and claims.get("sub") == token_data.get("sub"):
+            await revocation_list.revoke_token(claims.get("jti"), claims["exp"])
+    logger.info(f"用户注销: {token_data.get('sub')}")
+    return success_response({"message": "已注销"})
+
 # 用户管理相关路由
 @app.get("/users/me")
-async def get_current_user_info(db: Session = Depends(get_db), token_data: dict = Depends(verify_token)):
+async def get_current_user_info(db: AsyncSession = Depends(get_async_db), token_data: dict = Depends(verify_token)):
     """获取当前用户信息"""
     try:
         user_id = token_data.get("sub")
         if not user_id:
             return unauthorized_error("无效的令牌")
         
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = await db.scalar(select(User).where(User.id == int(user_id)))
         if not user:
             return not_found_error("用户不存在")
         
         user_dict = user.to_dict()
         
-        # 获取用户的菜单权限
-        menu_codes = []
-        for role in user.roles:
-            if role.code == "fcadmin":
-                # 超级管理员拥有所有菜单权限 - 从数据库动态查询
-                from admin_service.app.menus.models import Menu
-                all_menus = db.query(Menu).all()
-                if all_menus:
-                    menu_codes = [menu.code for menu in all_menus]
-                else:
-                    # 如果数据库没有菜单，使用默认菜单编码
-                    menu_codes = ["dashboard", "system", "system:user", "system:role", "system:permission", "system:menu", "system:service"]
-                break
-            else:
-                # 查询角色的菜单权限
-                sql = text("SELECT menu_code FROM role_menus WHERE role_id = :role_id")
-                result = db.execute(sql, {"role_id": role.id})
-                menu_codes.extend([row[0] for row in result])
-        
-        # 去重
-        menu_codes = list(set(menu_codes))
-        user_dict["menu_codes"] = menu_codes
-        
-        # 从数据库读取所有可见菜单
-        all_db_menus = db.query(Menu).filter(Menu.visible == 1, Menu.component.isnot(None)).order_by(Menu.sort_order).all()
-        
-        # 转换为前端需要的格式
-        all_menus = []
-        for menu in all_db_menus:
-            # 生成路由名称 (首字母大写驼峰)
-            name_parts = menu.code.replace(":", "_").split("_")
-            route_name = "".join([part.capitalize() for part in name_parts])
-            
-            # 获取父级code
-            parent_code = None
-            if menu.parent_id:
-                parent_menu = db.query(Menu).filter(Menu.id == menu.parent_id).first()
-                if parent_menu:
-                    parent_code = parent_menu.code
-            
-            menu_item = {
-                "path": menu.path.lstrip("/"),  # 移除开头的/
-                "name": route_name,
-                "component": menu.component,
-                "meta": {
-                    "title": menu.name,
-                    "icon": menu.icon or "Document",
-                    "menuCode": menu.code
-                }
-            }
-            
-            if parent_code:
-                menu_item["meta"]["parent"] = parent_code
-            
-            all_menus.append(menu_item)
-        
-        # 如果数据库没有菜单,使用默认菜单
-        if not all_menus:
-            all_menus = [
-            {
-                "path": "/dashboard",
-                "name": "Dashboard",
-                "component": "Dashboard",
-                "meta": {
-                    "title": "首页",
-                    "icon": "HomeFilled",
-                    "menuCode": "dashboard"
-                }
-            },
-            {
-                "path": "/system/users",
-                "name": "SystemUsers",
-                "component": "system/Users",
-                "meta": {
-                    "title": "用户管理",
-                    "icon": "User",
-                    "menuCode": "system:user",
-                    "parent": "system"
-                }
-            },
-            {
-                "path": "/system/roles",
-                "name": "SystemRoles",
-                "component": "system/Roles",
-                "meta": {
-                    "title": "角色管理",
-                    "icon": "UserFilled",
-                    "menuCode": "system:role",
-                    "parent": "system"
-                }
-            },
-            {
-                "path": "/system/permissions",
-                "name": "SystemPermissions",
-                "component": "system/Permissions",
-                "meta": {
-                    "title": "权限管理",
-                    "icon": "Lock",
-                    "menuCode": "system:permission",
-                    "parent": "system"
-                }
-            },
-            {
-                "path": "/system/menus",
-                "name": "SystemMenus",
-                "component": "system/Menus",
-                "meta": {
-                    "title": "菜单管理",
-                    "icon": "Menu",
-                    "menuCode": "system:menu",
-                    "parent": "system"
-                }
-            },
-            {
-                "path": "/system/services",
-                "name": "SystemServices",
-                "component": "system/Services",
-                "meta": {
-                    "title": "服务管理",
-                    "icon": "Monitor",
-                    "menuCode": "system:service",
-                    "parent": "system"
-                }
-            }
-        ]
-        
-        # 根据权限过滤菜单
-        filtered_menus = [menu for menu in all_menus if menu["meta"]["menuCode"] in menu_codes]
-        user_dict["menus"] = filtered_menus
+        # 菜单编码、路由和权限编码来自预先计算的授权快照
+        snapshot = await authz_cache.get_snapshot(db, user.id)
+        user_dict["menu_codes"] = snapshot["menu_codes"]
+        user_dict["permission_codes"] = snapshot["permission_codes"]
+        user_dict["menus"] = snapshot["routes"]
         
         return success_response(user_dict)
     except Exception as e:
@@ -314,7 +248,7 @@ async def get_current_user_info(db: Session = Depends(get_db), token_data: dict
 @app.post("/users")
 async def create_user(
     user: schemas.UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _: dict = Depends(verify_token)
 ):
     """创建用户"""
@@ -323,80 +257,205 @@ async def create_user(
         add_span_attribute(span, "username", user.username)
         
         try:
-            db_user = db.query(User).filter(User.username == user.username).first()
+            db_user = await db.scalar(select(User).where(User.username == user.username))
             if db_user:
                 logger.warning(f"创建用户失败: 用户名已存在 - {user.username}")
                 add_span_attribute(span, "user.exists", "true")
                 set_span_status(span, StatusCode.ERROR, "用户名已存在")
                 return error_response("用户名已存在", status_code=400)
             
+            # 关联角色在加入会话前设置，避免刷新后访问未加载的集合
+            roles = await db.run_sync(load_roles, set(user.role_ids)) if user.role_ids else {}
+            hashed_password = await password_hasher.hash(user.password)
+            
             # 创建新用户
             new_user = User(
                 username=user.username,
                 email=user.email,
                 full_name=user.full_name,
-                hashed_password=get_password_hash(user.password),
+                hashed_password=hashed_password,
                 is_active=user.is_active,
-                is_superuser=user.is_superuser
+                is_superuser=user.is_superuser,
+                roles=list(roles.values())
             )
             db.add(new_user)
-            db.flush()  # 获取用户ID但不提交
-            
-            # 关联角色
-            if user.role_ids:
-                for role_id in user.role_ids:
-                    role = db.query(models.Role).filter(models.Role.id == role_id).first()
-                    if role:
-                        new_user.roles.append(role)
             
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
+            count_cache.invalidate(User)
             
             logger.info(f"用户创建成功: {user.username}")
             add_span_attribute(span, "user.id", str(new_user.id))
             set_span_status(span, StatusCode.OK)
             return success_response(new_user.to_dict())
+        except PasswordHashBusy as e:
+            set_span_status(span, StatusCode.ERROR, str(e))
+            return error_response(str(e), status_code=503)
         except Exception as e:
             logger.error(f"创建用户失败: {str(e)}")
             add_span_attribute(span, "error", str(e))
             set_span_status(span, StatusCode.ERROR, str(e))
             return server_error("创建用户失败")
 
+# 权限列表的游标分页排序键
+PERMISSION_SORT_KEY = ((models.Permission.id, False),)
+
 @app.get("/users")
 async def list_users(
     skip: int = 0,
     limit: int = 10,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    role_code: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "id",
+    db: AsyncSession = Depends(get_async_db),
     _: dict = Depends(verify_token)
 ):
-    """获取用户列表"""
+    """获取用户列表
+
+    支持按用户名/邮箱前缀、启用状态、角色编码和创建时间范围筛选，sort 可选
+    id、created_at、username，加“-”前缀为降序。
+    按排序键游标分页，下一页传入上一页返回的 next_cursor；
+    没有游标时仍支持 skip 偏移分页以兼容旧客户端。with_total=false 时不返回总数。
+    """
     with create_span("list_users") as span:
-        logger.info(f"获取用户列表: skip={skip}, limit={limit}")
+        limit = clamp_limit(limit)
+        logger.info(f"获取用户列表: skip={skip}, limit={limit}, cursor={cursor}, sort={sort}")
         add_span_attribute(span, "skip", str(skip))
         add_span_attribute(span, "limit", str(limit))
         
         try:
-            users = db.query(User).offset(skip).limit(limit).all()
-            total = db.query(User).count()
+            sort_key = get_sort_key(USER_SORTS, sort)
+            conditions = user_conditions(username, email, is_active, role_code, created_from, created_to)
+            users, next_cursor = await fetch_page(db, select(User).where(*conditions), sort_key, limit, cursor, skip)
+            if not with_total:
+                total, total_estimated = None, False
+            elif conditions:
+                total, total_estimated = await count_matching(db, select(User.id).where(*conditions))
+            else:
+                total, total_estimated = await count_cache.get(db, User)
             logger.info(f"获取到 {len(users)} 个用户")
             add_span_attribute(span, "users.count", str(len(users)))
             set_span_status(span, StatusCode.OK)
-            return success_response({
-                "items": [user.to_dict() for user in users],
-                "total": total,
-                "skip": skip,
-                "limit": limit
-            })
+            return page_response(
+                [user.to_dict() for user in users], next_cursor, limit, total, total_estimated,
+                skip=0 if cursor else skip
+            )
+        except (CursorError, SearchError) as e:
+            set_span_status(span, StatusCode.ERROR, str(e))
+            return error_response(str(e), status_code=400)
         except Exception as e:
             logger.error(f"获取用户列表失败: {str(e)}")
             add_span_attribute(span, "error", str(e))
             set_span_status(span, StatusCode.ERROR, str(e))
             return server_error("获取用户列表失败")
 
+# 批量操作路由需注册在 /users/{user_id} 之前
+def check_bulk_size(count: int):
+    """检查批量请求项数量，超出上限时返回错误响应"""
+    if count > BULK_CONFIG["max_items"]:
+        return error_response(f"单次最多处理 {BULK_CONFIG['max_items']} 项", status_code=413)
+    return None
+
+async def invalidate_users(user_ids: List[int]) -> None:
+    """用户角色变更后使其授权快照失效"""
+    for user_id in user_ids:
+        await authz_cache.invalidate_user(user_id)
+
+@app.post("/users/bulk")
+async def bulk_create_users_endpoint(
+    payload: schemas.UserBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(verify_token)
+):
+    """批量创建用户"""
+    with create_span("bulk_create_users") as span:
+        logger.info(f"批量创建用户: {len(payload.users)} 项")
+        add_span_attribute(span, "items", str(len(payload.users)))
+        too_large = check_bulk_size(len(payload.users))
+        if too_large:
+            return too_large
+        try:
+            hashed_passwords = await password_hasher.hash_many([user.password for user in payload.users])
+            result = (await db.run_sync(bulk_create_users, payload.users, hashed_passwords)).to_dict()
+            count_cache.invalidate(User)
+            logger.info(f"批量创建用户完成: 成功 {result['succeeded']}, 失败 {result['failed']}")
+            set_span_status(span, StatusCode.OK)
+            return success_response(result)
+        except Exception as e:
+            logger.error(f"批量创建用户失败: {str(e)}")
+            set_span_status(span, StatusCode.ERROR, str(e))
+            return server_error("批量创建用户失败")
+
+@app.put("/users/bulk")
+async def bulk_update_users_endpoint(
+    payload: schemas.UserBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(verify_token)
+):
+    """批量更新用户"""
+    with create_span("bulk_update_users") as span:
+        logger.info(f"批量更新用户: {len(payload.users)} 项")
+        add_span_attribute(span, "items", str(len(payload.users)))
+        too_large = check_bulk_size(len(payload.users))
+        if too_large:
+            return too_large
+        try:
+            hashed_passwords = await password_hasher.hash_many([user.password for user in payload.users])
+            # 提交回调在 run_sync 中同步执行，只收集角色变化的用户，返回后再使快照失效
+            changed_users: List[int] = []
+            try:
+                result = (await db.run_sync(
+                    bulk_update_users, payload.users, hashed_passwords, on_commit=changed_users.extend
+                )).to_dict()
+            finally:
+                await invalidate_users(changed_users)
+            logger.info(f"批量更新用户完成: 成功 {result['succeeded']}, 失败 {result['failed']}")
+            set_span_status(span, StatusCode.OK)
+            return success_response(result)
+        except Exception as e:
+            logger.error(f"批量更新用户失败: {str(e)}")
+            set_span_status(span, StatusCode.ERROR, str(e))
+            return server_error("批量更新用户失败")
+
+@app.post("/users/roles/bulk")
+async def bulk_assign_roles_endpoint(
+    payload: schemas.UserRoleBulkAssign,
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(verify_token)
+):
+    """批量分配用户角色"""
+    with create_span("bulk_assign_roles") as span:
+        logger.info(f"批量分配用户角色: {len(payload.assignments)} 项, 模式: {payload.mode}")
+        add_span_attribute(span, "items", str(len(payload.assignments)))
+        too_large = check_bulk_size(len(payload.assignments))
+        if too_large:
+            return too_large
+        try:
+            changed_users: List[int] = []
+            try:
+                result = (await db.run_sync(
+                    bulk_assign_roles, payload.assignments, payload.mode, on_commit=changed_users.extend
+                )).to_dict()
+            finally:
+                await invalidate_users(changed_users)
+            logger.info(f"批量分配用户角色完成: 成功 {result['succeeded']}, 失败 {result['failed']}")
+            set_span_status(span, StatusCode.OK)
+            return success_response(result)
+        except Exception as e:
+            logger.error(f"批量分配用户角色失败: {str(e)}")
+            set_span_status(span, StatusCode.ERROR, str(e))
+            return server_error("批量分配用户角色失败")
+
 @app.get("/users/{user_id}")
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _: dict = Depends(verify_token)
 ):
     """获取用户详情"""
@@ -405,7 +464,7 @@ async def get_user(
         add_span_attribute(span, "user.id", str(user_id))
         
         try:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = await db.scalar(select(User).where(User.id == user_id))
             if not user:
                 logger.warning(f"用户不存在: {user_id}")
                 add_span_attribute(span, "user.exists", "false")
@@ -426,7 +485,7 @@ async def get_user(
 async def update_user(
     user_id: int,
     user: schemas.UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _: dict = Depends(verify_token)
 ):
     """更新用户信息"""
@@ -435,7 +494,7 @@ async def update_user(
         add_span_attribute(span, "user.id", str(user_id))
         
         try:
-            db_user = db.query(User).filter(User.id == user_id).first()
+            db_user = await db.scalar(select(User).where(User.id == user_id))
             if not db_user:
                 logger.warning(f"用户不存在: {user_id}")
                 add_span_attribute(span, "user.exists", "false")
@@ -445,38 +504,51 @@ async def update_user(
             # 更新用户信息
             update_data = user.dict(exclude_unset=True)
             if "password" in update_data:
-                update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+                update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
             
             # 处理角色关联
-            if "role_ids" in update_data:
+            roles_changed = "role_ids" in update_data
+            if roles_changed:
                 role_ids = update_data.pop("role_ids")
                 db_user.roles.clear()
                 if role_ids:
-                    for role_id in role_ids:
-                        role = db.query(models.Role).filter(models.Role.id == role_id).first()
-                        if role:
-                            db_user.roles.append(role)
+                    db_user.roles.extend((await db.run_sync(load_roles, set(role_ids))).values())
             
             for key, value in update_data.items():
                 setattr(db_user, key, value)
             
-            db.commit()
-            db.refresh(db_user)
+            await db.commit()
+            await db.refresh(db_user)
+            if roles_changed:
+                await authz_cache.invalidate_user(user_id)
+            if "hashed_password" in update_data or update_data.get("is_active") is False:
+                # 修改密码或禁用用户后，此前签发的令牌全部失效
+                await revocation_list.revoke_user(user_id)
             
             logger.info(f"用户信息更新成功: {db_user.username}")
             add_span_attribute(span, "username", db_user.username)
             set_span_status(span, StatusCode.OK)
             return success_response(db_user.to_dict())
+        except PasswordHashBusy as e:
+            set_span_status(span, StatusCode.ERROR, str(e))
+            return error_response(str(e), status_code=503)
         except Exception as e:
             logger.error(f"更新用户信息失败: {str(e)}")
             add_span_attribute(span, "error", str(e))
             set_span_status(span, StatusCode.ERROR, str(e))
             return server_error("更新用户信息失败")
 
+@app.post("/users/{user_id}/revoke-tokens")
+async def revoke_user_tokens(user_id: int, _: dict = Depends(verify_token)):
+    """强制用户下线：吊销该用户此前签发的全部令牌"""
+    await revocation_list.revoke_user(user_id)
+    logger.info(f"已吊销用户令牌: {user_id}")
+    return success_response({"message": "用户令牌已吊销"})
+
 @app.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _: dict = Depends(verify_token)
 ):
     """删除用户"""
@@ -485,15 +557,18 @@ async def delete_user(
         add_span_attribute(span, "user.id", str(user_id))
         
         try:
-            db_user = db.query(User).filter(User.id == user_id).first()
+            db_user = await db.scalar(select(User).where(User.id == user_id))
             if not db_user:
                 logger.warning(f"用户不存在: {user_id}")
                 add_span_attribute(span, "user.exists", "false")
                 set_span_status(span, StatusCode.ERROR, "用户不存在")
                 return not_found_error(f"用户不存在: {user_id}")
             
-            db.delete(db_user)
-            db.commit()
+            await db.delete(db_user)
+            await db.commit()
+            await authz_cache.invalidate_user(user_id)
+            count_cache.invalidate(User)
+            await revocation_list.revoke_user(user_id)
             
             logger.info(f"用户删除成功: {user_id}")
             add_span_attribute(span, "delete.status", "success")
@@ -507,7 +582,7 @@ async def delete_user(
 
 # 角色相关路由
 @app.post("/roles/")
-async def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
+async def create_role(role: schemas.RoleCreate, db: AsyncSession = Depends(get_async_db)):
     """创建角色"""
     try:
         # 禁止创建超级管理员角色
@@ -515,35 +590,66 @@ async def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
             return error_response("不能创建超级管理员角色", status_code=400)
         
         # 检查角色编码是否已存在
-        existing_role = db.query(models.Role).filter(models.Role.code == role.code).first()
+        existing_role = await db.scalar(select(models.Role).where(models.Role.code == role.code))
         if existing_role:
             return error_response("角色编码已存在", status_code=400)
         
         db_role = models.Role(**role.dict())
         db.add(db_role)
-        db.commit()
-        db.refresh(db_role)
+        await db.commit()
+        await db.refresh(db_role)
+        count_cache.invalidate(models.Role)
         return success_response(db_role.to_dict())
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"创建角色失败: {str(e)}")
         return server_error(f"创建角色失败: {str(e)}")
 
 @app.get("/roles/")
-async def list_roles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """获取角色列表"""
+async def list_roles(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    name: Optional[str] = None,
+    code: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "id",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取角色列表
+
+    支持按名称/编码前缀和创建时间范围筛选，sort 可选 id、created_at、code、name，加“-”前缀为降序。
+    传 cursor 时（第一页传空字符串）按排序键游标分页并返回分页结构，否则返回角色数组。
+    """
     try:
-        roles = db.query(models.Role).offset(skip).limit(limit).all()
-        return success_response([role.to_dict() for role in roles])
+        sort_key = get_sort_key(ROLE_SORTS, sort)
+        conditions = role_conditions(name, code, created_from, created_to)
+        statement = select(models.Role).where(*conditions)
+        if cursor is None:
+            roles, _ = await fetch_page(db, statement, sort_key, limit, skip=skip)
+            return success_response([role.to_dict() for role in roles])
+        limit = clamp_limit(limit)
+        roles, next_cursor = await fetch_page(db, statement, sort_key, limit, cursor)
+        if not with_total:
+            total, total_estimated = None, False
+        elif conditions:
+            total, total_estimated = await count_matching(db, select(models.Role.id).where(*conditions))
+        else:
+            total, total_estimated = await count_cache.get(db, models.Role)
+        return page_response([role.to_dict() for role in roles], next_cursor, limit, total, total_estimated)
+    except (CursorError, SearchError) as e:
+        return error_response(str(e), status_code=400)
     except Exception as e:
         logger.error(f"获取角色列表失败: {str(e)}")
         return server_error("获取角色列表失败")
 
 @app.get("/roles/{role_id}")
-async def get_role(role_id: int, db: Session = Depends(get_db)):
+async def get_role(role_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取角色详情"""
     try:
-        role = db.query(models.Role).filter(models.Role.id == role_id).first()
+        role = await db.scalar(select(models.Role).where(models.Role.id == role_id))
         if not role:
             return not_found_error("角色不存在")
         return success_response(role.to_dict())
@@ -552,10 +658,10 @@ async def get_role(role_id: int, db: Session = Depends(get_db)):
         return server_error("获取角色详情失败")
 
 @app.put("/roles/{role_id}")
-async def update_role(role_id: int, role: schemas.RoleUpdate, db: Session = Depends(get_db)):
+async def update_role(role_id: int, role: schemas.RoleUpdate, db: AsyncSession = Depends(get_async_db)):
     """更新角色"""
     try:
-        db_role = db.query(models.Role).filter(models.Role.id == role_id).first()
+        db_role = await db.scalar(select(models.Role).where(models.Role.id == role_id))
         if not db_role:
             return not_found_error("角色不存在")
         
@@ -568,7 +674,7 @@ async def update_role(role_id: int, role: schemas.RoleUpdate, db: Session = Depe
         # 如果更新编码,检查是否重复
         update_data = role.dict(exclude_unset=True)
         if "code" in update_data and update_data["code"] != db_role.code:
-            existing = db.query(models.Role).filter(models.Role.code == update_data["code"]).first()
+            existing = await db.scalar(select(models.Role).where(models.Role.code == update_data["code"]))
             if existing:
                 return error_response("角色编码已存在", status_code=400)
         
@@ -576,19 +682,25 @@ async def update_role(role_id: int, role: schemas.RoleUpdate, db: Session = Depe
             setattr(db_role, key, value)
         
         db_role.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_role)
+        await db.commit()
+        await db.refresh(db_role)
+        await authz_cache.invalidate_all()
         return success_response(db_role.to_dict())
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"更新角色失败: {str(e)}")
         return server_error("更新角色失败")
 
 @app.delete("/roles/{role_id}")
-async def delete_role(role_id: int, db: Session = Depends(get_db)):
+async def delete_role(role_id: int, db: AsyncSession = Depends(get_async_db)):
     """删除角色"""
     try:
-        db_role = db.query(models.Role).filter(models.Role.id == role_id).first()
+        # 删除时需要级联处理用户关联和权限，提前加载以免异步会话中触发懒加载
+        db_role = await db.scalar(
+            select(models.Role)
+            .options(selectinload(models.Role.users), selectinload(models.Role.permissions))
+            .where(models.Role.id == role_id)
+        )
         if not db_role:
             return not_found_error("角色不存在")
         
@@ -596,8 +708,10 @@ async def delete_role(role_id: int, db: Session = Depends(get_db)):
         if db_role.code == "fcadmin":
             return error_response("不能删除超级管理员角色", status_code=400)
         
-        db.delete(db_role)
-        db.commit()
+        await db.delete(db_role)
+        await db.commit()
+        await authz_cache.invalidate_all()
+        count_cache.invalidate(models.Role)
         return success_response({"message": "角色已删除"})
     except Exception as e:
         logger.error(f"删除角色失败: {str(e)}")
@@ -605,34 +719,54 @@ async def delete_role(role_id: int, db: Session = Depends(get_db)):
 
 # 权限相关路由
 @app.post("/permissions/")
-async def create_permission(permission: schemas.PermissionCreate, db: Session = Depends(get_db)):
+async def create_permission(permission: schemas.PermissionCreate, db: AsyncSession = Depends(get_async_db)):
     """创建权限"""
     try:
         db_permission = models.Permission(**permission.dict())
         db.add(db_permission)
-        db.commit()
-        db.refresh(db_permission)
+        await db.commit()
+        await db.refresh(db_permission)
+        await authz_cache.invalidate_all()
+        count_cache.invalidate(models.Permission)
         return success_response(db_permission.to_dict())
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"创建权限失败: {str(e)}")
         return server_error("创建权限失败")
 
 @app.get("/permissions/")
-async def list_permissions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """获取权限列表"""
+async def list_permissions(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取权限列表
+
+    传 cursor 时（第一页传空字符串）按权限ID游标分页并返回分页结构，否则返回权限数组。
+    """
     try:
-        permissions = db.query(models.Permission).offset(skip).limit(limit).all()
-        return success_response([perm.to_dict() for perm in permissions])
+        if cursor is None:
+            permissions = (await db.scalars(
+                select(models.Permission).order_by(models.Permission.id).offset(skip).limit(limit)
+            )).all()
+            return success_response([perm.to_dict() for perm in permissions])
+        limit = clamp_limit(limit)
+        permissions, next_cursor = await fetch_page(db, select(models.Permission), PERMISSION_SORT_KEY, limit, cursor)
+        total, total_estimated = await count_cache.get(db, models.Permission) if with_total else (None, False)
+        return page_response([perm.to_dict() for perm in permissions], next_cursor, limit, total, total_estimated)
+    except CursorError as e:
+        return error_response(str(e), status_code=400)
     except Exception as e:
         logger.error(f"获取权限列表失败: {str(e)}")
         return server_error("获取权限列表失败")
 
 @app.get("/permissions/{permission_id}")
-async def get_permission(permission_id: int, db: Session = Depends(get_db)):
+async def get_permission(permission_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取权限详情"""
     try:
-        permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+        permission = await db.scalar(select(models.Permission).where(models.Permission.id == permission_id))
         if not permission:
             return not_found_error("权限不存在")
         return success_response(permission.to_dict())
@@ -641,10 +775,10 @@ async def get_permission(permission_id: int, db: Session = Depends(get_db)):
         return server_error("获取权限详情失败")
 
 @app.put("/permissions/{permission_id}")
-async def update_permission(permission_id: int, permission: schemas.PermissionUpdate, db: Session = Depends(get_db)):
+async def update_permission(permission_id: int, permission: schemas.PermissionUpdate, db: AsyncSession = Depends(get_async_db)):
     """更新权限"""
     try:
-        db_permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+        db_permission = await db.scalar(select(models.Permission).where(models.Permission.id == permission_id))
         if not db_permission:
             return not_found_error("权限不存在")
         
@@ -652,24 +786,27 @@ async def update_permission(permission_id: int, permission: schemas.PermissionUp
             setattr(db_permission, key, value)
         
         db_permission.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(db_permission)
+        await db.commit()
+        await db.refresh(db_permission)
+        await authz_cache.invalidate_all()
         return success_response(db_permission.to_dict())
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"更新权限失败: {str(e)}")
         return server_error("更新权限失败")
 
 @app.delete("/permissions/{permission_id}")
-async def delete_permission(permission_id: int, db: Session = Depends(get_db)):
+async def delete_permission(permission_id: int, db: AsyncSession = Depends(get_async_db)):
     """删除权限"""
     try:
-        db_permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+        db_permission = await db.scalar(select(models.Permission).where(models.Permission.id == permission_id))
         if not db_permission:
             return not_found_error("权限不存在")
         
-        db.delete(db_permission)
-        db.commit()
+        await db.delete(db_permission)
+        await db.commit()
+        await authz_cache.invalidate_all()
+        count_cache.invalidate(models.Permission)
         return success_response({"message": "权限已删除"})
     except Exception as e:
         logger.error(f"删除权限失败: {str(e)}")
@@ -677,15 +814,15 @@ async def delete_permission(permission_id: int, db: Session = Depends(get_db)):
 
 # 角色菜单权限相关路由
 @app.get("/roles/{role_id}/menus")
-async def get_role_menus(role_id: int, db: Session = Depends(get_db)):
+async def get_role_menus(role_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取角色的菜单权限"""
     try:
         # 检查是否是超级管理员
-        role = db.query(models.Role).filter(models.Role.id == role_id).first()
+        role = await db.scalar(select(models.Role).where(models.Role.id == role_id))
         if role and role.code == "fcadmin":
             # 超级管理员拥有所有菜单权限 - 从数据库动态查询
             from admin_service.app.menus.models import Menu
-            all_menus = db.query(Menu).all()
+            all_menus = (await db.scalars(select(Menu))).all()
             if all_menus:
                 # 从数据库获取所有菜单编码
                 all_menu_codes = [menu.code for menu in all_menus]
@@ -696,7 +833,7 @@ async def get_role_menus(role_id: int, db: Session = Depends(get_db)):
         
         # 查询角色的菜单编码
         sql = text("SELECT menu_code FROM role_menus WHERE role_id = :role_id")
-        result = db.execute(sql, {"role_id": role_id})
+        result = await db.execute(sql, {"role_id": role_id})
         menu_codes = [row[0] for row in result]
         return success_response({"menu_codes": menu_codes, "is_super_admin": False})
     except Exception as e:
@@ -704,11 +841,11 @@ async def get_role_menus(role_id: int, db: Session = Depends(get_db)):
         return server_error("获取角色菜单失败")
 
 @app.post("/roles/{role_id}/menus")
-async def update_role_menus(role_id: int, menu_data: dict, db: Session = Depends(get_db)):
+async def update_role_menus(role_id: int, menu_data: dict, db: AsyncSession = Depends(get_async_db)):
     """更新角色的菜单权限"""
     try:
         # 检查是否是超级管理员
-        role = db.query(models.Role).filter(models.Role.id == role_id).first()
+        role = await db.scalar(select(models.Role).where(models.Role.id == role_id))
         if role and role.code == "fcadmin":
             return error_response("超级管理员权限不可修改", status_code=400)
         
@@ -716,28 +853,49 @@ async def update_role_menus(role_id: int, menu_data: dict, db: Session = Depends
         
         # 删除旧的权限
         delete_sql = text("DELETE FROM role_menus WHERE role_id = :role_id")
-        db.execute(delete_sql, {"role_id": role_id})
+        await db.execute(delete_sql, {"role_id": role_id})
         
         # 插入新的权限
         if menu_codes:
-            for menu_code in menu_codes:
-                insert_sql = text("INSERT INTO role_menus (role_id, menu_code) VALUES (:role_id, :menu_code)")
-                db.execute(insert_sql, {"role_id": role_id, "menu_code": menu_code})
+            insert_sql = text("INSERT INTO role_menus (role_id, menu_code) VALUES (:role_id, :menu_code)")
+            await db.execute(insert_sql, [{"role_id": role_id, "menu_code": menu_code} for menu_code in menu_codes])
         
-        db.commit()
+        await db.commit()
+        await authz_cache.invalidate_all()
         return success_response({"message": "权限更新成功"})
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"更新角色菜单失败: {str(e)}")
         return server_error("更新角色菜单失败")
 
+@app.post("/roles/menus/bulk")
+async def bulk_set_role_menus_endpoint(payload: schemas.RoleMenuBulkSet, db: AsyncSession = Depends(get_async_db)):
+    """批量设置角色的菜单权限"""
+    too_large = check_bulk_size(len(payload.bindings))
+    if too_large:
+        return too_large
+    try:
+        changed_roles: List[int] = []
+        try:
+            result = (await db.run_sync(
+                bulk_set_role_menus, payload.bindings, "fcadmin", on_commit=changed_roles.extend
+            )).to_dict()
+        finally:
+            if changed_roles:
+                await authz_cache.invalidate_all()
+        logger.info(f"批量设置角色菜单完成: 成功 {result['succeeded']}, 失败 {result['failed']}")
+        return success_response(result)
+    except Exception as e:
+        logger.error(f"批量设置角色菜单失败: {str(e)}")
+        return server_error("批量设置角色菜单失败")
+
 # 获取用户可见的菜单路由
 @app.get("/user/menus")
-async def get_user_menus(db: Session = Depends(get_db), token_data: dict = Depends(verify_token)):
+async def get_user_menus(db: AsyncSession = Depends(get_async_db), token_data: dict = Depends(verify_token)):
     """获取当前用户可见的菜单路由"""
     try:
         user_id = token_data.get("sub")
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = await db.scalar(select(User).where(User.id == int(user_id)))
         
         # 获取用户的菜单权限
         menu_codes = []
@@ -747,7 +905,7 @@ async def get_user_menus(db: Session = Depends(get_db), token_data: dict = Depen
                 break
             else:
                 sql = text("SELECT menu_code FROM role_menus WHERE role_id = :role_id")
-                result = db.execute(sql, {"role_id": role.id})
+                result = await db.execute(sql, {"role_id": role.id})
                 menu_codes.extend([row[0] for row in result])
         
         menu_codes = list(set(menu_codes))
@@ -842,51 +1000,108 @@ async def get_user_menus(db: Session = Depends(get_db), token_data: dict = Depen
 
 # 菜单相关路由
 @app.get("/menus")
-async def get_menus(db: Session = Depends(get_db), _: dict = Depends(verify_token)):
-    """获取菜单列表"""
+async def get_menus(request: Request, role_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db), _: dict = Depends(verify_token)):
+    """获取菜单树，指定 role_id 时只返回该角色可见的菜单"""
     try:
-        # 从数据库读取菜单
-        from admin_service.app.menus.models import Menu
-        
-        # 查询所有菜单
-        all_menus = db.query(Menu).order_by(Menu.sort_order).all()
-        
-        # 构建菜单树
-        menu_dict = {}
-        root_menus = []
-        
-        # 第一遍：创建所有菜单项
-        for menu in all_menus:
-            menu_item = {
-                "id": menu.id,
-                "title": menu.name,
-                "code": menu.code,
-                "path": menu.path,
-                "component": menu.component,
-                "icon": menu.icon,
-                "sort_order": menu.sort_order,
-                "visible": bool(menu.visible),
-                "parent_id": menu.parent_id,
-                "created_at": menu.created_at.isoformat() if menu.created_at else None,
-                "children": []
-            }
-            menu_dict[menu.id] = menu_item
-            
-            # 如果没有父菜单，加入根菜单列表
-            if not menu.parent_id:
-                root_menus.append(menu_item)
-        
-        # 第二遍：构建父子关系
-        for menu in all_menus:
-            if menu.parent_id and menu.parent_id in menu_dict:
-                parent = menu_dict[menu.parent_id]
-                parent["children"].append(menu_dict[menu.id])
-        
-        return success_response(root_menus)
+        await db.run_sync(menu_tree.ensure_loaded)
+        menu_codes = None
+        if role_id is not None:
+            role = await db.scalar(select(models.Role).where(models.Role.id == role_id))
+            if not role:
+                return not_found_error("角色不存在")
+            if role.code != "fcadmin":
+                sql = text("SELECT menu_code FROM role_menus WHERE role_id = :role_id")
+                menu_codes = [row[0] for row in await db.execute(sql, {"role_id": role_id})]
+        etag, root_menus = menu_tree.get_tree(menu_codes)
+        return etag_response(request, root_menus, etag)
     except Exception as e:
         logger.error(f"获取菜单列表失败: {str(e)}")
         return server_error("获取菜单列表失败")
 
+@app.post("/menus")
+async def create_menu(menu: schemas.MenuCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(verify_token)):
+    """创建菜单"""
+    try:
+        existing = await db.scalar(select(Menu).where(Menu.code == menu.code))
+        if existing:
+            return error_response("菜单编码已存在", status_code=400)
+        db_menu = Menu(**menu.dict())
+        db.add(db_menu)
+        await db.commit()
+        await db.refresh(db_menu)
+        menu_tree.upsert(db_menu)
+        await authz_cache.invalidate_all()
+        return success_response(menu_to_node(db_menu))
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"创建菜单失败: {str(e)}")
+        return server_error("创建菜单失败")
+
+@app.put("/menus/{menu_id}")
+async def update_menu(menu_id: int, menu: schemas.MenuUpdate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(verify_token)):
+    """更新菜单"""
+    try:
+        db_menu = await db.scalar(select(Menu).where(Menu.id == menu_id))
+        if not db_menu:
+            return not_found_error(f"菜单不存在: {menu_id}")
+
+        update_data = menu.dict(exclude_unset=True)
+        if "code" in update_data and update_data["code"] != db_menu.code:
+            existing = await db.scalar(select(Menu).where(Menu.code == update_data["code"]))
+            if existing:
+                return error_response("菜单编码已存在", status_code=400)
+        if update_data.get("parent_id") == menu_id:
+            return error_response("不能把菜单设为自己的父菜单", status_code=400)
+
+        for key, value in update_data.items():
+            setattr(db_menu, key, value)
+        await db.commit()
+        await db.refresh(db_menu)
+        menu_tree.upsert(db_menu)
+        await authz_cache.invalidate_all()
+        return success_response(menu_to_node(db_menu))
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"更新菜单失败: {str(e)}")
+        return server_error("更新菜单失败")
+
+@app.delete("/menus/{menu_id}")
+async def delete_menu(menu_id: int, db: AsyncSession = Depends(get_async_db), _: dict = Depends(verify_token)):
+    """删除菜单，含有子菜单时不能删除"""
+    try:
+        db_menu = await db.scalar(select(Menu).where(Menu.id == menu_id))
+        if not db_menu:
+            return not_found_error(f"菜单不存在: {menu_id}")
+        child = await db.scalar(select(Menu.id).where(Menu.parent_id == menu_id).limit(1))
+        if child is not None:
+            return error_response("无法删除含有子菜单的菜单项", status_code=400)
+
+        await db.delete(db_menu)
+        await db.commit()
+        menu_tree.remove(menu_id)
+        await authz_cache.invalidate_all()
+        return success_response({"message": "菜单已删除"})
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"删除菜单失败: {str(e)}")
+        return server_error("删除菜单失败")
+
+@app.get("/user/menu-tree")
+async def get_user_menu_tree(request: Request, db: AsyncSession = Depends(get_async_db), token_data: dict = Depends(verify_token)):
+    """获取当前用户可见的菜单树"""
+    try:
+        user_id = token_data.get("sub")
+        if not user_id:
+            return unauthorized_error("无效的令牌")
+        snapshot = await authz_cache.get_snapshot(db, int(user_id))
+        # 快照命中缓存时不会经过 build_snapshot，菜单树需要单独加载或按 TTL 刷新
+        await db.run_sync(menu_tree.ensure_loaded)
+        etag, root_menus = menu_tree.get_tree(snapshot["menu_codes"])
+        return etag_response(request, root_menus, etag)
+    except Exception as e:
+        logger.error(f"获取用户菜单树失败: {str(e)}")
+        return server_error("获取用户菜单树失败")
+
 # 服务管理相关路由
 @app.get("/services")
 async def get_services(_: dict = Depends(verify_token)):
@@ -894,8 +1109,8 @@ async def get_services(_: dict = Depends(verify_token)):
     try:
         from .service_manager import service_manager
         
-        # 获取所有服务状态
-        services = service_manager.get_all_services_status()
+        # 获取所有服务状态，psutil 调用在线程池中执行，不阻塞事件循环
+        services = await asyncio.to_thread(service_manager.get_all_services_status)
         
         # 添加 Admin Service (当前服务)
         admin_service = {
@@ -972,168 +1187,116 @@ async def diagnose_service_endpoint(service_name: str, _: dict = Depends(verify_
         logger.error(f"诊断服务失败: {str(e)}")
         return server_error("诊断服务失败")
 
-@app.post("/services/{service_name}/start")
-async def start_service_endpoint(service_name: str, token_data: dict = Depends(verify_token)):
-    """启动服务"""
-    try:
-        from .service_manager import service_manager
-        
-        # 不允许启动 admin 服务(当前服务)
-        if service_name == "admin":
-            return error_response("管理服务已在运行中", status_code=400)
-        
-        # 启动服务（service_manager 会尝试短时间内检测端口占用）
-        operator = token_data.get("sub") if token_data else None
-        result = service_manager.start_service(service_name)
-
-        # 如果 start_service 已经确认为 running，直接返回成功
-        if result.get("status") == "running":
-            logger.info(f"服务启动成功: {service_name} (PID: {result.get('pid')}, Port: {result.get('port')})")
-            return success_response({
-                "message": f"服务 {service_name} 启动成功",
-                "pid": result.get("pid"),
-                "port": result.get("port")
-            })
-
-        # 否则再做一次最终状态检查并返回当前状态提示（保持幂等且友好提示）
-        status = service_manager.get_service_status(service_name)
-        if status.get("status") == "running":
-            logger.info(f"服务启动成功(后验检测): {service_name} (Port: {status.get('port')})")
-            return success_response({
-                "message": f"服务 {service_name} 启动成功",
-                "port": status.get("port")
-            })
-
-        logger.warning(f"服务启动命令已发送,但未能确认启动状态: {service_name}")
-        return success_response({
+def service_job_response(job, service_name: str):
+    """把单个服务的任务结果转换为原有的启动/停止/重启接口响应"""
+    result = job.results[service_name]
+    data = {"job_id": job.id, "pid": result.get("pid"), "port": result.get("port")}
+    if result["state"] == JOB_SUCCEEDED:
+        if job.action == "stop":
+            data["port_free"] = result.get("port_free", True)
+        data.update({"message": result["message"], "status": "stopped" if job.action == "stop" else "running"})
+        return success_response(data)
+
+    error_code = result.get("error_code")
+    if error_code == "NOT_READY":
+        # 进程已启动但健康检查未通过，保持原有的“命令已发送”提示
+        data.update({
             "message": f"服务 {service_name} 启动命令已发送,请稍后刷新查看状态",
-            "pid": result.get("pid"),
-            "port": result.get("port"),
-            "status": result.get("status")
+            "status": "starting",
+            "error_code": error_code,
         })
+        return success_response(data)
+    status_code = 503 if error_code in ("AUTO_RESTART", "PORT_OCCUPIED") else 400
+    return error_response(result["message"], status_code=status_code, data={"error_code": error_code, "job_id": job.id})
+
+async def run_service_job(action: str, service_name: str, force: bool, wait: bool, token_data: Optional[dict]):
+    """创建单个服务的启停任务
+
+    wait 为 true 时等待任务结束并返回原有格式的结果；为 false 时立即返回 202 和任务ID，
+    进度通过 GET /services/jobs/{job_id}/events 订阅。
+    """
+    operator = token_data.get("sub") if token_data else None
+    try:
+        job = service_jobs.create(action, [service_name], force=force, operator=operator)
     except ValueError as e:
         logger.error(f"无效的服务名称: {service_name}")
         return error_response(str(e), status_code=400)
-    except RuntimeError as e:
-        # 如果是 "已在运行" 的情况, 将启动视为幂等操作并返回运行状态
-        err_msg = str(e)
-        if "已在运行" in err_msg or "已在运行中" in err_msg or "already" in err_msg:
-            logger.info(f"启动服务请求: 服务 {service_name} 已在运行, 返回幂等成功")
-            return success_response({
-                "message": f"服务 {service_name} 已在运行",
-                "status": "running"
-            })
-        # 其他启动失败按 400 返回
-        logger.error(f"启动服务失败: {str(e)}")
-        return error_response(str(e), status_code=400, data={"error_code": "START_FAILED"})
-    except Exception as e:
-        logger.error(f"启动服务失败: {str(e)}", exc_info=True)
-        return server_error(f"启动服务失败: {str(e)}")
+    except ServiceBusy as e:
+        return error_response(str(e), status_code=409, data={"error_code": "SERVICE_BUSY"})
+
+    if not wait:
+        return success_response(job.to_dict(), message="任务已创建", status_code=202)
+    await job.done.wait()
+    return service_job_response(job, service_name)
+
+@app.post("/services/{service_name}/start")
+async def start_service_endpoint(service_name: str, wait: bool = True, token_data: dict = Depends(verify_token)):
+    """启动服务"""
+    # 不允许启动 admin 服务(当前服务)
+    if service_name == "admin":
+        return error_response("管理服务已在运行中", status_code=400)
+    return await run_service_job("start", service_name, False, wait, token_data)
 
 @app.post("/services/{service_name}/stop")
-async def stop_service_endpoint(service_name: str, force: bool = False, token_data: dict = Depends(verify_token)):
+async def stop_service_endpoint(service_name: str, force: bool = False, wait: bool = True, token_data: dict = Depends(verify_token)):
     """停止服务"""
-    try:
-        from .service_manager import service_manager
-        
-        # 不允许停止当前服务(admin)
-        if service_name == "admin":
-            return error_response("不能停止当前管理服务", status_code=400)
-        
-        operator = token_data.get("sub") if token_data else None
-        # 停止服务（stop_service 会尝试终止进程并验证端口释放）
-        result = service_manager.stop_service(service_name, force=force, operator=operator)
-
-        # 如果成功返回细化信息
-        if result.get("status") == "stopped":
-            logger.info(f"服务已停止: {service_name} (PID: {result.get('pid')})")
-            return success_response({
-                "message": f"服务 {service_name} 已停止",
-                "pid": result.get("pid"),
-                "port_free": result.get("port_free", True)
-            })
-
-        # 否则进行后验检查
-        status = service_manager.get_service_status(service_name)
-        if status.get("status") == "stopped":
-            return success_response({
-                "message": f"服务 {service_name} 已停止",
-                "port": status.get("port")
-            })
-
-        # 未能确认停止，返回错误
-        logger.error(f"停止服务未能确认: {service_name}")
-        return error_response(f"停止服务未能确认: {service_name}", status_code=500)
-    except ValueError as e:
-        logger.error(f"无效的服务名称: {service_name}")
-        return error_response(str(e), status_code=400)
-    except RuntimeError as e:
-        # 如果服务本就未运行,将其视为幂等的停止操作: 记录为 INFO 并返回成功
-        err_msg = str(e)
-        if "未运行" in err_msg or "not running" in err_msg:
-            logger.info(f"停止服务请求: 服务 {service_name} 未运行, 返回幂等停止结果")
-            return success_response({
-                "message": f"服务 {service_name} 未运行",
-                "status": "stopped"
-            })
-
-        # 识别自动重启场景并返回 503
-        if "AUTO_RESTART" in err_msg or "自动重启" in err_msg:
-            logger.error(f"停止服务失败(自动重启): {str(e)}")
-            return error_response(str(e), status_code=503, data={"error_code": "AUTO_RESTART"})
-
-        # 识别端口仍被占用的情况并返回 503
-        if "PORT_OCCUPIED" in err_msg or "端口" in err_msg:
-            logger.error(f"停止服务失败(端口占用): {str(e)}")
-            return error_response(str(e), status_code=503, data={"error_code": "PORT_OCCUPIED"})
-
-        logger.error(f"停止服务失败: {str(e)}")
-        return error_response(str(e), status_code=400)
-    except Exception as e:
-        logger.error(f"停止服务失败: {str(e)}", exc_info=True)
-        return server_error(f"停止服务失败: {str(e)}")
+    # 不允许停止当前服务(admin)
+    if service_name == "admin":
+        return error_response("不能停止当前管理服务", status_code=400)
+    return await run_service_job("stop", service_name, force, wait, token_data)
 
 @app.post("/services/{service_name}/restart")
-async def restart_service_endpoint(service_name: str, force: bool = False, token_data: dict = Depends(verify_token)):
+async def restart_service_endpoint(service_name: str, force: bool = False, wait: bool = True, token_data: dict = Depends(verify_token)):
     """重启服务"""
+    # 不允许重启当前服务(admin)
+    if service_name == "admin":
+        return error_response("不能重启当前管理服务", status_code=400)
+    return await run_service_job("restart", service_name, force, wait, token_data)
+
+@app.post("/services/jobs")
+async def create_service_job(job_data: schemas.ServiceJobCreate, token_data: dict = Depends(verify_token)):
+    """创建多服务启停任务，各服务并行执行，立即返回任务ID"""
+    if "admin" in job_data.services:
+        return error_response("不能操作当前管理服务", status_code=400)
+    operator = token_data.get("sub") if token_data else None
     try:
-        from .service_manager import service_manager
-        
-        # 不允许重启当前服务(admin)
-        if service_name == "admin":
-            return error_response("不能重启当前管理服务", status_code=400)
-        
-        operator = token_data.get("sub") if token_data else None
-        # 重启服务，支持 force
-        result = service_manager.restart_service(service_name, force=force, operator=operator)
-        
-        # 等待一小段时间让服务完全启动
-        import asyncio
-        await asyncio.sleep(2)
-        
-        # 验证服务状态
-        status = service_manager.get_service_status(service_name)
-        
-        if status["status"] == "running":
-            logger.info(f"服务重启成功: {service_name} (PID: {result['pid']}, Port: {result['port']})")
-            return success_response({
-                "message": f"服务 {service_name} 重启成功",
-                "pid": result["pid"],
-                "port": result["port"]
-            })
-        else:
-            logger.warning(f"服务重启命令已发送,但未能确认启动状态: {service_name}")
-            return success_response({
-                "message": f"服务 {service_name} 重启命令已发送,请稍后刷新查看状态",
-                "pid": result.get("pid"),
-                "port": result.get("port")
-            })
+        job = service_jobs.create(job_data.action, job_data.services, force=job_data.force, operator=operator)
     except ValueError as e:
-        logger.error(f"无效的服务名称: {service_name}")
-        return error_response(str(e), status_code=400)
-    except RuntimeError as e:
-        logger.error(f"重启服务失败: {str(e)}")
         return error_response(str(e), status_code=400)
-    except Exception as e:
-        logger.error(f"重启服务失败: {str(e)}", exc_info=True)
-        return server_error(f"重启服务失败: {str(e)}")
\ No newline at end of file
+    except ServiceBusy as e:
+        return error_response(str(e), status_code=409, data={"error_code": "SERVICE_BUSY"})
+    return success_response(job.to_dict(), message="任务已创建", status_code=202)
+
+@app.get("/services/jobs")
+async def list_service_jobs(_: dict = Depends(verify_token)):
+    """获取最近的服务启停任务"""
+    return success_response([job.to_dict() for job in service_jobs.list()])
+
+@app.get("/services/jobs/{job_id}")
+async def get_service_job(job_id: str, _: dict = Depends(verify_token)):
+    """获取服务启停任务详情和事件"""
+    job = service_jobs.get(job_id)
+    if job is None:
+        return error_response("任务不存在", status_code=404)
+    return success_response(job.to_dict(include_events=True))
+
+@app.get("/services/jobs/{job_id}/events")
+async def stream_service_job(job_id: str, _: dict = Depends(verify_token)):
+    """以 Server-Sent Events 推送任务进度，先回放已有事件，任务结束后关闭连接"""
+    job = service_jobs.get(job_id)
+    if job is None:
+        return error_response("任务不存在", status_code=404)
+
+    async def event_stream():
+        async for event in service_jobs.stream(job):
+            if not event:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        yield f"event: end\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
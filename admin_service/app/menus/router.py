@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
 from ..auth.security import get_current_user
 from . import models, schemas
 from ..users.models import User
+from ..authz import authz_cache
+from .tree import menu_tree
 from utils.logger import setup_logger
 from utils.response import (
-    success_response, error_response,
+    success_response, error_response, etag_response,
     forbidden_error, server_error, not_found_error
 )
 
@@ -29,6 +31,8 @@ async def create_menu(
         db.add(db_menu)
         db.commit()
         db.refresh(db_menu)
+        menu_tree.upsert(db_menu)
+        await authz_cache.invalidate_all()
         return success_response(schemas.Menu.from_orm(db_menu))
     except Exception as e:
         logger.error(f"创建菜单失败: {str(e)}")
@@ -36,13 +40,15 @@ async def create_menu(
 
 @router.get("", response_model=List[schemas.MenuTree])
 async def get_menus(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取菜单树"""
     try:
-        menus = db.query(models.Menu).filter(models.Menu.parent_id.is_(None)).all()
-        return success_response([schemas.MenuTree.from_orm(menu) for menu in menus])
+        menu_tree.ensure_loaded(db)
+        etag, menus = menu_tree.get_tree()
+        return etag_response(request, menus, etag)
     except Exception as e:
         logger.error(f"获取菜单列表失败: {str(e)}")
         return server_error("获取菜单列表失败")
@@ -84,6 +90,8 @@ async def update_menu(
         
         db.commit()
         db.refresh(db_menu)
+        menu_tree.upsert(db_menu)
+        await authz_cache.invalidate_all()
         return success_response(schemas.Menu.from_orm(db_menu))
     except Exception as e:
         logger.error(f"更新菜单失败: {str(e)}")
@@ -111,6 +119,8 @@ async def delete_menu(
         
         db.delete(db_menu)
         db.commit()
+        menu_tree.remove(menu_id)
+        await authz_cache.invalidate_all()
         return success_response(message=f"菜单已删除: {menu_id}")
     except Exception as e:
         logger.error(f"删除菜单失败: {str(e)}")
@@ -0,0 +1,236 @@
+"""菜单树模块
+
+一次查询加载整张 menus 表，建立 ID、编码和父子索引后缓存在进程内。
+完整菜单树、按菜单编码过滤的子树和前端路由列表都从缓存结构生成，
+菜单增删改时增量更新索引，并根据内容摘要生成 ETag。
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from utils.logger import setup_logger
+from .models import Menu
+
+# 设置日志记录器
+logger = setup_logger("menu_tree", "menus")
+
+# 菜单树配置
+MENU_TREE_CONFIG = {
+    # 多实例部署时其他实例修改菜单不会通知本进程，超过该时间（秒）后重新加载
+    "ttl": int(os.getenv("ADMIN_MENU_TREE_TTL", "60")),
+    # 按菜单编码过滤的子树缓存数量
+    "max_filtered": int(os.getenv("ADMIN_MENU_TREE_FILTER_CACHE", "256")),
+}
+
+# 菜单节点字段
+MENU_FIELDS = ("id", "name", "code", "path", "component", "icon", "parent_id", "sort_order", "visible", "created_at")
+
+
+def menu_to_node(menu: Menu) -> Dict[str, Any]:
+    """把菜单 ORM 对象转换为节点数据，不引用会话"""
+    node = {field: getattr(menu, field) for field in MENU_FIELDS}
+    node["created_at"] = menu.created_at.isoformat() if menu.created_at else None
+    return node
+
+
+def build_route_name(menu_code: str) -> str:
+    """根据菜单编码生成路由名称（首字母大写驼峰）"""
+    name_parts = menu_code.replace(":", "_").split("_")
+    return "".join([part.capitalize() for part in name_parts])
+
+
+class MenuTree:
+    """缓存的菜单树"""
+
+    def __init__(self, ttl: int, max_filtered: int):
+        self.ttl = ttl
+        self.max_filtered = max_filtered
+        self.lock = threading.RLock()
+        self.nodes: Dict[int, Dict[str, Any]] = {}
+        self.by_code: Dict[str, int] = {}
+        # 父菜单ID（根菜单为 None）-> 按排序的子菜单ID列表
+        self.children: Dict[Optional[int], List[int]] = {}
+        self.loaded_at = 0.0
+        self.digest = ""
+        # 过滤后的子树缓存: 菜单编码集合 -> (ETag, 菜单树)
+        self.filtered: Dict[frozenset, Tuple[str, List[Dict[str, Any]]]] = {}
+        self.full: Optional[List[Dict[str, Any]]] = None
+
+    def load(self, db: Session) -> None:
+        """一次查询加载全部菜单并重建索引"""
+        menus = db.query(Menu).all()
+        with self.lock:
+            self.nodes = {menu.id: menu_to_node(menu) for menu in menus}
+            self.by_code = {node["code"]: node["id"] for node in self.nodes.values()}
+            self.children = {}
+            for node in self.nodes.values():
+                self.children.setdefault(self.get_parent_key(node), []).append(node["id"])
+            for parent_id in self.children:
+                self.sort_children(parent_id)
+            self.loaded_at = time.monotonic()
+            self.changed()
+        logger.info(f"菜单树已加载: {len(self.nodes)} 个菜单")
+
+    def ensure_loaded(self, db: Session) -> None:
+        """首次访问或缓存过期时加载菜单"""
+        if not self.loaded_at or time.monotonic() - self.loaded_at > self.ttl:
+            self.load(db)
+
+    def get_parent_key(self, node: Dict[str, Any]) -> Optional[int]:
+        """获取节点在父子索引中的父键，父菜单不存在时视为根菜单"""
+        parent_id = node["parent_id"]
+        return parent_id if parent_id in self.nodes else None
+
+    def sort_children(self, parent_id: Optional[int]) -> None:
+        self.children[parent_id].sort(key=lambda menu_id: (self.nodes[menu_id]["sort_order"] or 0, menu_id))
+
+    def changed(self) -> None:
+        """索引变化后清空派生缓存并重新计算内容摘要"""
+        self.filtered = {}
+        self.full = None
+        content = json.dumps(
+            [self.nodes[menu_id] for menu_id in sorted(self.nodes)],
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        self.digest = hashlib.sha1(content.encode()).hexdigest()
+
+    def upsert(self, menu: Menu) -> None:
+        """菜单新增或更新后增量更新索引"""
+        node = menu_to_node(menu)
+        with self.lock:
+            if not self.loaded_at:
+                return
+            old = self.nodes.get(node["id"])
+            if old is not None:
+                self.children[self.get_parent_key(old)].remove(old["id"])
+                self.by_code.pop(old["code"], None)
+            self.nodes[node["id"]] = node
+            self.by_code[node["code"]] = node["id"]
+            parent_key = self.get_parent_key(node)
+            self.children.setdefault(parent_key, []).append(node["id"])
+            self.sort_children(parent_key)
+            if old is None:
+                # 父菜单晚于子菜单创建时，把挂在根下的子菜单移到新菜单下
+                orphans = [menu_id for menu_id in self.children.get(None, []) if self.nodes[menu_id]["parent_id"] == node["id"]]
+                for menu_id in orphans:
+                    self.children[None].remove(menu_id)
+                if orphans:
+                    self.children.setdefault(node["id"], []).extend(orphans)
+                    self.sort_children(node["id"])
+            self.changed()
+
+    def remove(self, menu_id: int) -> None:
+        """菜单删除后增量更新索引"""
+        with self.lock:
+            node = self.nodes.get(menu_id)
+            if node is None:
+                return
+            self.children[self.get_parent_key(node)].remove(menu_id)
+            # 子菜单失去父菜单后挂到根下，与加载时的处理一致
+            orphans = self.children.pop(menu_id, [])
+            del self.nodes[menu_id]
+            self.by_code.pop(node["code"], None)
+            if orphans:
+                self.children.setdefault(None, []).extend(orphans)
+                self.sort_children(None)
+            self.changed()
+
+    def get_codes(self) -> List[str]:
+        """获取全部菜单编码"""
+        return list(self.by_code)
+
+    def build_item(self, node: Dict[str, Any], children: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """生成菜单树节点"""
+        return {
+            "id": node["id"],
+            "title": node["name"],
+            "code": node["code"],
+            "path": node["path"],
+            "component": node["component"],
+            "icon": node["icon"],
+            "sort_order": node["sort_order"],
+            "visible": bool(node["visible"]),
+            "parent_id": node["parent_id"],
+            "created_at": node["created_at"],
+            "children": children,
+        }
+
+    def build_tree(self, allowed: Optional[set], parent_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """从父子索引生成菜单树
+
+        Args:
+            allowed: 允许的菜单ID集合，None 表示不过滤
+            parent_id: 父菜单ID
+        """
+        items = []
+        for menu_id in self.children.get(parent_id, []):
+            if allowed is not None and menu_id not in allowed:
+                continue
+            items.append(self.build_item(self.nodes[menu_id], self.build_tree(allowed, menu_id)))
+        return items
+
+    def get_tree(self, menu_codes: Optional[Iterable[str]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """获取菜单树及其 ETag
+
+        Args:
+            menu_codes: 允许的菜单编码，给定时只保留这些菜单及其祖先菜单
+
+        Returns:
+            Tuple[str, List[Dict[str, Any]]]: ETag 和菜单树
+        """
+        with self.lock:
+            if menu_codes is None:
+                if self.full is None:
+                    self.full = self.build_tree(None)
+                return f'W/"menus-{self.digest}"', self.full
+
+            codes = frozenset(menu_codes)
+            cached = self.filtered.get(codes)
+            if cached is not None:
+                return cached
+
+            allowed = set()
+            for code in codes:
+                menu_id = self.by_code.get(code)
+                # 保留祖先菜单以保证子树连通
+                while menu_id is not None and menu_id not in allowed:
+                    allowed.add(menu_id)
+                    menu_id = self.get_parent_key(self.nodes[menu_id])
+            codes_digest = hashlib.sha1(",".join(sorted(codes)).encode()).hexdigest()[:16]
+            result = (f'W/"menus-{self.digest}-{codes_digest}"', self.build_tree(allowed))
+            if len(self.filtered) >= self.max_filtered:
+                self.filtered.pop(next(iter(self.filtered)))
+            self.filtered[codes] = result
+            return result
+
+    def get_routes(self) -> List[Dict[str, Any]]:
+        """获取可见且配置了组件的菜单对应的前端路由，按排序值排列"""
+        with self.lock:
+            nodes = sorted(self.nodes.values(), key=lambda node: (node["sort_order"] or 0, node["id"]))
+            routes = []
+            for node in nodes:
+                if node["visible"] != 1 or node["component"] is None:
+                    continue
+                route = {
+                    "path": (node["path"] or "").lstrip("/"),  # 移除开头的/
+                    "name": build_route_name(node["code"]),
+                    "component": node["component"],
+                    "meta": {
+                        "title": node["name"],
+                        "icon": node["icon"] or "Document",
+                        "menuCode": node["code"]
+                    }
+                }
+                parent_id = node["parent_id"]
+                if parent_id in self.nodes:
+                    route["meta"]["parent"] = self.nodes[parent_id]["code"]
+                routes.append(route)
+            return routes
+
+
+# 全局菜单树
+menu_tree = MenuTree(ttl=MENU_TREE_CONFIG["ttl"], max_filtered=MENU_TREE_CONFIG["max_filtered"])
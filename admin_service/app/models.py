@@ -1,6 +1,6 @@
 """后台管理服务数据模型"""
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Table, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -17,12 +17,18 @@ user_roles = Table(
     "user_roles",
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id", ondelete='CASCADE')),
-    Column("role_id", Integer, ForeignKey("roles.id", ondelete='CASCADE'))
+    Column("role_id", Integer, ForeignKey("roles.id", ondelete='CASCADE')),
+    # 按角色筛选用户时由角色查到用户ID
+    Index("ix_user_roles_role_id_user_id", "role_id", "user_id")
 )
 
 class Role(Base):
     """角色模型"""
     __tablename__ = "roles"
+    # 列表按创建时间排序使用的索引（名称、编码前缀匹配使用唯一索引）
+    __table_args__ = (
+        Index("ix_roles_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, index=True)
@@ -0,0 +1,228 @@
+"""游标分页模块
+
+列表接口按排序键做键集分页（WHERE 排序键 > 上一页最后一行 ORDER BY 排序键 LIMIT n），
+翻到任意深度都只扫描一页的索引范围，不再像 OFFSET 那样线性变慢。
+游标是上一页最后一行排序键的值经 base64 编码后的不透明令牌。
+
+总数改为可选：优先使用 information_schema 中的表行数估计值并在进程内缓存，
+小表估计误差大，直接执行精确 COUNT（同样缓存）。
+"""
+
+import os
+import json
+import time
+import base64
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, or_, false, text, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.logger import setup_logger
+
+# 设置日志记录器
+logger = setup_logger("admin_pagination", "admin")
+
+# 分页配置
+PAGINATION_CONFIG = {
+    # 单页最大条数
+    "max_limit": int(os.getenv("ADMIN_PAGE_MAX_LIMIT", "500")),
+    # 总数缓存时间（秒）
+    "count_ttl": int(os.getenv("ADMIN_COUNT_CACHE_TTL", "30")),
+    # 估计行数低于该值时执行精确 COUNT
+    "exact_count_threshold": int(os.getenv("ADMIN_EXACT_COUNT_THRESHOLD", "10000")),
+    # 带筛选条件时最多统计的行数，超出时总数为估计值
+    "filtered_count_limit": int(os.getenv("ADMIN_FILTERED_COUNT_LIMIT", "10000")),
+}
+
+TABLE_ROWS_SQL = text(
+    "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+)
+
+
+class CursorError(ValueError):
+    """游标令牌无效"""
+
+
+# 排序键: (列, 是否降序)
+SortKey = Sequence[Tuple[Any, bool]]
+
+
+def sort_key_name(sort_key: SortKey) -> str:
+    """排序键签名，写入游标以拒绝在其他排序方式下使用的游标"""
+    return ",".join(f"{'-' if desc else ''}{column.key}" for column, desc in sort_key)
+
+
+def encode_cursor(sort_key: SortKey, values: Sequence[Any]) -> str:
+    """把一行的排序键值编码为游标令牌"""
+    payload = {
+        "k": sort_key_name(sort_key),
+        "v": [value.isoformat() if isinstance(value, (datetime, date)) else value for value in values],
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort_key: SortKey, token: str) -> List[Any]:
+    """解析游标令牌
+
+    Raises:
+        CursorError: 令牌格式错误或与当前排序方式不一致
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        values = payload["v"]
+        if payload["k"] != sort_key_name(sort_key) or len(values) != len(sort_key):
+            raise CursorError("游标与当前排序方式不一致")
+        decoded = []
+        for (column, _), value in zip(sort_key, values):
+            python_type = column.type.python_type
+            if value is not None and python_type in (datetime, date):
+                value = python_type.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except CursorError:
+        raise
+    except Exception:
+        raise CursorError("无效的分页游标")
+
+
+def _equal_to(column, value):
+    """排序列等于游标值，NULL 用 IS NULL 比较"""
+    return column.is_(None) if value is None else column == value
+
+
+def _after(column, desc: bool, value):
+    """排序列位于游标值之后，没有更靠后的值时返回 None
+
+    MySQL 中 NULL 小于任何值：升序时排在最前，降序时排在最后。
+    """
+    if not column.nullable:
+        return column < value if desc else column > value
+    if desc:
+        return None if value is None else or_(column < value, column.is_(None))
+    return column.isnot(None) if value is None else column > value
+
+
+def seek_condition(sort_key: SortKey, values: Sequence[Any]):
+    """生成“位于游标之后”的条件
+
+    展开为 (a > x) OR (a = x AND b > y) 的形式，而不是行构造器比较，
+    MySQL 对展开形式能稳定使用复合索引做范围扫描。
+    可为 NULL 的列按 NULL 最小处理，与 ORDER BY 的顺序一致；
+    不用 coalesce() 包住列，以免失去索引。
+    """
+    clauses = []
+    for position, (column, desc) in enumerate(sort_key):
+        after = _after(column, desc, values[position])
+        if after is not None:
+            equal = [_equal_to(sort_key[i][0], values[i]) for i in range(position)]
+            clauses.append(and_(*equal, after))
+    return or_(*clauses) if clauses else false()
+
+
+def clamp_limit(limit: int) -> int:
+    """把单页条数限制在 1 到 max_limit 之间"""
+    return max(1, min(limit, PAGINATION_CONFIG["max_limit"]))
+
+
+def page_statement(statement, sort_key: SortKey, limit: int, cursor: Optional[str] = None, skip: int = 0):
+    """生成获取一页数据的查询语句，多取一行用于判断是否还有下一页
+
+    fetch_page 和 scripts/explain_admin_queries.py 都通过本函数生成语句。
+
+    Raises:
+        CursorError: 游标无效
+    """
+    if cursor:
+        statement = statement.where(seek_condition(sort_key, decode_cursor(sort_key, cursor)))
+    elif skip > 0:
+        statement = statement.offset(skip)
+    statement = statement.order_by(*[column.desc() if desc else column.asc() for column, desc in sort_key])
+    return statement.limit(limit + 1)
+
+
+async def fetch_page(
+    db: AsyncSession,
+    statement,
+    sort_key: SortKey,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """按排序键获取一页数据
+
+    Args:
+        statement: 返回 ORM 实体的 select 语句，可带过滤条件
+        sort_key: 排序键，最后一列必须唯一且不为 NULL（通常为主键）
+        limit: 单页条数
+        cursor: 上一页返回的游标，None 表示第一页
+        skip: 兼容旧客户端的偏移量，仅在没有游标时使用
+
+    Returns:
+        Tuple[List[Any], Optional[str]]: 当前页数据和下一页游标（没有下一页时为 None）
+
+    Raises:
+        CursorError: 游标无效
+    """
+    rows = (await db.scalars(page_statement(statement, sort_key, limit, cursor, skip))).all()
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = rows[:limit]
+    last = rows[-1]
+    return list(rows), encode_cursor(sort_key, [getattr(last, column.key) for column, _ in sort_key])
+
+
+async def count_matching(db: AsyncSession, statement) -> Tuple[int, bool]:
+    """统计带筛选条件的查询结果数，最多统计 filtered_count_limit 行
+
+    Args:
+        statement: 只选择主键列的 select 语句，带与列表查询相同的筛选条件
+
+    Returns:
+        Tuple[int, bool]: 总数和是否达到统计上限（此时为下限估计）
+    """
+    cap = PAGINATION_CONFIG["filtered_count_limit"]
+    total = await db.scalar(select(func.count()).select_from(statement.limit(cap + 1).subquery()))
+    if total > cap:
+        return cap, True
+    return total, False
+
+
+class CountCache:
+    """表总数缓存"""
+
+    def __init__(self, ttl: int, exact_threshold: int):
+        self.ttl = ttl
+        self.exact_threshold = exact_threshold
+        # 表名 -> (过期时间, 总数, 是否为估计值)
+        self.entries: Dict[str, Tuple[float, int, bool]] = {}
+
+    async def get(self, db: AsyncSession, model) -> Tuple[int, bool]:
+        """获取表总数
+
+        Returns:
+            Tuple[int, bool]: 总数和是否为估计值
+        """
+        table = model.__tablename__
+        cached = self.entries.get(table)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], cached[2]
+
+        estimated = True
+        total = None
+        try:
+            total = await db.scalar(TABLE_ROWS_SQL, {"table": table})
+        except Exception as e:
+            logger.warning(f"获取表行数估计值失败: {table} - {str(e)}")
+        if total is None or total < self.exact_threshold:
+            total = await db.scalar(select(func.count()).select_from(model))
+            estimated = False
+        total = int(total)
+        self.entries[table] = (time.monotonic() + self.ttl, total, estimated)
+        return total, estimated
+
+    def invalidate(self, model) -> None:
+        """新增或删除数据后清除缓存的总数"""
+        self.entries.pop(model.__tablename__, None)
+
+
+# 全局总数缓存
+count_cache = CountCache(ttl=PAGINATION_CONFIG["count_ttl"], exact_threshold=PAGINATION_CONFIG["exact_count_threshold"])
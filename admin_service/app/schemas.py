@@ -1,7 +1,7 @@
 """后台管理服务数据模式"""
 
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 
 class PermissionBase(BaseModel):
@@ -90,4 +90,78 @@ class User(UserBase):
     roles: List[Role] = []
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class UserBulkUpdateItem(UserUpdate):
+    """批量更新用户的单项"""
+    id: int
+
+class UserBulkCreate(BaseModel):
+    """批量创建用户"""
+    users: List[UserCreate]
+
+class UserBulkUpdate(BaseModel):
+    """批量更新用户"""
+    users: List[UserBulkUpdateItem]
+
+class UserRoleAssignment(BaseModel):
+    """用户角色分配"""
+    user_id: int
+    role_ids: List[int]
+
+class UserRoleBulkAssign(BaseModel):
+    """批量分配用户角色
+
+    mode 为 replace 时替换用户的全部角色，add 时追加，remove 时移除。
+    """
+    assignments: List[UserRoleAssignment]
+    mode: Literal["replace", "add", "remove"] = "replace"
+
+class RoleMenuBinding(BaseModel):
+    """角色菜单绑定"""
+    role_id: int
+    menu_codes: List[str]
+
+class RoleMenuBulkSet(BaseModel):
+    """批量设置角色菜单"""
+    bindings: List[RoleMenuBinding]
+
+class MenuBase(BaseModel):
+    """菜单基础模型"""
+    name: str
+    code: str
+    path: str
+    component: Optional[str] = None
+    icon: Optional[str] = None
+    parent_id: Optional[int] = None
+    sort_order: int = 0
+    visible: int = 1
+
+class MenuCreate(MenuBase):
+    """菜单创建模型"""
+    pass
+
+class MenuUpdate(BaseModel):
+    """菜单更新模型"""
+    name: Optional[str] = None
+    code: Optional[str] = None
+    path: Optional[str] = None
+    component: Optional[str] = None
+    icon: Optional[str] = None
+    parent_id: Optional[int] = None
+    sort_order: Optional[int] = None
+    visible: Optional[int] = None
+
+class TokenRefresh(BaseModel):
+    """刷新令牌请求模型"""
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    """注销请求模型"""
+    refresh_token: Optional[str] = None
+
+class ServiceJobCreate(BaseModel):
+    """服务启停任务请求模型，多个服务并行执行"""
+    action: Literal["start", "stop", "restart"]
+    services: List[str]
+    force: bool = False
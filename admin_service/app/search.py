@@ -0,0 +1,124 @@
+"""列表筛选与排序模块
+
+把用户、角色列表的查询参数转换为 SQL 条件和游标分页排序键。
+每个筛选条件和排序方式都有对应的索引（见模型的 __table_args__，由 database.init_db 检查创建）：
+用户名、邮箱、角色名称、角色编码的前缀匹配使用唯一索引做范围扫描，
+启用状态和创建时间使用复合索引，按角色编码筛选用户通过 user_roles(role_id, user_id) 索引半连接。
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from .models import Role, user_roles
+from .users.models import User
+from .pagination import SortKey
+
+
+class SearchError(ValueError):
+    """查询参数无效"""
+
+
+# 用户列表排序方式，“-”前缀表示降序；其他列可为 NULL（唯一索引允许多个 NULL），以ID作为最后一列保证游标唯一
+USER_SORTS: Dict[str, SortKey] = {
+    "id": ((User.id, False),),
+    "-id": ((User.id, True),),
+    "created_at": ((User.created_at, False), (User.id, False)),
+    "-created_at": ((User.created_at, True), (User.id, True)),
+    "username": ((User.username, False), (User.id, False)),
+    "-username": ((User.username, True), (User.id, True)),
+}
+
+# 角色列表排序方式
+ROLE_SORTS: Dict[str, SortKey] = {
+    "id": ((Role.id, False),),
+    "-id": ((Role.id, True),),
+    "created_at": ((Role.created_at, False), (Role.id, False)),
+    "-created_at": ((Role.created_at, True), (Role.id, True)),
+    "code": ((Role.code, False), (Role.id, False)),
+    "-code": ((Role.code, True), (Role.id, True)),
+    "name": ((Role.name, False), (Role.id, False)),
+    "-name": ((Role.name, True), (Role.id, True)),
+}
+
+
+def get_sort_key(sorts: Dict[str, SortKey], sort: str) -> SortKey:
+    """获取排序键
+
+    Raises:
+        SearchError: 不支持的排序方式
+    """
+    sort_key = sorts.get(sort)
+    if sort_key is None:
+        raise SearchError(f"不支持的排序方式: {sort}，可选值: {', '.join(sorts)}")
+    return sort_key
+
+
+def escape_like(value: str) -> str:
+    """转义 LIKE 通配符"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def prefix_match(column, value: str):
+    """前缀匹配条件
+
+    匹配模式在 Python 中拼好后作为常量传入，MySQL 可以把它转换为索引范围扫描。
+    """
+    return column.like(escape_like(value) + "%", escape="\\")
+
+
+def created_range(column, created_from: Optional[datetime], created_to: Optional[datetime]) -> list:
+    """创建时间范围条件，包含起点，不包含终点
+
+    Raises:
+        SearchError: 起点晚于终点
+    """
+    if created_from and created_to and created_from >= created_to:
+        raise SearchError("created_from 必须早于 created_to")
+    conditions = []
+    if created_from:
+        conditions.append(column >= created_from)
+    if created_to:
+        conditions.append(column < created_to)
+    return conditions
+
+
+def user_conditions(
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    role_code: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> List:
+    """用户列表筛选条件"""
+    conditions = []
+    if username:
+        conditions.append(prefix_match(User.username, username))
+    if email:
+        conditions.append(prefix_match(User.email, email))
+    if is_active is not None:
+        conditions.append(User.is_active == is_active)
+    if role_code:
+        conditions.append(User.id.in_(
+            select(user_roles.c.user_id)
+            .join(Role, Role.id == user_roles.c.role_id)
+            .where(Role.code == role_code)
+        ))
+    conditions.extend(created_range(User.created_at, created_from, created_to))
+    return conditions
+
+
+def role_conditions(
+    name: Optional[str] = None,
+    code: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> List:
+    """角色列表筛选条件"""
+    conditions = []
+    if name:
+        conditions.append(prefix_match(Role.name, name))
+    if code:
+        conditions.append(prefix_match(Role.code, code))
+    conditions.extend(created_range(Role.created_at, created_from, created_to))
+    return conditions
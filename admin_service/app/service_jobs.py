@@ -0,0 +1,286 @@
+"""服务启停任务模块
+
+服务的启动、停止和重启作为后台任务执行：接口立即得到任务ID，ServiceManager 中
+会阻塞的调用（subprocess、systemctl、等待进程退出、端口轮询）在线程中运行，
+不占用事件循环。每个任务有状态机和事件列表，可通过 SSE 实时订阅进度；
+一个任务可以同时操作多个服务，各服务并行执行，启动后以健康检查接口判定就绪。
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+from utils.logger import setup_logger
+from .service_manager import service_manager
+
+# 设置日志记录器
+logger = setup_logger("service_jobs", "service_manager")
+
+# 服务任务配置
+SERVICE_JOB_CONFIG = {
+    # 保留的历史任务数
+    "history": int(os.getenv("SERVICE_JOB_HISTORY", "100")),
+    # 启动后等待健康检查通过的时间（秒）
+    "ready_timeout": float(os.getenv("SERVICE_READY_TIMEOUT", "30")),
+    "ready_interval": float(os.getenv("SERVICE_READY_INTERVAL", "0.5")),
+    # 健康检查路径，任意非 5xx 响应视为就绪，可按服务覆盖，例如 SERVICE_HEALTH_PATH_SYSTEM=/health
+    "health_path": os.getenv("SERVICE_HEALTH_PATH", "/"),
+}
+
+# 任务动作
+JOB_ACTIONS = ("start", "stop", "restart")
+
+# 任务状态: pending -> running -> succeeded / failed
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class ServiceBusy(Exception):
+    """服务已有进行中的任务"""
+
+
+class ServiceJobError(RuntimeError):
+    """服务操作失败，附带错误码"""
+
+    def __init__(self, message: str, error_code: str):
+        super().__init__(message)
+        self.error_code = error_code
+
+
+def get_stop_error_code(message: str) -> str:
+    """根据 ServiceManager 的停止错误信息识别错误码"""
+    if "AUTO_RESTART" in message or "自动重启" in message:
+        return "AUTO_RESTART"
+    if "PORT_OCCUPIED" in message or "端口" in message:
+        return "PORT_OCCUPIED"
+    return "STOP_FAILED"
+
+
+class ServiceJob:
+    """服务启停任务"""
+
+    def __init__(self, action: str, services: List[str], force: bool, operator: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.services = services
+        self.force = force
+        self.operator = operator
+        self.state = JOB_PENDING
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # 服务名称 -> 执行结果
+        self.results: Dict[str, Dict[str, Any]] = {
+            name: {"state": JOB_PENDING, "message": None} for name in services
+        }
+        self.events: List[Dict[str, Any]] = []
+        self.changed = asyncio.Condition()
+        self.done = asyncio.Event()
+
+    async def emit(self, service: Optional[str], stage: str, message: str) -> None:
+        """记录事件并通知订阅者"""
+        event = {
+            "seq": len(self.events) + 1,
+            "time": time.time(),
+            "service": service,
+            "stage": stage,
+            "message": message,
+        }
+        self.events.append(event)
+        logger.info(f"服务任务 {self.id} [{self.action}] {service or '-'} {stage}: {message}")
+        async with self.changed:
+            self.changed.notify_all()
+
+    def to_dict(self, include_events: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "action": self.action,
+            "services": self.services,
+            "force": self.force,
+            "operator": self.operator,
+            "state": self.state,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "results": self.results,
+        }
+        if include_events:
+            data["events"] = self.events
+        return data
+
+
+class ServiceJobManager:
+    """创建、执行和跟踪服务启停任务"""
+
+    def __init__(self, history: int):
+        self.history = history
+        self.jobs: "OrderedDict[str, ServiceJob]" = OrderedDict()
+        # 服务名称 -> 正在操作该服务的任务ID
+        self.active: Dict[str, str] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def create(self, action: str, services: List[str], force: bool = False, operator: Optional[str] = None) -> ServiceJob:
+        """创建任务并在后台执行
+
+        Raises:
+            ValueError: 动作或服务名称无效
+            ServiceBusy: 某个服务已有进行中的任务
+        """
+        if action not in JOB_ACTIONS:
+            raise ValueError(f"未知的操作: {action}")
+        services = list(dict.fromkeys(services))
+        if not services:
+            raise ValueError("未指定服务")
+        for name in services:
+            if name not in service_manager.service_config:
+                raise ValueError(f"未知的服务: {name}")
+            if name in self.active:
+                raise ServiceBusy(f"服务 {name} 正在执行任务 {self.active[name]}")
+
+        job = ServiceJob(action, services, force, operator)
+        for name in services:
+            self.active[name] = job.id
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.history:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if not oldest.done.is_set():
+                break
+            del self.jobs[oldest_id]
+        self.tasks[job.id] = asyncio.get_running_loop().create_task(self.run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[ServiceJob]:
+        return list(reversed(self.jobs.values()))
+
+    async def run(self, job: ServiceJob) -> None:
+        """并行执行任务中的各个服务"""
+        job.state = JOB_RUNNING
+        await job.emit(None, "running", f"开始{job.action}: {', '.join(job.services)}")
+        try:
+            await asyncio.gather(*(self.run_service(job, name) for name in job.services))
+            failed = [name for name, result in job.results.items() if result["state"] == JOB_FAILED]
+            job.state = JOB_FAILED if failed else JOB_SUCCEEDED
+            message = f"失败的服务: {', '.join(failed)}" if failed else "全部完成"
+        except Exception as e:
+            logger.error(f"服务任务执行异常 {job.id}: {e}", exc_info=True)
+            job.state = JOB_FAILED
+            message = str(e)
+        finally:
+            for name in job.services:
+                if self.active.get(name) == job.id:
+                    del self.active[name]
+            self.tasks.pop(job.id, None)
+            service_manager.invalidate_status()
+        job.finished_at = time.time()
+        await job.emit(None, job.state, message)
+        job.done.set()
+
+    async def run_service(self, job: ServiceJob, name: str) -> None:
+        """对单个服务执行任务动作"""
+        result = job.results[name]
+        result["state"] = JOB_RUNNING
+        try:
+            if job.action in ("stop", "restart"):
+                await self.stop(job, name)
+            if job.action in ("start", "restart"):
+                await self.start(job, name)
+            result["state"] = JOB_SUCCEEDED
+        except Exception as e:
+            error_code = e.error_code if isinstance(e, ServiceJobError) else "OPERATION_FAILED"
+            result.update({"state": JOB_FAILED, "message": str(e), "error_code": error_code})
+            await job.emit(name, "failed", str(e))
+
+    async def stop(self, job: ServiceJob, name: str) -> None:
+        await job.emit(name, "stopping", "正在停止")
+        try:
+            stopped = await asyncio.to_thread(service_manager.stop_service, name, job.force, job.operator)
+        except RuntimeError as e:
+            if "未运行" not in str(e):
+                raise ServiceJobError(str(e), get_stop_error_code(str(e)))
+            job.results[name]["message"] = f"服务 {name} 未运行"
+            await job.emit(name, "stopped", "服务未运行")
+            return
+        job.results[name].update({"message": f"服务 {name} 已停止", "pid": stopped.get("pid"), "port_free": stopped.get("port_free")})
+        await job.emit(name, "stopped", f"已停止 (PID: {stopped.get('pid')})")
+
+    async def start(self, job: ServiceJob, name: str) -> None:
+        await job.emit(name, "starting", "正在启动")
+        try:
+            started = await asyncio.to_thread(service_manager.start_service, name)
+        except RuntimeError as e:
+            if "已在运行" not in str(e):
+                raise ServiceJobError(str(e), "START_FAILED")
+            job.results[name]["message"] = f"服务 {name} 已在运行"
+            await job.emit(name, "ready", "服务已在运行")
+            return
+        job.results[name].update({"pid": started.get("pid"), "port": started.get("port")})
+        await job.emit(name, "started", f"进程已启动 (PID: {started.get('pid')})，等待健康检查")
+        elapsed = await self.wait_ready(name)
+        verb = "重启" if job.action == "restart" else "启动"
+        job.results[name].update({"message": f"服务 {name} {verb}成功", "ready_seconds": round(elapsed, 2)})
+        await job.emit(name, "ready", f"健康检查通过，用时 {elapsed:.1f} 秒")
+
+    async def wait_ready(self, name: str) -> float:
+        """轮询服务健康检查接口直到就绪
+
+        Returns:
+            float: 就绪用时（秒）
+
+        Raises:
+            ServiceJobError: 超时仍未就绪
+        """
+        port = service_manager.service_config[name]["port"]
+        health_path = os.getenv(f"SERVICE_HEALTH_PATH_{name.upper()}", SERVICE_JOB_CONFIG["health_path"])
+        url = f"http://127.0.0.1:{port}{health_path}"
+        started_at = time.monotonic()
+        deadline = started_at + SERVICE_JOB_CONFIG["ready_timeout"]
+        async with httpx.AsyncClient(timeout=SERVICE_JOB_CONFIG["ready_interval"] * 4) as client:
+            while time.monotonic() < deadline:
+                try:
+                    response = await client.get(url)
+                    if response.status_code < 500:
+                        return time.monotonic() - started_at
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(SERVICE_JOB_CONFIG["ready_interval"])
+        raise ServiceJobError(
+            f"服务 {name} 在 {SERVICE_JOB_CONFIG['ready_timeout']:.0f} 秒内未通过健康检查 ({url})", "NOT_READY"
+        )
+
+    async def stream(self, job: ServiceJob) -> AsyncIterator[Dict[str, Any]]:
+        """依次产出任务事件，先回放已有事件，任务结束后停止"""
+        sent = 0
+        while True:
+            timed_out = False
+            async with job.changed:
+                if sent >= len(job.events) and not job.done.is_set():
+                    try:
+                        await asyncio.wait_for(job.changed.wait(), timeout=15)
+                    except asyncio.TimeoutError:
+                        timed_out = True
+            # 在锁外产出，避免慢客户端阻塞任务写入事件
+            if timed_out:
+                # 定期产出空事件作为心跳，保持代理连接
+                yield {}
+                continue
+            while sent < len(job.events):
+                yield job.events[sent]
+                sent += 1
+            if job.done.is_set() and sent >= len(job.events):
+                return
+
+    async def shutdown(self) -> None:
+        """取消进行中的任务"""
+        for task in list(self.tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+
+# 全局服务任务管理器
+service_jobs = ServiceJobManager(history=SERVICE_JOB_CONFIG["history"])
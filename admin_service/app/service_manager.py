@@ -1,10 +1,17 @@
 """
 服务管理器
 用于管理微服务的启动、停止和状态检查
+
+状态检查不再为每个服务扫描一遍主机上的全部套接字：优先用 service_pids.json 中记录的进程
+检查其自身的监听端口，找不到时才对所有未确定的服务做一次 net_connections 快照。
+CPU 和内存由后台任务定期采样，查询状态时直接读取采样结果，状态快照短时间缓存。
 """
 
 import os
 import sys
+import time
+import asyncio
+import threading
 import subprocess
 import psutil
 import json
@@ -17,6 +24,14 @@ logger = setup_logger("service_manager", "service_manager")
 # 服务进程信息存储文件
 PID_FILE = Path(__file__).parent.parent / "service_pids.json"
 
+# 服务状态采集配置
+STATUS_CONFIG = {
+    # 状态快照缓存时间（秒），多个页面同时轮询时共享一次采集
+    "cache_ttl": float(os.getenv("SERVICE_STATUS_CACHE_TTL", "2")),
+    # 后台 CPU/内存采样间隔（秒）
+    "sample_interval": float(os.getenv("SERVICE_STATUS_SAMPLE_INTERVAL", "5")),
+}
+
 
 class ServiceManager:
     """服务管理器"""
@@ -49,25 +64,165 @@ class ServiceManager:
             }
         }
         self.project_root = Path(__file__).parent.parent.parent
+        self.lock = threading.RLock()
+        # PID 文件缓存，文件修改时间变化时重新读取
+        self.pid_file_mtime: Optional[float] = None
+        self.pid_cache: Dict[str, int] = {}
+        # 复用 Process 对象，cpu_percent 才能计算两次调用之间的占用率
+        self.processes: Dict[int, psutil.Process] = {}
+        # PID -> 最近一次采样的 CPU/内存
+        self.samples: Dict[int, Dict[str, float]] = {}
+        # (过期时间, 全部服务状态)
+        self.status_cache: Optional[tuple] = None
+        self.sampler_task: Optional[asyncio.Task] = None
     
     def _load_pids(self) -> Dict[str, int]:
-        """加载已保存的进程ID"""
-        if PID_FILE.exists():
+        """加载已保存的进程ID，文件未变化时使用缓存"""
+        try:
+            mtime = PID_FILE.stat().st_mtime
+        except FileNotFoundError:
+            return {}
+        with self.lock:
+            if mtime == self.pid_file_mtime:
+                return dict(self.pid_cache)
             try:
                 with open(PID_FILE, 'r') as f:
-                    return json.load(f)
+                    self.pid_cache = json.load(f)
+                self.pid_file_mtime = mtime
             except Exception as e:
                 logger.warning(f"加载PID文件失败: {e}")
-        return {}
+                return {}
+            return dict(self.pid_cache)
     
     def _save_pids(self, pids: Dict[str, int]):
         """保存进程ID到文件"""
         try:
-            with open(PID_FILE, 'w') as f:
-                json.dump(pids, f, indent=2)
+            with self.lock:
+                with open(PID_FILE, 'w') as f:
+                    json.dump(pids, f, indent=2)
+                self.pid_cache = dict(pids)
+                self.pid_file_mtime = PID_FILE.stat().st_mtime
+            self.invalidate_status()
         except Exception as e:
             logger.error(f"保存PID文件失败: {e}")
     
+    def _snapshot_listeners(self) -> Optional[Dict[int, Optional[int]]]:
+        """扫描一次主机上的 TCP 监听端口
+
+        Returns:
+            Optional[Dict[int, Optional[int]]]: 端口 -> 监听进程PID，权限不足时返回 None
+        """
+        try:
+            return {
+                conn.laddr.port: conn.pid
+                for conn in psutil.net_connections(kind="tcp")
+                if conn.status == psutil.CONN_LISTEN
+            }
+        except (psutil.AccessDenied, PermissionError):
+            return None
+    
+    def _get_cached_process(self, pid: Optional[int]) -> Optional[psutil.Process]:
+        """获取缓存的进程对象，进程已退出时返回 None"""
+        if not pid:
+            return None
+        with self.lock:
+            process = self.processes.get(pid)
+        try:
+            if process is None:
+                process = psutil.Process(pid)
+            if not process.is_running():
+                raise psutil.NoSuchProcess(pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            with self.lock:
+                self.processes.pop(pid, None)
+                self.samples.pop(pid, None)
+            return None
+        with self.lock:
+            self.processes[pid] = process
+        return process
+    
+    def _process_listens_on(self, process: psutil.Process, port: int) -> bool:
+        """检查进程自身是否监听指定端口，只读取该进程的套接字"""
+        try:
+            connections = process.net_connections(kind="tcp") if hasattr(process, "net_connections") else process.connections(kind="tcp")
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+            return False
+        return any(conn.laddr.port == port and conn.status == psutil.CONN_LISTEN for conn in connections)
+    
+    def _resolve_listeners(self, service_names: List[str]) -> Dict[str, Dict]:
+        """确定服务是否在运行及其监听进程
+
+        Returns:
+            Dict[str, Dict]: 服务名称 -> {"running": bool, "pid": Optional[int]}
+        """
+        pids = self._load_pids()
+        resolved: Dict[str, Dict] = {}
+        for service_name in service_names:
+            port = self.service_config[service_name]["port"]
+            process = self._get_cached_process(pids.get(service_name))
+            if process is not None and self._process_listens_on(process, port):
+                resolved[service_name] = {"running": True, "pid": process.pid}
+        
+        unresolved = [name for name in service_names if name not in resolved]
+        if unresolved:
+            listeners = self._snapshot_listeners()
+            for service_name in unresolved:
+                port = self.service_config[service_name]["port"]
+                if listeners is None:
+                    resolved[service_name] = {"running": self._is_port_in_use(port), "pid": None}
+                else:
+                    resolved[service_name] = {"running": port in listeners, "pid": listeners.get(port)}
+        return resolved
+    
+    def sample(self) -> None:
+        """采样已知服务进程的 CPU 和内存占用，由后台任务在线程中定期调用"""
+        with self.lock:
+            processes = list(self.processes.items())
+        samples = {}
+        for pid, process in processes:
+            try:
+                with process.oneshot():
+                    samples[pid] = {
+                        "cpu_percent": process.cpu_percent(),
+                        "memory_mb": process.memory_info().rss / 1024 / 1024,
+                    }
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                with self.lock:
+                    self.processes.pop(pid, None)
+        with self.lock:
+            self.samples = samples
+    
+    async def run_sampler(self, interval: float) -> None:
+        """后台采样循环"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logger.warning(f"服务进程采样失败: {e}")
+            await asyncio.sleep(interval)
+    
+    def start_sampler(self) -> None:
+        """在当前事件循环中启动后台采样任务"""
+        if self.sampler_task is None:
+            self.sampler_task = asyncio.get_running_loop().create_task(
+                self.run_sampler(STATUS_CONFIG["sample_interval"])
+            )
+    
+    async def stop_sampler(self) -> None:
+        """停止后台采样任务"""
+        if self.sampler_task is not None:
+            self.sampler_task.cancel()
+            try:
+                await self.sampler_task
+            except asyncio.CancelledError:
+                pass
+            self.sampler_task = None
+    
+    def invalidate_status(self) -> None:
+        """服务启停后清除状态快照缓存"""
+        with self.lock:
+            self.status_cache = None
+    
     def _is_port_in_use(self, port: int) -> bool:
         """检查端口是否被占用"""
         try:
@@ -87,52 +242,64 @@ class ServiceManager:
     
     def _get_process_by_port(self, port: int) -> Optional[psutil.Process]:
         """根据端口获取进程"""
-        try:
-            for conn in psutil.net_connections():
-                if conn.laddr.port == port and conn.status == 'LISTEN':
-                    return psutil.Process(conn.pid)
-        except (psutil.AccessDenied, psutil.NoSuchProcess, PermissionError):
-            pass
-        return None
+        listeners = self._snapshot_listeners()
+        if listeners is None:
+            return None
+        return self._get_cached_process(listeners.get(port))
     
-    def get_service_status(self, service_name: str) -> Dict:
-        """获取服务状态"""
-        if service_name not in self.service_config:
-            raise ValueError(f"未知的服务: {service_name}")
-        
+    def _build_status(self, service_name: str, listener: Dict) -> Dict:
+        """根据监听信息和采样结果生成服务状态"""
         config = self.service_config[service_name]
-        port = config["port"]
-        
-        # 检查端口是否被占用
-        is_running = self._is_port_in_use(port)
-        
         status = {
             "service_name": service_name,
             "name": config["name"],
-            "port": port,
+            "port": config["port"],
             "description": config["description"],
-            "status": "running" if is_running else "stopped"
+            "status": "running" if listener["running"] else "stopped"
         }
         
         # 如果服务运行中,获取进程信息
-        if is_running:
-            process = self._get_process_by_port(port)
-            if process:
+        process = self._get_cached_process(listener["pid"]) if listener["running"] else None
+        if process is not None:
+            status["pid"] = process.pid
+            with self.lock:
+                sample = self.samples.get(process.pid)
+            if sample is not None:
+                status.update(sample)
+            else:
+                # 尚未采样的新进程只读取内存，CPU 占用率需要两次采样才有意义
                 try:
-                    status["pid"] = process.pid
-                    status["cpu_percent"] = process.cpu_percent()
+                    status["cpu_percent"] = 0.0
                     status["memory_mb"] = process.memory_info().rss / 1024 / 1024
                 except (psutil.AccessDenied, psutil.NoSuchProcess):
                     pass
         
         return status
     
+    def get_service_status(self, service_name: str) -> Dict:
+        """获取服务状态"""
+        if service_name not in self.service_config:
+            raise ValueError(f"未知的服务: {service_name}")
+        listener = self._resolve_listeners([service_name])[service_name]
+        return self._build_status(service_name, listener)
+    
     def get_all_services_status(self) -> List[Dict]:
-        """获取所有服务状态"""
+        """获取所有服务状态，结果缓存 cache_ttl 秒"""
+        with self.lock:
+            if self.status_cache is not None and self.status_cache[0] > time.monotonic():
+                return [dict(status) for status in self.status_cache[1]]
+        
+        try:
+            listeners = self._resolve_listeners(list(self.service_config.keys()))
+        except Exception as e:
+            logger.error(f"获取服务监听信息失败: {e}")
+            listeners = {}
         services = []
         for service_name in self.service_config.keys():
             try:
-                status = self.get_service_status(service_name)
+                if service_name not in listeners:
+                    raise RuntimeError("无法获取服务监听信息")
+                status = self._build_status(service_name, listeners[service_name])
                 services.append(status)
             except Exception as e:
                 logger.error(f"获取服务状态失败 {service_name}: {e}")
@@ -144,7 +311,9 @@ class ServiceManager:
                     "status": "unknown",
                     "error": str(e)
                 })
-        return services
+        with self.lock:
+            self.status_cache = (time.monotonic() + STATUS_CONFIG["cache_ttl"], services)
+        return [dict(status) for status in services]
     
     def start_service(self, service_name: str) -> Dict:
         """启动服务
@@ -191,6 +360,7 @@ class ServiceManager:
                         break
                     time.sleep(interval)
                 final_status = "running" if started else "starting"
+                self.invalidate_status()
                 return {
                     "service_name": service_name,
                     "pid": None,
@@ -262,6 +432,7 @@ class ServiceManager:
             final_status = "running" if started else "starting"
             logger.info(f"服务 {service_name} 启动检测结果: {final_status}")
 
+            self.invalidate_status()
             return {
                 "service_name": service_name,
                 "pid": process.pid,
@@ -366,6 +537,7 @@ class ServiceManager:
 
             logger.info(f"服务已停止且端口已释放: {service_name} (PID: {pid})")
 
+            self.invalidate_status()
             return {
                 "service_name": service_name,
                 "pid": pid,
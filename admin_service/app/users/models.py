@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -6,6 +6,12 @@ from ..database import Base
 class User(Base):
     """用户模型"""
     __tablename__ = "users"
+    # 列表筛选和排序使用的索引（用户名、邮箱前缀匹配使用唯一索引）
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_is_active_id", "is_active", "id"),
+        Index("ix_users_is_active_created_at_id", "is_active", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True)
@@ -19,7 +25,8 @@ class User(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # 关联关系
-    roles = relationship("Role", secondary="user_roles", back_populates="users")
+    # 角色随用户一起通过 SELECT IN 加载，异步会话中访问时不会触发懒加载
+    roles = relationship("Role", secondary="user_roles", back_populates="users", lazy="selectin")
     
     def to_dict(self):
         """转换为字典"""
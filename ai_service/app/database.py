@@ -3,12 +3,13 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from utils.logger import setup_logger
 from utils.config import MONGODB_URL, MONGODB_CONFIG
+from utils.metrics import MongoCommandListener
 
 # 设置日志记录器
 logger = setup_logger("ai_database", "ai_database")
 
 # 创建MongoDB客户端
-client = AsyncIOMotorClient(MONGODB_URL)
+client = AsyncIOMotorClient(MONGODB_URL, event_listeners=[MongoCommandListener()])
 
 # 获取数据库
 db = client[MONGODB_CONFIG["database"]]
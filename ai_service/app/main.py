@@ -24,6 +24,8 @@ from utils.response import (
 )
 from utils.auth import verify_token
 from utils.tracing import init_tracing, create_span, add_span_attribute, set_span_status, end_span
+from utils.metrics import setup_metrics
+from utils.compression import setup_compression
 from utils.config import SERVICE_CONFIG
 
 # 设置日志记录器
@@ -50,6 +52,12 @@ if SERVICE_CONFIG.get("enable_tracing", False):
 else:
     logger.info("链路追踪功能已禁用")
 
+# 初始化指标采集
+setup_metrics(app, "ai")
+
+# 启用响应压缩
+setup_compression(app)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -5,10 +5,12 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
+from utils.metrics import instrument_sqlalchemy
 
 # 创建数据库引擎
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_service.db")
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
+instrument_sqlalchemy(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # 创建基类
@@ -1,32 +1,58 @@
-import aiohttp
+import time
 import asyncio
-from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import Callable, Collection, Iterable, List, Dict, Optional, Set, Tuple
 from datetime import datetime
 from . import models
-from .database import async_db
+from . import database
+from .fetcher import fetcher, FETCH_CONFIG
+from .parser import html_parser
+from .writer import create_writer
 from bson import ObjectId
 from utils.logger import setup_logger
 
 # 设置日志记录器
-logger = setup_logger("crawler", "crawler_worker")
+logger = setup_logger("crawler_worker", "crawler_worker", hot_path=True)
+
+class ChapterReorderBuffer:
+    """章节重排缓冲区
+
+    章节完成顺序不定，先暂存已完成但前面还有章节未完成的结果，
+    再按章节序号依次取出连续的章节。失败或跳过的章节以 None 占位，不阻塞后续章节。
+    """
+
+    def __init__(self, skip_numbers: Iterable[int] = ()):
+        # 章节序号 -> 章节（None 表示失败或跳过）
+        self.pending: Dict[int, Optional[Dict]] = dict.fromkeys(skip_numbers)
+        # 下一个待保存的章节序号
+        self.next_number = 1
+
+    def put(self, number: int, chapter: Optional[Dict]) -> None:
+        """暂存一个已完成的章节"""
+        self.pending[number] = chapter
+
+    def pop_ready(self) -> List[Dict]:
+        """按序号取出连续完成的章节，跳过失败或跳过的章节"""
+        ready = []
+        while self.next_number in self.pending:
+            chapter = self.pending.pop(self.next_number)
+            self.next_number += 1
+            if chapter is not None:
+                ready.append(chapter)
+        return ready
+
 
 class NovelCrawler:
     def __init__(self):
         self.session = None
 
     async def init_session(self):
-        """初始化HTTP会话"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            logger.info("HTTP会话已初始化")
+        """获取共享的HTTP会话"""
+        self.session = await fetcher.get_session()
 
     async def close_session(self):
-        """关闭HTTP会话"""
-        if self.session:
-            await self.session.close()
-            self.session = None
-            logger.info("HTTP会话已关闭")
+        """关闭共享的HTTP会话"""
+        await fetcher.close()
+        self.session = None
 
     async def crawl_novel(self, url: str) -> models.Novel:
         """爬取小说基本信息
@@ -36,92 +62,164 @@ class NovelCrawler:
             models.Novel: 小说信息对象
         """
         logger.info(f"开始爬取小说信息: {url}")
-        await self.init_session()
         try:
-            async with self.session.get(url) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # 这里的选择器需要根据实际网站调整
-                title = soup.select_one('h1.novel-title').text.strip()
-                author = soup.select_one('div.author').text.strip()
-                description = soup.select_one('div.description').text.strip()
-                
-                logger.info(f"解析到小说信息: {title} - {author}")
-                
-                novel = {
-                    "title": title,
-                    "author": author,
-                    "description": description,
-                    "source_url": url,
-                    "status": "pending",
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                }
-                
-                result = await async_db.novels.insert_one(novel)
-                novel['_id'] = result.inserted_id
-                logger.info(f"小说信息已保存到数据库: {title}")
-                return models.Novel(**novel)
+            html = await fetcher.fetch(url)
+            # 选择器按站点配置，见 parser.PARSER_CONFIG
+            fields = await html_parser.parse(url, "novel", html)
+            title = fields["title"]
+            author = fields["author"]
+            description = fields["description"]
+            
+            logger.info(f"解析到小说信息: {title} - {author}")
+            
+            novel = {
+                "title": title,
+                "author": author,
+                "description": description,
+                "source_url": url,
+                "status": "pending",
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            }
+            
+            result = await database.async_db.novels.insert_one(novel)
+            novel['_id'] = result.inserted_id
+            logger.info(f"小说信息已保存到数据库: {title}")
+            return models.Novel(**novel)
         except Exception as e:
             logger.error(f"爬取小说信息失败: {str(e)}")
             raise Exception(f"爬取小说信息失败: {str(e)}")
 
-    async def crawl_chapters(self, novel_id: str, chapter_urls: List[str]):
+    async def fetch_chapter(self, chapter_number: int, url: str) -> Tuple[int, Optional[Dict]]:
+        """抓取并解析单个章节，章节序号由URL在列表中的位置决定
+
+        Returns:
+            Tuple[int, Optional[Dict]]: 章节序号和章节数据，失败时章节数据为 None
+        """
+        try:
+            html = await fetcher.fetch(url)
+            chapter = await html_parser.parse(url, "chapter", html)
+        except Exception as e:
+            logger.error(f"爬取章节失败 {url}: {str(e)}")
+            return chapter_number, None
+        chapter.update({"chapter_number": chapter_number, "source_url": url})
+        return chapter_number, chapter
+
+    async def crawl_chapters(
+        self,
+        novel_id: str,
+        chapter_urls: List[str],
+        skip_numbers: Collection[int] = (),
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, float]:
         """爬取小说章节内容
+
+        章节并发抓取（并发数、每主机连接数和速率见 fetcher.FETCH_CONFIG），
+        只调度待保存章节之后 chapter_window 章以内的章节，进行中的任务和重排缓冲区都不超过该窗口；
+        完成顺序不定，按章节序号重新排序后依次放入写入缓冲区批量保存（见 writer.WRITE_CONFIG）。
+
         Args:
             novel_id: 小说ID
             chapter_urls: 章节URL列表
+            skip_numbers: 已保存的章节序号，恢复中断的任务时跳过
+            on_progress: 每次批量写入或抓取失败后调用，参数为已保存数和失败数
+
+        Returns:
+            Dict[str, float]: 本次保存（含已存在的重复章节）、重复、失败和跳过的章节数，以及每秒写入章节数
         """
         logger.info(f"开始爬取章节: novel_id={novel_id}, 章节数={len(chapter_urls)}")
-        await self.init_session()
         novel_id = ObjectId(novel_id)
         
         # 更新小说状态为爬取中
-        await async_db.novels.update_one(
+        await database.async_db.novels.update_one(
             {"_id": novel_id},
             {"$set": {"status": "crawling", "updated_at": datetime.utcnow()}}
         )
         logger.info(f"小说状态已更新为爬取中: {novel_id}")
         
+        started_at = time.monotonic()
+        skip_numbers = set(skip_numbers)
+        numbers = [index for index in range(1, len(chapter_urls) + 1) if index not in skip_numbers]
+        window = max(1, FETCH_CONFIG["chapter_window"])
+        buffer = ChapterReorderBuffer(skip_numbers)
+        tasks: Set[asyncio.Future] = set()
+        scheduled = 0
+        failed = 0
+
+        def schedule() -> None:
+            # 待保存章节之后窗口内的章节才开始抓取
+            nonlocal scheduled
+            while scheduled < len(numbers) and numbers[scheduled] < buffer.next_number + window:
+                number = numbers[scheduled]
+                tasks.add(asyncio.ensure_future(self.fetch_chapter(number, chapter_urls[number - 1])))
+                scheduled += 1
+
+        def report() -> None:
+            if on_progress is not None:
+                on_progress(writer.inserted + len(writer.duplicates), failed + len(writer.failed))
+
+        writer = create_writer(on_flush=report)
         try:
-            for index, url in enumerate(chapter_urls, 1):
-                try:
-                    async with self.session.get(url) as response:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        title = soup.select_one('h1.chapter-title').text.strip()
-                        content = soup.select_one('div.chapter-content').text.strip()
-                        
-                        chapter = {
-                            "novel_id": novel_id,
-                            "title": title,
-                            "content": content,
-                            "chapter_number": index,
-                            "source_url": url,
-                            "created_at": datetime.utcnow()
-                        }
-                        
-                        await async_db.chapters.insert_one(chapter)
-                        logger.info(f"章节已保存: {title}")
-                        
-                except Exception as e:
-                    logger.error(f"爬取章节失败 {url}: {str(e)}")
-                    continue
+            async with writer:
+                # 先越过开头已保存的章节
+                buffer.pop_ready()
+                schedule()
+                while tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    tasks.difference_update(done)
+                    for task in done:
+                        number, chapter = task.result()
+                        buffer.put(number, chapter)
+                        if chapter is None:
+                            failed += 1
+                            report()
+
+                    # 按章节序号依次写入连续完成的章节
+                    for chapter in buffer.pop_ready():
+                        chapter.update({"novel_id": novel_id, "created_at": datetime.utcnow()})
+                        await writer.add(chapter)
+                    schedule()
                 
             # 更新小说状态为完成
-            await async_db.novels.update_one(
+            await database.async_db.novels.update_one(
                 {"_id": novel_id},
                 {"$set": {"status": "completed", "updated_at": datetime.utcnow()}}
             )
-            logger.info(f"小说爬取完成: {novel_id}")
+            stats = writer.get_stats()
+            result = {
+                "saved": stats["inserted"] + stats["duplicates"],
+                "duplicates": stats["duplicates"],
+                "failed": failed + stats["write_failed"],
+                "skipped": len(skip_numbers),
+                "chapters_per_second": stats["chapters_per_second"],
+            }
+            elapsed = time.monotonic() - started_at
+            logger.info(
+                f"小说爬取完成: {novel_id}, 成功 {result['saved']} 章 (重复 {result['duplicates']} 章), "
+                f"失败 {result['failed']} 章, 用时 {elapsed:.1f} 秒, {result['chapters_per_second']} 章/秒"
+            )
+            return result
             
+        except asyncio.CancelledError:
+            # 任务被取消或服务关闭，恢复为待爬取，避免小说一直停留在爬取中
+            try:
+                await database.async_db.novels.update_one(
+                    {"_id": novel_id},
+                    {"$set": {"status": "pending", "updated_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                logger.error(f"恢复小说状态失败: {novel_id} - {str(e)}")
+            logger.info(f"爬取章节已取消: {novel_id}")
+            raise
         except Exception as e:
             # 更新小说状态为错误
-            await async_db.novels.update_one(
+            await database.async_db.novels.update_one(
                 {"_id": novel_id},
                 {"$set": {"status": "error", "updated_at": datetime.utcnow()}}
             )
             logger.error(f"爬取章节失败: {str(e)}")
-            raise Exception(f"爬取章节失败: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"爬取章节失败: {str(e)}")
+        finally:
+            # 出错或任务被取消时停止尚未完成的抓取
+            for task in tasks:
+                task.cancel()
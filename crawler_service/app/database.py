@@ -5,10 +5,17 @@ from pymongo import MongoClient, ASCENDING, IndexModel
 from pymongo.errors import OperationFailure
 from utils.logger import setup_logger
 from utils.config import MONGODB_URL, MONGODB_CONFIG
+from utils.metrics import MongoCommandListener
 
 # 设置日志记录器
 logger = setup_logger("crawler_database", "crawler_database")
 
+# 旧版本创建的章节索引：章节文档没有 chapter_id 字段，(novel_id, chapter_id) 唯一索引会拒绝同一小说的第二个章节；
+# 默认名称的 (novel_id, chapter_number) 索引与章节序号唯一索引键相同，不删除时唯一索引无法创建
+LEGACY_CHAPTER_INDEXES = ("novel_id_1_chapter_id_1", "novel_id_1_chapter_number_1")
+# 章节序号唯一索引：批量写入依赖它拒绝重复章节，恢复爬取任务时也按章节序号跳过已保存的章节
+CHAPTER_NUMBER_INDEX = "novel_id_1_chapter_number_unique"
+
 # 全局变量
 async_client = None
 sync_client = None
@@ -30,12 +37,13 @@ async def init_db():
             maxPoolSize=50,
             waitQueueTimeoutMS=1000,
             connectTimeoutMS=2000,
+            event_listeners=[MongoCommandListener()],
         )
         async_db = async_client[MONGODB_CONFIG["database"]]
         logger.info("MongoDB异步连接已创建")
 
         # 同步MongoDB客户端（用于初始化）
-        sync_client = MongoClient(MONGODB_URL)
+        sync_client = MongoClient(MONGODB_URL, event_listeners=[MongoCommandListener()])
         sync_db = sync_client[MONGODB_CONFIG["database"]]
         logger.info("MongoDB同步连接已创建")
 
@@ -78,15 +86,29 @@ async def init_indexes():
         
         # 章节索引
         chapter_indexes = [
-            IndexModel([("novel_id", ASCENDING), ("chapter_id", ASCENDING)], unique=True),
+            IndexModel([("novel_id", ASCENDING), ("chapter_number", ASCENDING)], unique=True, name=CHAPTER_NUMBER_INDEX),
             IndexModel([("novel_id", ASCENDING), ("title", ASCENDING)]),
             IndexModel([("novel_id", ASCENDING), ("created_at", ASCENDING)]),
             IndexModel([("novel_id", ASCENDING), ("updated_at", ASCENDING)]),
         ]
+
+        # 爬取任务索引：按状态领取任务，按小说查询任务
+        crawl_job_indexes = [
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("novel_id", ASCENDING), ("created_at", ASCENDING)]),
+        ]
         
+        # 删除旧版本创建的章节索引
+        existing_indexes = sync_chapters.index_information()
+        for name in LEGACY_CHAPTER_INDEXES:
+            if name in existing_indexes:
+                sync_chapters.drop_index(name)
+                logger.info(f"已删除旧的章节索引: {name}")
+
         # 创建索引
         create_indexes(sync_novels, novel_indexes)
         create_indexes(sync_chapters, chapter_indexes)
+        create_indexes(sync_db.crawl_jobs, crawl_job_indexes)
         
         logger.info("MongoDB索引创建成功")
     except Exception as e:
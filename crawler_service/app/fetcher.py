@@ -0,0 +1,172 @@
+"""爬虫页面抓取模块
+
+所有爬虫实例共用一个 aiohttp.ClientSession，并发受三层约束：
+- 全局信号量限制同时进行的请求数；
+- 连接器按主机限制连接数；
+- 每个主机一个令牌桶控制请求速率，对源站保持礼貌。
+
+请求失败（连接错误、超时、429、5xx）时按指数退避加随机抖动重试，429/503 优先遵循 Retry-After。
+"""
+
+import os
+import time
+import random
+import asyncio
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from utils.logger import setup_logger
+
+# 设置日志记录器
+logger = setup_logger("crawler_fetcher", "crawler_worker", hot_path=True)
+
+# 抓取配置
+FETCH_CONFIG = {
+    # 全局并发请求数
+    "concurrency": int(os.getenv("CRAWLER_CONCURRENCY", "16")),
+    # 每个主机的最大连接数
+    "per_host_limit": int(os.getenv("CRAWLER_PER_HOST_LIMIT", "4")),
+    # 每个主机每秒请求数和突发容量
+    "host_rate": float(os.getenv("CRAWLER_HOST_RATE", "2")),
+    "host_burst": float(os.getenv("CRAWLER_HOST_BURST", "4")),
+    # 重试次数和退避时间（秒）
+    "max_retries": int(os.getenv("CRAWLER_MAX_RETRIES", "3")),
+    "retry_base_delay": float(os.getenv("CRAWLER_RETRY_BASE_DELAY", "0.5")),
+    "retry_max_delay": float(os.getenv("CRAWLER_RETRY_MAX_DELAY", "10")),
+    # 单个请求超时（秒）
+    "timeout": float(os.getenv("CRAWLER_REQUEST_TIMEOUT", "30")),
+    # 章节抓取窗口：只调度待保存章节之后的这么多章，限制进行中的任务数和重排缓冲区大小
+    "chapter_window": int(os.getenv("CRAWLER_CHAPTER_WINDOW", "64")),
+}
+
+# 需要重试的响应状态码
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """页面抓取失败"""
+
+
+class HostBucket:
+    """主机令牌桶
+
+    令牌不足时预约下一个令牌：令牌数可以为负，等待时间按欠下的令牌计算，
+    并发的请求依次排开，不需要加锁。
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated_at")
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """预约一个令牌
+
+        Returns:
+            float: 需要等待的秒数
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class Fetcher:
+    """带并发控制、限速和重试的页面抓取器"""
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.buckets: Dict[str, HostBucket] = {}
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的 HTTP 会话"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.config["concurrency"], limit_per_host=self.config["per_host_limit"])
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.config["timeout"]),
+            )
+            self.semaphore = asyncio.Semaphore(self.config["concurrency"])
+            logger.info(
+                f"HTTP会话已初始化: 并发={self.config['concurrency']}, 每主机连接={self.config['per_host_limit']}, "
+                f"每主机速率={self.config['host_rate']}/s"
+            )
+        return self.session
+
+    async def close(self) -> None:
+        """关闭共享的 HTTP 会话"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            logger.info("HTTP会话已关闭")
+
+    async def throttle(self, url: str) -> None:
+        """按主机令牌桶等待"""
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = HostBucket(self.config["host_burst"], self.config["host_rate"])
+        delay = bucket.reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # 取消的请求归还预约的令牌，避免拖慢之后的请求
+                bucket.tokens += 1
+                raise
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """计算重试等待时间：指数退避加全量抖动，Retry-After 优先"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.config["retry_max_delay"])
+            except ValueError:
+                pass
+        ceiling = min(self.config["retry_max_delay"], self.config["retry_base_delay"] * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def fetch(self, url: str) -> str:
+        """抓取页面文本
+
+        Raises:
+            FetchError: 重试次数用尽仍失败，或响应为不可重试的错误状态
+        """
+        session = await self.get_session()
+        last_error = None
+        for attempt in range(self.config["max_retries"] + 1):
+            retry_after = None
+            await self.throttle(url)
+            async with self.semaphore:
+                self.stats["requests"] += 1
+                try:
+                    async with session.get(url) as response:
+                        if response.status < 400:
+                            return await response.text()
+                        last_error = f"HTTP {response.status}"
+                        if response.status not in RETRY_STATUSES:
+                            break
+                        retry_after = response.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    last_error = f"{type(e).__name__}: {e}"
+            if attempt < self.config["max_retries"]:
+                delay = self.backoff(attempt, retry_after)
+                self.stats["retries"] += 1
+                logger.warning(f"抓取失败，{delay:.2f} 秒后重试 ({attempt + 1}/{self.config['max_retries']}) {url}: {last_error}")
+                await asyncio.sleep(delay)
+        self.stats["failures"] += 1
+        raise FetchError(f"抓取失败 {url}: {last_error}")
+
+    def get_stats(self) -> Dict:
+        """获取抓取统计信息"""
+        return {**self.stats, "hosts": len(self.buckets)}
+
+
+# 全局抓取器，所有爬虫实例共用
+fetcher = Fetcher(FETCH_CONFIG)
@@ -0,0 +1,359 @@
+"""章节爬取任务队列模块
+
+爬取请求写入 Mongo 的 crawl_jobs 集合后立即返回任务ID，由后台工作协程池执行。
+工作协程通过 find_one_and_update 原子地领取任务，每次领取生成新的租约令牌，
+执行期间的心跳、进度和最终状态都按租约令牌写入，任务被重新领取后旧的执行不会再写入；
+服务重启或进程崩溃后，心跳超时的 running 任务会被重新领取，
+已保存的章节按章节序号跳过，只爬取剩余部分。心跳连续失败到租约到期前，执行实例主动中止爬取。
+
+任务状态: queued -> running -> completed / failed / cancelled，
+failed 和 cancelled 的任务可以重试。
+"""
+
+import os
+import time
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from utils.logger import setup_logger
+from . import database
+from .crawler import NovelCrawler
+
+# 设置日志记录器
+logger = setup_logger("crawler_jobs", "crawler_worker", hot_path=True)
+
+# 爬取任务配置
+JOB_CONFIG = {
+    # 每个进程的工作协程数
+    "workers": int(os.getenv("CRAWL_JOB_WORKERS", "2")),
+    # 没有新任务通知时轮询队列的间隔（秒），用于领取其他实例创建或心跳超时的任务
+    "poll_interval": float(os.getenv("CRAWL_JOB_POLL_INTERVAL", "5")),
+    # 心跳间隔（秒），同时写入进度并检查取消请求
+    "heartbeat_interval": float(os.getenv("CRAWL_JOB_HEARTBEAT_INTERVAL", "5")),
+    # 心跳超过该时间（秒）未更新的 running 任务视为中断，可被重新领取
+    "lease_timeout": float(os.getenv("CRAWL_JOB_LEASE_TIMEOUT", "60")),
+}
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# 可以重试的状态
+RETRYABLE_STATES = (JOB_FAILED, JOB_CANCELLED)
+
+
+class JobStateError(Exception):
+    """任务当前状态不允许该操作"""
+
+
+def serialize_job(job: Dict, include_urls: bool = False) -> Dict:
+    """转换为接口返回的任务信息"""
+    data = {key: value for key, value in job.items() if key not in ("_id", "chapter_urls")}
+    data["job_id"] = str(job["_id"])
+    data["novel_id"] = str(job["novel_id"])
+    if include_urls:
+        data["chapter_urls"] = job["chapter_urls"]
+    return data
+
+
+class CrawlJobQueue:
+    """持久化的章节爬取任务队列"""
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.crawler = NovelCrawler()
+        self.workers: List[asyncio.Task] = []
+        # 任务ID -> 执行该任务的协程
+        self.running: Dict[str, asyncio.Task] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.stopping = False
+
+    @property
+    def collection(self):
+        return database.async_db.crawl_jobs
+
+    async def start(self) -> None:
+        """启动工作协程"""
+        if self.workers:
+            return
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self.workers = [
+            asyncio.get_running_loop().create_task(self.run_worker(index))
+            for index in range(self.config["workers"])
+        ]
+        logger.info(f"爬取任务队列已启动: {self.config['workers']} 个工作协程 ({self.worker_id})")
+
+    async def stop(self) -> None:
+        """停止工作协程，正在执行的任务放回队列，重启后继续
+
+        进程异常退出时来不及放回，任务在心跳超时后由其他实例或重启后的进程重新领取。
+        """
+        self.stopping = True
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        logger.info("爬取任务队列已停止")
+
+    async def enqueue(self, novel_id: ObjectId, chapter_urls: List[str]) -> Dict:
+        """创建爬取任务"""
+        now = datetime.utcnow()
+        job = {
+            "novel_id": novel_id,
+            "chapter_urls": chapter_urls,
+            "status": JOB_QUEUED,
+            "total": len(chapter_urls),
+            "saved": 0,
+            "failed": 0,
+            "skipped": 0,
+            "duplicates": 0,
+            "chapters_per_second": None,
+            "attempts": 0,
+            "error": None,
+            "cancel_requested": False,
+            "worker_id": None,
+            "lease_token": None,
+            "heartbeat_at": None,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        result = await self.collection.insert_one(job)
+        job["_id"] = result.inserted_id
+        logger.info(f"爬取任务已创建: {result.inserted_id}, novel_id={novel_id}, 章节数={len(chapter_urls)}")
+        if self.wakeup is not None:
+            self.wakeup.set()
+        return job
+
+    async def get(self, job_id: ObjectId) -> Optional[Dict]:
+        return await self.collection.find_one({"_id": job_id})
+
+    async def list(self, novel_id: Optional[ObjectId] = None, status: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[Dict]:
+        """按创建时间倒序列出任务，不返回章节URL列表"""
+        query = {}
+        if novel_id is not None:
+            query["novel_id"] = novel_id
+        if status:
+            query["status"] = status
+        cursor = self.collection.find(query, {"chapter_urls": 0}).sort("created_at", -1).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def cancel(self, job_id: ObjectId) -> Dict:
+        """取消任务
+
+        排队中的任务直接取消；执行中的任务在本进程时立即中止，
+        在其他实例时设置取消标记，由执行实例在下次心跳时中止。
+
+        Raises:
+            JobStateError: 任务已结束
+        """
+        now = datetime.utcnow()
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, "status": JOB_QUEUED},
+            {"$set": {"status": JOB_CANCELLED, "finished_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is not None:
+            return job
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, "status": JOB_RUNNING},
+            {"$set": {"cancel_requested": True, "updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            raise JobStateError("任务已结束，无法取消")
+        task = self.running.get(str(job_id))
+        if task is not None:
+            task.cancel()
+        return job
+
+    async def retry(self, job_id: ObjectId) -> Dict:
+        """重新排队失败或已取消的任务，已保存的章节不会重复爬取
+
+        Raises:
+            JobStateError: 任务不是失败或已取消状态
+        """
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, "status": {"$in": list(RETRYABLE_STATES)}},
+            {"$set": {
+                "status": JOB_QUEUED,
+                "error": None,
+                "cancel_requested": False,
+                "worker_id": None,
+                "lease_token": None,
+                "finished_at": None,
+                "updated_at": datetime.utcnow(),
+            }},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            raise JobStateError("只有失败或已取消的任务可以重试")
+        if self.wakeup is not None:
+            self.wakeup.set()
+        return job
+
+    async def claim(self) -> Optional[Dict]:
+        """原子地领取一个排队中或心跳超时的任务"""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.config["lease_timeout"])
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": JOB_QUEUED},
+                {"status": JOB_RUNNING, "heartbeat_at": {"$lt": stale}},
+            ]},
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "worker_id": self.worker_id,
+                    # 同一进程的多个工作协程共用 worker_id，按每次领取的租约令牌区分执行
+                    "lease_token": uuid.uuid4().hex,
+                    "heartbeat_at": now,
+                    "started_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def run_worker(self, index: int) -> None:
+        """工作协程：循环领取并执行任务"""
+        while True:
+            # 先清除通知再领取，领取之后创建的任务不会被漏掉
+            self.wakeup.clear()
+            try:
+                job = await self.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"领取爬取任务失败: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.config["poll_interval"])
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 单个任务的意外错误不能结束工作协程，任务在心跳超时后会被重新领取
+                logger.error(f"执行爬取任务出错: {job['_id']} - {str(e)}")
+
+    async def execute(self, job: Dict) -> None:
+        """执行任务，期间定期写入心跳和进度"""
+        job_id = job["_id"]
+        novel_id = job["novel_id"]
+        lease = {"_id": job_id, "lease_token": job["lease_token"]}
+        saved_numbers: List[int] = []
+        progress = {"saved": 0, "failed": 0}
+        lease_lost = False
+
+        def on_progress(saved: int, failed: int) -> None:
+            progress.update(saved=saved, failed=failed)
+
+        async def heartbeat() -> None:
+            nonlocal lease_lost
+            interval = self.config["heartbeat_interval"]
+            last_beat = time.monotonic()
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    current = await self.collection.find_one_and_update(
+                        lease,
+                        {"$set": {
+                            "heartbeat_at": datetime.utcnow(),
+                            "saved": len(saved_numbers) + progress["saved"],
+                            "failed": progress["failed"],
+                        }},
+                        projection={"cancel_requested": 1},
+                    )
+                except Exception as e:
+                    logger.error(f"写入爬取任务心跳失败: {job_id} - {str(e)}")
+                    # 下一次心跳前租约就会到期，任务可能被重新领取，中止爬取避免重复执行
+                    if time.monotonic() - last_beat + interval >= self.config["lease_timeout"]:
+                        logger.error(f"爬取任务心跳持续失败，中止执行: {job_id}")
+                        lease_lost = True
+                        crawl.cancel()
+                        return
+                    continue
+                last_beat = time.monotonic()
+                # 已被重新领取
+                if current is None:
+                    lease_lost = True
+                    crawl.cancel()
+                    return
+                # 收到取消请求
+                if current.get("cancel_requested"):
+                    crawl.cancel()
+                    return
+
+        crawl = beat = None
+        update = {}
+        try:
+            # 恢复中断的任务时跳过已保存的章节
+            saved_numbers = await database.async_db.chapters.distinct("chapter_number", {"novel_id": novel_id})
+            logger.info(f"开始执行爬取任务: {job_id} (第 {job['attempts']} 次), 已保存 {len(saved_numbers)} 章")
+            crawl = asyncio.ensure_future(self.crawler.crawl_chapters(
+                novel_id, job["chapter_urls"], skip_numbers=saved_numbers, on_progress=on_progress
+            ))
+            self.running[str(job_id)] = crawl
+            beat = asyncio.ensure_future(heartbeat())
+            result = await crawl
+            update = {
+                "status": JOB_COMPLETED,
+                "saved": result["skipped"] + result["saved"],
+                "failed": result["failed"],
+                "skipped": result["skipped"],
+                "duplicates": result["duplicates"],
+                "chapters_per_second": result["chapters_per_second"],
+            }
+            logger.info(f"爬取任务完成: {job_id}, {result}")
+        except asyncio.CancelledError:
+            if self.stopping or lease_lost:
+                # 服务关闭或心跳失败，放回队列等待重新领取；租约已被接管时按租约令牌写入不会生效
+                update = {"status": JOB_QUEUED, "worker_id": None, "lease_token": None}
+                logger.info(f"爬取任务已中断，放回队列: {job_id}")
+            else:
+                update = {"status": JOB_CANCELLED}
+                logger.info(f"爬取任务已取消: {job_id}")
+        except Exception as e:
+            update = {"status": JOB_FAILED, "error": str(e)}
+            logger.error(f"爬取任务失败: {job_id} - {str(e)}")
+        finally:
+            if beat is not None:
+                beat.cancel()
+            # 同一任务可能已被本进程的其他工作协程重新领取，只移除自己的记录
+            if crawl is not None and self.running.get(str(job_id)) is crawl:
+                del self.running[str(job_id)]
+            if update:
+                now = datetime.utcnow()
+                update["updated_at"] = now
+                if update["status"] != JOB_QUEUED:
+                    update["finished_at"] = now
+                    update.setdefault("saved", len(saved_numbers) + progress["saved"])
+                    update.setdefault("failed", progress["failed"])
+                try:
+                    await self.collection.update_one(lease, {"$set": update})
+                except Exception as e:
+                    # 状态未写入的任务在心跳超时后会被重新领取
+                    logger.error(f"更新爬取任务状态失败: {job_id} - {str(e)}")
+        if self.stopping:
+            raise asyncio.CancelledError()
+
+
+# 全局爬取任务队列
+crawl_job_queue = CrawlJobQueue(JOB_CONFIG)
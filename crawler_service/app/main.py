@@ -18,9 +18,16 @@ from fastapi.openapi.docs import (
 from fastapi.staticfiles import StaticFiles
 from utils.auth import verify_token
 from utils.tracing import init_tracing, create_span, add_span_attribute, set_span_status, end_span
-from .routers import novels, chapters
+from opentelemetry.trace import StatusCode
+from utils.metrics import setup_metrics
+from utils.compression import setup_compression
+from .routers import novels, chapters, jobs
+from . import database
 from .database import init_indexes, close_db
 from .crawler import NovelCrawler
+from .jobs import crawl_job_queue, serialize_job
+from .fetcher import fetcher
+from .parser import html_parser
 
 # 设置日志记录器
 logger = setup_logger("crawler", "crawler")
@@ -36,6 +43,12 @@ app = FastAPI(
 init_tracing(app, "crawler-service")
 logger.info("追踪系统初始化成功")
 
+# 初始化指标采集
+setup_metrics(app, "crawler")
+
+# 启用响应压缩
+setup_compression(app)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -51,6 +64,8 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # 注册路由
 app.include_router(novels.router, prefix="/api/v1", tags=["novels"])
 app.include_router(chapters.router, prefix="/api/v1", tags=["chapters"])
+app.include_router(jobs.router, tags=["jobs"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
 
 # 创建爬虫实例
 crawler = NovelCrawler()
@@ -95,6 +110,8 @@ async def startup_event():
         # 初始化数据库索引
         await init_indexes()
         logger.info("数据库索引初始化成功")
+        # 启动爬取任务工作协程，继续执行中断的任务
+        await crawl_job_queue.start()
     except Exception as e:
         logger.error(f"服务启动失败: {str(e)}")
         raise
@@ -103,7 +120,10 @@ async def startup_event():
 async def shutdown_event():
     """服务关闭时执行"""
     try:
-        # 关闭数据库连接
+        # 停止爬取任务（执行中的任务放回队列），关闭共享的HTTP会话、解析进程池和数据库连接
+        await crawl_job_queue.stop()
+        await fetcher.close()
+        html_parser.shutdown()
         await close_db()
         logger.info("数据库连接已关闭")
     except Exception as e:
@@ -111,6 +131,7 @@ async def shutdown_event():
         raise
 
 @app.get("/")
+@app.get("/health", include_in_schema=False)
 @create_span("health_check")
 async def health_check():
     """健康检查接口"""
@@ -148,7 +169,7 @@ async def create_novel(url: str, _: dict = Depends(verify_token)):
         add_span_attribute(span, "novel.url", url)
         
         # 检查是否已经存在
-        existing = await async_db.novels.find_one({"source_url": url})
+        existing = await database.async_db.novels.find_one({"source_url": url})
         if existing:
             logger.warning(f"小说已存在: {url}")
             add_span_attribute(span, "novel.exists", "true")
@@ -179,15 +200,17 @@ async def crawl_chapters(novel_id: str, chapter_urls: List[str], _: dict = Depen
     
     返回:
         - message: 任务启动状态信息
+        - job_id: 爬取任务ID
+        - status: 任务状态
     
     错误:
         - 401: 未授权访问
         - 404: 小说不存在
-        - 500: 爬取失败或服务器错误
+        - 500: 创建任务失败或服务器错误
     
     说明:
         这是一个异步任务，接口会立即返回，
-        实际爬取过程在后台进行
+        实际爬取过程在后台进行，进度通过 GET /crawl-jobs/{job_id} 查询
     """
     with create_span("crawl_chapters") as span:
         logger.info(f"开始爬取小说章节: {novel_id}, 章节数: {len(chapter_urls)}")
@@ -196,18 +219,19 @@ async def crawl_chapters(novel_id: str, chapter_urls: List[str], _: dict = Depen
         
         try:
             # 检查小说是否存在
-            novel = await async_db.novels.find_one({"_id": ObjectId(novel_id)})
+            novel = await database.async_db.novels.find_one({"_id": ObjectId(novel_id)})
             if not novel:
                 add_span_attribute(span, "novel.exists", "false")
                 set_span_status(span, StatusCode.ERROR, "小说不存在")
                 return not_found_error(f"小说不存在: {novel_id}")
             
-            # 启动爬取任务
-            await crawler.crawl_chapters(ObjectId(novel_id), chapter_urls)
-            logger.info(f"章节爬取任务已启动: {novel_id}")
-            add_span_attribute(span, "task.status", "started")
+            # 创建爬取任务，由后台工作协程执行
+            job = await crawl_job_queue.enqueue(ObjectId(novel_id), chapter_urls)
+            logger.info(f"章节爬取任务已创建: {novel_id}, job_id={job['_id']}")
+            add_span_attribute(span, "task.status", "queued")
+            add_span_attribute(span, "task.id", str(job["_id"]))
             set_span_status(span, StatusCode.OK)
-            return success_response({"message": "章节爬取任务已启动"})
+            return success_response({"message": "章节爬取任务已启动", **serialize_job(job)}, status_code=202)
         except Exception as e:
             logger.error(f"爬取章节失败: {str(e)}")
             add_span_attribute(span, "error", str(e))
@@ -219,7 +243,7 @@ async def list_novels(skip: int = 0, limit: int = 10):
     """获取小说列表"""
     logger.info(f"获取小说列表: skip={skip}, limit={limit}")
     try:
-        novels = await async_db.novels.find().skip(skip).limit(limit).to_list(length=limit)
+        novels = await database.async_db.novels.find().skip(skip).limit(limit).to_list(length=limit)
         return success_response(novels)
     except Exception as e:
         logger.error(f"获取小说列表失败: {str(e)}")
@@ -230,7 +254,7 @@ async def get_novel(novel_id: str):
     """获取小说详情"""
     logger.info(f"获取小说详情: {novel_id}")
     try:
-        novel = await async_db.novels.find_one({"_id": ObjectId(novel_id)})
+        novel = await database.async_db.novels.find_one({"_id": ObjectId(novel_id)})
         if not novel:
             return not_found_error(f"小说不存在: {novel_id}")
         return success_response(novel)
@@ -244,11 +268,11 @@ async def get_chapters(novel_id: str, skip: int = 0, limit: int = 10):
     logger.info(f"获取小说章节: novel_id={novel_id}, skip={skip}, limit={limit}")
     try:
         # 检查小说是否存在
-        novel = await async_db.novels.find_one({"_id": ObjectId(novel_id)})
+        novel = await database.async_db.novels.find_one({"_id": ObjectId(novel_id)})
         if not novel:
             return not_found_error(f"小说不存在: {novel_id}")
         
-        chapters = await async_db.chapters.find(
+        chapters = await database.async_db.chapters.find(
             {"novel_id": ObjectId(novel_id)}
         ).skip(skip).limit(limit).to_list(length=limit)
         
@@ -262,7 +286,7 @@ async def get_chapter(novel_id: str, chapter_id: str):
     """获取章节详情"""
     logger.info(f"获取章节详情: novel_id={novel_id}, chapter_id={chapter_id}")
     try:
-        chapter = await async_db.chapters.find_one({
+        chapter = await database.async_db.chapters.find_one({
             "_id": ObjectId(chapter_id),
             "novel_id": ObjectId(novel_id)
         })
@@ -0,0 +1,227 @@
+"""页面解析模块
+
+按可用性依次选择解析后端：selectolax（Lexbor，C 实现）> lxml（需要 cssselect）> BeautifulSoup。
+BeautifulSoup 后端在安装了 lxml 时使用 lxml 构建树，并用 SoupStrainer 只解析选择器涉及的标签。
+
+每个站点的选择器按页面类型配置，首次使用时按后端编译一次并缓存；
+页面较大时解析放到进程池中执行，避免占用事件循环，抓取可以继续进行。
+"""
+
+import os
+import re
+import json
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from utils.logger import setup_logger
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:  # selectolax 为可选依赖
+    SelectolaxParser = None
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:  # lxml 与 cssselect 为可选依赖
+    CSSSelector = None
+
+try:
+    import lxml  # noqa: F401
+    BS4_TREE_BUILDER = "lxml"
+except ImportError:
+    BS4_TREE_BUILDER = "html.parser"
+
+# 设置日志记录器
+logger = setup_logger("crawler_parser", "crawler_worker", hot_path=True)
+
+# 默认选择器，站点未单独配置时使用
+DEFAULT_SELECTORS = {
+    "novel": {
+        "title": "h1.novel-title",
+        "author": "div.author",
+        "description": "div.description",
+    },
+    "chapter": {
+        "title": "h1.chapter-title",
+        "content": "div.chapter-content",
+    },
+}
+
+# 解析配置
+PARSER_CONFIG = {
+    # 解析后端: auto / selectolax / lxml / bs4
+    "backend": os.getenv("CRAWLER_PARSER", "auto"),
+    # 解析进程数，0 表示在事件循环所在进程中解析
+    "processes": int(os.getenv("CRAWLER_PARSE_PROCESSES", str(min(4, os.cpu_count() or 1)))),
+    # 页面达到该字节数时才放到进程池解析，小页面序列化传输的开销高于解析本身；
+    # 未设置时按后端选择，selectolax/lxml 解析几十 KB 的页面只需约 1 毫秒，只有很大的页面才值得放到进程池
+    "offload_min_bytes": os.getenv("CRAWLER_PARSE_OFFLOAD_MIN_BYTES"),
+    # 按站点覆盖选择器，例如 {"www.example.com": {"chapter": {"title": "h1", "content": "#content"}}}
+    "site_selectors": json.loads(os.getenv("CRAWLER_SITE_SELECTORS", "{}")),
+}
+
+# 各后端默认的进程池解析阈值（字节）
+OFFLOAD_MIN_BYTES = {"selectolax": 256 * 1024, "lxml": 256 * 1024, "bs4": 20 * 1024}
+
+# 简单选择器（标签名开头、无组合符），可据此只解析需要的标签
+SIMPLE_SELECTOR = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)(?:[.#\[][^\s>+~,]*)?$")
+
+
+class ParseError(Exception):
+    """页面缺少需要的内容"""
+
+
+def available_backends() -> Tuple[str, ...]:
+    """当前环境可用的解析后端，按速度从快到慢排列"""
+    backends = []
+    if SelectolaxParser is not None:
+        backends.append("selectolax")
+    if CSSSelector is not None:
+        backends.append("lxml")
+    backends.append("bs4")
+    return tuple(backends)
+
+
+def resolve_backend(name: str) -> str:
+    """解析后端名称，auto 或不可用时选择最快的可用后端"""
+    backends = available_backends()
+    if name in backends:
+        return name
+    if name != "auto":
+        logger.warning(f"解析后端 {name} 不可用，使用 {backends[0]}")
+    return backends[0]
+
+
+def get_selectors(host: str, page_type: str) -> Dict[str, str]:
+    """获取站点的页面选择器"""
+    site = PARSER_CONFIG["site_selectors"].get(host, {})
+    return {**DEFAULT_SELECTORS[page_type], **site.get(page_type, {})}
+
+
+def compile_selectors(backend: str, selectors: Dict[str, str]) -> Callable[[str], Dict[str, Optional[str]]]:
+    """把字段选择器编译为解析函数，函数返回各字段的文本，未匹配的字段为 None"""
+    if backend == "selectolax":
+        # Lexbor 的选择器引擎在 C 中处理，无需预编译
+        def extract(html: str) -> Dict[str, Optional[str]]:
+            tree = SelectolaxParser(html)
+            result = {}
+            for field, selector in selectors.items():
+                node = tree.css_first(selector)
+                result[field] = node.text(deep=True) if node is not None else None
+            return result
+        return extract
+
+    if backend == "lxml":
+        # CSS 选择器预先转换为 XPath
+        compiled = {field: CSSSelector(selector) for field, selector in selectors.items()}
+
+        def extract(html: str) -> Dict[str, Optional[str]]:
+            tree = lxml.html.fromstring(html)
+            result = {}
+            for field, selector in compiled.items():
+                nodes = selector(tree)
+                result[field] = nodes[0].text_content() if nodes else None
+            return result
+        return extract
+
+    import soupsieve
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    compiled = {field: soupsieve.compile(selector) for field, selector in selectors.items()}
+    # 选择器都是简单选择器时只解析涉及的标签，不构建完整的文档树
+    matches = [SIMPLE_SELECTOR.match(selector) for selector in selectors.values()]
+    strainer = SoupStrainer([match.group(1) for match in matches]) if all(matches) else None
+
+    def extract(html: str) -> Dict[str, Optional[str]]:
+        soup = BeautifulSoup(html, BS4_TREE_BUILDER, parse_only=strainer)
+        result = {}
+        for field, selector in compiled.items():
+            node = selector.select_one(soup)
+            result[field] = node.get_text() if node is not None else None
+        return result
+    return extract
+
+
+# (后端, 站点, 页面类型) -> 解析函数，每个进程各自缓存
+_extractors: Dict[Tuple[str, str, str], Callable[[str], Dict[str, Optional[str]]]] = {}
+
+
+def parse_page(backend: str, url: str, page_type: str, html: str) -> Dict[str, str]:
+    """解析页面，返回去除首尾空白的字段文本
+
+    在进程池中执行时参数都必须可序列化，因此按名称传入后端而不是解析函数。
+
+    Raises:
+        ParseError: 页面缺少需要的字段
+    """
+    host = urlsplit(url).netloc
+    key = (backend, host, page_type)
+    extract = _extractors.get(key)
+    if extract is None:
+        extract = _extractors[key] = compile_selectors(backend, get_selectors(host, page_type))
+    fields = extract(html)
+    missing = [field for field, value in fields.items() if value is None]
+    if missing:
+        raise ParseError(f"页面缺少内容 {', '.join(missing)}: {url}")
+    return {field: value.strip() for field, value in fields.items()}
+
+
+class HtmlParser:
+    """页面解析器，大页面在进程池中解析"""
+
+    def __init__(self, backend: str, processes: int, offload_min_bytes: Optional[str] = None):
+        self.backend = resolve_backend(backend)
+        self.processes = processes
+        self.offload_min_bytes = int(offload_min_bytes) if offload_min_bytes else OFFLOAD_MIN_BYTES[self.backend]
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.stats = {"inline": 0, "offloaded": 0}
+        logger.info(f"页面解析后端: {self.backend}, 解析进程数: {processes}, 进程池解析阈值: {self.offload_min_bytes} 字节")
+
+    def get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """按需创建进程池
+
+        使用 spawn 启动子进程：服务进程中有数据库驱动等后台线程，fork 后子进程可能死锁。
+        """
+        if self.processes <= 0:
+            return None
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.executor
+
+    async def parse(self, url: str, page_type: str, html: str) -> Dict[str, str]:
+        """解析页面
+
+        Raises:
+            ParseError: 页面缺少需要的字段
+        """
+        executor = self.get_executor() if len(html) >= self.offload_min_bytes else None
+        if executor is None:
+            self.stats["inline"] += 1
+            return parse_page(self.backend, url, page_type, html)
+        self.stats["offloaded"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, parse_page, self.backend, url, page_type, html)
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取解析统计信息"""
+        return {"backend": self.backend, "processes": self.processes, **self.stats}
+
+
+# 全局页面解析器
+html_parser = HtmlParser(
+    backend=PARSER_CONFIG["backend"],
+    processes=PARSER_CONFIG["processes"],
+    offload_min_bytes=PARSER_CONFIG["offload_min_bytes"],
+)
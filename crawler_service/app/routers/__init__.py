@@ -1,11 +1,12 @@
 """路由模块初始化"""
 
 from fastapi import APIRouter
-from . import novels, chapters
+from . import novels, chapters, jobs
 
 # 创建主路由
 router = APIRouter()
 
 # 注册子路由
 router.include_router(novels.router, prefix="/novels", tags=["novels"])
-router.include_router(chapters.router, prefix="/novels", tags=["chapters"]) 
\ No newline at end of file
+router.include_router(chapters.router, prefix="/novels", tags=["chapters"])
+router.include_router(jobs.router, tags=["jobs"]) 
\ No newline at end of file
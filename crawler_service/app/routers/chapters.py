@@ -7,8 +7,8 @@ from utils.logger import setup_logger
 from utils.response import success_response, error_response, not_found_error, server_error
 from utils.auth import verify_token
 from utils.tracing import create_span, add_span_attribute, set_span_status
-from ..database import chapters, novels, async_db
-from ..crawler import NovelCrawler
+from .. import database
+from ..jobs import crawl_job_queue, serialize_job
 
 # 设置日志记录器
 logger = setup_logger("crawler_chapters", "crawler")
@@ -16,12 +16,9 @@ logger = setup_logger("crawler_chapters", "crawler")
 # 创建路由
 router = APIRouter()
 
-# 创建爬虫实例
-crawler = NovelCrawler()
-
 @router.post("/{novel_id}/chapters")
 async def crawl_chapters(novel_id: str, chapter_urls: List[str], _: dict = Depends(verify_token)):
-    """爬取小说章节内容"""
+    """爬取小说章节内容，创建后台任务后立即返回任务ID"""
     with create_span("crawl_chapters") as span:
         logger.info(f"开始爬取小说章节: {novel_id}, 章节数: {len(chapter_urls)}")
         add_span_attribute(span, "novel.id", novel_id)
@@ -29,18 +26,19 @@ async def crawl_chapters(novel_id: str, chapter_urls: List[str], _: dict = Depen
         
         try:
             # 检查小说是否存在
-            novel = await novels.find_one({"_id": ObjectId(novel_id)})
+            novel = await database.novels.find_one({"_id": ObjectId(novel_id)})
             if not novel:
                 add_span_attribute(span, "novel.exists", "false")
                 set_span_status(span, "error", "小说不存在")
                 return not_found_error(f"小说不存在: {novel_id}")
             
-            # 启动爬取任务
-            await crawler.crawl_chapters(ObjectId(novel_id), chapter_urls)
-            logger.info(f"章节爬取任务已启动: {novel_id}")
-            add_span_attribute(span, "task.status", "started")
+            # 创建爬取任务，由后台工作协程执行
+            job = await crawl_job_queue.enqueue(ObjectId(novel_id), chapter_urls)
+            logger.info(f"章节爬取任务已创建: {novel_id}, job_id={job['_id']}")
+            add_span_attribute(span, "task.status", "queued")
+            add_span_attribute(span, "task.id", str(job["_id"]))
             set_span_status(span, "ok")
-            return success_response({"message": "章节爬取任务已启动"})
+            return success_response({"message": "章节爬取任务已启动", **serialize_job(job)}, status_code=202)
         except Exception as e:
             logger.error(f"爬取章节失败: {str(e)}")
             add_span_attribute(span, "error", str(e))
@@ -53,11 +51,11 @@ async def get_chapters(novel_id: str, skip: int = 0, limit: int = 10):
     logger.info(f"获取小说章节: novel_id={novel_id}, skip={skip}, limit={limit}")
     try:
         # 检查小说是否存在
-        novel = await novels.find_one({"_id": ObjectId(novel_id)})
+        novel = await database.novels.find_one({"_id": ObjectId(novel_id)})
         if not novel:
             return not_found_error(f"小说不存在: {novel_id}")
         
-        chapters_list = await chapters.find(
+        chapters_list = await database.chapters.find(
             {"novel_id": ObjectId(novel_id)}
         ).skip(skip).limit(limit).to_list(length=limit)
         
@@ -71,7 +69,7 @@ async def get_chapter(novel_id: str, chapter_id: str):
     """获取章节详情"""
     logger.info(f"获取章节详情: novel_id={novel_id}, chapter_id={chapter_id}")
     try:
-        chapter = await chapters.find_one({
+        chapter = await database.chapters.find_one({
             "_id": ObjectId(chapter_id),
             "novel_id": ObjectId(novel_id)
         })
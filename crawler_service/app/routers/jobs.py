@@ -0,0 +1,101 @@
+"""爬取任务路由模块"""
+
+from fastapi import APIRouter, Depends
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from utils.logger import setup_logger
+from utils.response import success_response, error_response, not_found_error, server_error
+from utils.auth import verify_token
+from ..jobs import crawl_job_queue, serialize_job, JobStateError
+
+# 设置日志记录器
+logger = setup_logger("crawler_jobs_api", "crawler")
+
+# 创建路由
+router = APIRouter()
+
+
+def parse_object_id(value: str, name: str) -> ObjectId:
+    """解析 ObjectId
+
+    Raises:
+        ValueError: 格式无效
+    """
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise ValueError(f"无效的{name}: {value}")
+
+
+@router.get("/crawl-jobs")
+async def list_crawl_jobs(
+    novel_id: Optional[str] = None,
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    _: dict = Depends(verify_token),
+):
+    """获取爬取任务列表，按创建时间倒序"""
+    try:
+        novel_oid = parse_object_id(novel_id, "小说ID") if novel_id else None
+        jobs = await crawl_job_queue.list(novel_oid, status, skip, min(max(limit, 1), 100))
+        return success_response([serialize_job(job) for job in jobs])
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except Exception as e:
+        logger.error(f"获取爬取任务列表失败: {str(e)}")
+        return server_error("获取爬取任务列表失败")
+
+
+@router.get("/crawl-jobs/{job_id}")
+async def get_crawl_job(job_id: str, _: dict = Depends(verify_token)):
+    """获取爬取任务进度"""
+    try:
+        job = await crawl_job_queue.get(parse_object_id(job_id, "任务ID"))
+        if not job:
+            return not_found_error(f"任务不存在: {job_id}")
+        return success_response(serialize_job(job, include_urls=True))
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except Exception as e:
+        logger.error(f"获取爬取任务失败: {str(e)}")
+        return server_error("获取爬取任务失败")
+
+
+@router.post("/crawl-jobs/{job_id}/cancel")
+async def cancel_crawl_job(job_id: str, _: dict = Depends(verify_token)):
+    """取消排队中或执行中的爬取任务"""
+    try:
+        job_oid = parse_object_id(job_id, "任务ID")
+        if not await crawl_job_queue.get(job_oid):
+            return not_found_error(f"任务不存在: {job_id}")
+        job = await crawl_job_queue.cancel(job_oid)
+        logger.info(f"爬取任务取消请求: {job_id}")
+        return success_response(serialize_job(job))
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except JobStateError as e:
+        return error_response(str(e), status_code=409)
+    except Exception as e:
+        logger.error(f"取消爬取任务失败: {str(e)}")
+        return server_error("取消爬取任务失败")
+
+
+@router.post("/crawl-jobs/{job_id}/retry")
+async def retry_crawl_job(job_id: str, _: dict = Depends(verify_token)):
+    """重新执行失败或已取消的爬取任务，已保存的章节不会重复爬取"""
+    try:
+        job_oid = parse_object_id(job_id, "任务ID")
+        if not await crawl_job_queue.get(job_oid):
+            return not_found_error(f"任务不存在: {job_id}")
+        job = await crawl_job_queue.retry(job_oid)
+        logger.info(f"爬取任务已重新排队: {job_id}")
+        return success_response(serialize_job(job))
+    except ValueError as e:
+        return error_response(str(e), status_code=400)
+    except JobStateError as e:
+        return error_response(str(e), status_code=409)
+    except Exception as e:
+        logger.error(f"重试爬取任务失败: {str(e)}")
+        return server_error("重试爬取任务失败")
@@ -0,0 +1,171 @@
+"""章节批量写入模块
+
+爬取的章节先进入缓冲区，达到条数阈值或距第一条缓冲超过时间阈值时
+用一次 insert_many(ordered=False) 写入，代替每章一次 insert_one 往返。
+chapters 集合在 (novel_id, chapter_number) 上有唯一索引，
+重复章节由服务端逐条拒绝，同批其他章节照常写入，重复的章节逐条记录。
+"""
+
+import os
+import time
+import asyncio
+from typing import Callable, Dict, List, Optional
+from pymongo.errors import BulkWriteError
+from prometheus_client import Counter, Histogram
+from utils import metrics
+from utils.logger import setup_logger
+from . import database
+
+# 设置日志记录器
+logger = setup_logger("crawler_writer", "crawler_worker", hot_path=True)
+
+# 批量写入配置
+WRITE_CONFIG = {
+    # 缓冲达到该条数时写入
+    "batch_size": int(os.getenv("CRAWLER_WRITE_BATCH_SIZE", "100")),
+    # 缓冲中最早的章节等待超过该时间（秒）时写入
+    "flush_interval": float(os.getenv("CRAWLER_WRITE_FLUSH_INTERVAL", "2")),
+}
+
+# MongoDB 重复键错误码
+DUPLICATE_KEY_ERROR = 11000
+
+CHAPTERS_WRITTEN = Counter(
+    "crawler_chapters_written_total",
+    "写入的章节数，result 为 inserted、duplicate 或 failed",
+    ["service", "result"],
+)
+CHAPTER_FLUSH_DURATION = Histogram(
+    "crawler_chapter_flush_seconds",
+    "章节批量写入耗时",
+    ["service"],
+)
+CHAPTER_FLUSH_SIZE = Histogram(
+    "crawler_chapter_flush_size",
+    "每次批量写入的章节数",
+    ["service"],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+
+class ChapterWriter:
+    """章节写入缓冲区，在 async with 块内使用，退出时写入剩余章节"""
+
+    def __init__(self, batch_size: int, flush_interval: float, on_flush: Optional[Callable[[], None]] = None):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.buffer: List[Dict] = []
+        self.lock = asyncio.Lock()
+        self.timer: Optional[asyncio.Task] = None
+        self.inserted = 0
+        # 因重复被拒绝的章节序号
+        self.duplicates: List[int] = []
+        # 因其他错误写入失败的章节序号
+        self.failed: List[int] = []
+        # 定时写入失败的异常，在下一次 add 或退出时抛出
+        self.error: Optional[Exception] = None
+        self.started_at = time.monotonic()
+
+    async def __aenter__(self) -> "ChapterWriter":
+        self.started_at = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if exc_type is None:
+            self.raise_error()
+            await self.flush()
+            return
+        # 出错或被取消时也写入已爬取的章节，恢复任务时不必重新爬取，写入失败不掩盖原异常
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"写入剩余章节失败: {str(e)}")
+
+    async def add(self, chapter: Dict) -> None:
+        """加入缓冲区，达到条数阈值时立即写入"""
+        self.raise_error()
+        self.buffer.append(chapter)
+        if len(self.buffer) >= self.batch_size:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        """时间阈值到达后写入"""
+        await asyncio.sleep(self.flush_interval)
+        self.timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"定时写入章节失败: {str(e)}")
+            self.error = e
+
+    def raise_error(self) -> None:
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    async def flush(self) -> None:
+        """写入缓冲区中的全部章节"""
+        async with self.lock:
+            if not self.buffer:
+                return
+            batch, self.buffer = self.buffer, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            await self._write(batch)
+        if self.on_flush is not None:
+            self.on_flush()
+
+    async def _write(self, batch: List[Dict]) -> None:
+        """insert_many(ordered=False) 写入一批章节，逐条记录重复和失败的章节"""
+        started_at = time.perf_counter()
+        duplicates = failed = 0
+        try:
+            result = await database.async_db.chapters.insert_many(batch, ordered=False)
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            inserted = details.get("nInserted", 0)
+            for error in details.get("writeErrors", []):
+                chapter = batch[error["index"]]
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    duplicates += 1
+                    self.duplicates.append(chapter["chapter_number"])
+                    logger.warning(f"章节已存在，跳过: 第 {chapter['chapter_number']} 章 {chapter.get('source_url')}")
+                else:
+                    failed += 1
+                    self.failed.append(chapter["chapter_number"])
+                    logger.error(f"章节写入失败: 第 {chapter['chapter_number']} 章 {chapter.get('source_url')}: {error.get('errmsg')}")
+            # 写关注错误无法确认写入结果，交给调用方处理
+            if details.get("writeConcernErrors"):
+                raise
+        finally:
+            duration = time.perf_counter() - started_at
+            CHAPTER_FLUSH_DURATION.labels(metrics.service_name).observe(duration)
+            CHAPTER_FLUSH_SIZE.labels(metrics.service_name).observe(len(batch))
+        self.inserted += inserted
+        CHAPTERS_WRITTEN.labels(metrics.service_name, "inserted").inc(inserted)
+        CHAPTERS_WRITTEN.labels(metrics.service_name, "duplicate").inc(duplicates)
+        CHAPTERS_WRITTEN.labels(metrics.service_name, "failed").inc(failed)
+        logger.info(f"批量写入章节: {inserted}/{len(batch)} 条, 耗时 {duration * 1000:.1f} ms")
+
+    def get_stats(self) -> Dict:
+        """写入统计，chapters_per_second 为写入成功的章节数除以开始以来的时间"""
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "inserted": self.inserted,
+            "duplicates": len(self.duplicates),
+            "write_failed": len(self.failed),
+            "chapters_per_second": round(self.inserted / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+def create_writer(on_flush: Optional[Callable[[], None]] = None) -> ChapterWriter:
+    """按配置创建章节写入缓冲区"""
+    return ChapterWriter(WRITE_CONFIG["batch_size"], WRITE_CONFIG["flush_interval"], on_flush=on_flush)
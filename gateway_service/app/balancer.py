@@ -0,0 +1,231 @@
+"""网关负载均衡模块
+
+每个上游服务可以配置多个实例，支持轮询、最少未完成请求和一致性哈希三种策略，
+并通过主动健康检查和被动失败统计摘除不可用的实例。
+"""
+
+import os
+import asyncio
+import bisect
+import hashlib
+import itertools
+from typing import Dict, List, Optional, Any
+import httpx
+from fastapi import Request
+from utils.logger import setup_logger
+
+# 设置日志记录器
+logger = setup_logger("gateway_balancer", "gateway")
+
+# 负载均衡策略
+STRATEGY_ROUND_ROBIN = "round_robin"
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGY_CONSISTENT_HASH = "consistent_hash"
+
+# 负载均衡配置，策略、哈希键和健康检查路径可通过 <KEY>_<SERVICE> 按服务覆盖
+BALANCER_CONFIG = {
+    "strategy": os.getenv("GATEWAY_LB_STRATEGY", STRATEGY_ROUND_ROBIN),
+    # 一致性哈希键: header:<名称> 或 path:<路径段序号>，未配置时使用客户端 IP
+    "hash_key": os.getenv("GATEWAY_LB_HASH_KEY", ""),
+    "virtual_nodes": int(os.getenv("GATEWAY_LB_VIRTUAL_NODES", "100")),
+    # 健康检查路径，只有 2xx/3xx 响应视为健康
+    "health_path": os.getenv("GATEWAY_HEALTH_PATH", "/health"),
+    "health_interval": float(os.getenv("GATEWAY_HEALTH_INTERVAL", "10")),
+    "health_timeout": float(os.getenv("GATEWAY_HEALTH_TIMEOUT", "2")),
+    # 连续失败次数达到该值后摘除实例
+    "unhealthy_threshold": int(os.getenv("GATEWAY_HEALTH_FAILURES", "2")),
+}
+
+
+def get_service_option(env_key: str, service: str, default: str) -> str:
+    """获取按服务覆盖的配置项，例如 GATEWAY_LB_STRATEGY_SYSTEM"""
+    return os.getenv(f"{env_key}_{service.upper()}", default)
+
+
+def hash_value(value: str) -> int:
+    """计算一致性哈希值"""
+    return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+
+class UpstreamInstance:
+    """上游服务实例"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        self.failures = 0
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取实例状态"""
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+        }
+
+
+class LoadBalancer:
+    """单个上游服务的负载均衡器"""
+
+    def __init__(
+        self,
+        service: str,
+        urls: List[str],
+        strategy: str,
+        hash_key: str,
+        virtual_nodes: int,
+        unhealthy_threshold: int
+    ):
+        if strategy not in (STRATEGY_ROUND_ROBIN, STRATEGY_LEAST_OUTSTANDING, STRATEGY_CONSISTENT_HASH):
+            raise ValueError(f"未知的负载均衡策略: {strategy}")
+        self.service = service
+        self.instances = [UpstreamInstance(url) for url in urls]
+        self.strategy = strategy
+        self.hash_key = hash_key
+        self.unhealthy_threshold = unhealthy_threshold
+        self.counter = itertools.count()
+        # 一致性哈希环: 有序的哈希值及其对应的实例
+        self.ring: List[int] = []
+        self.ring_instances: List[UpstreamInstance] = []
+        if strategy == STRATEGY_CONSISTENT_HASH:
+            nodes = sorted(
+                (hash_value(f"{instance.url}#{i}"), index)
+                for index, instance in enumerate(self.instances)
+                for i in range(virtual_nodes)
+            )
+            self.ring = [node for node, _ in nodes]
+            self.ring_instances = [self.instances[index] for _, index in nodes]
+
+    def get_hash_source(self, request: Request, path: str) -> str:
+        """获取一致性哈希的输入值"""
+        kind, _, name = self.hash_key.partition(":")
+        if kind == "header":
+            value = request.headers.get(name)
+            if value:
+                return value
+        elif kind == "path":
+            segments = [segment for segment in path.split("/") if segment]
+            index = int(name or 0)
+            if index < len(segments):
+                return segments[index]
+        return request.client.host if request.client else ""
+
+    def choose(self, request: Request, path: str) -> UpstreamInstance:
+        """为请求选择一个上游实例
+
+        所有实例都不健康时退化为在全部实例中选择，由熔断器负责快速失败。
+        """
+        healthy = [instance for instance in self.instances if instance.healthy]
+        candidates = healthy or self.instances
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.strategy == STRATEGY_LEAST_OUTSTANDING:
+            return min(candidates, key=lambda instance: instance.outstanding)
+
+        if self.strategy == STRATEGY_CONSISTENT_HASH:
+            start = bisect.bisect(self.ring, hash_value(self.get_hash_source(request, path)))
+            # 沿哈希环顺时针找到第一个可用实例
+            for offset in range(len(self.ring)):
+                instance = self.ring_instances[(start + offset) % len(self.ring)]
+                if instance in candidates:
+                    return instance
+
+        return candidates[next(self.counter) % len(candidates)]
+
+    def report(self, instance: UpstreamInstance, failed: bool) -> None:
+        """记录实例调用或健康检查结果"""
+        if not failed:
+            if not instance.healthy:
+                logger.info(f"上游实例已恢复: {self.service} {instance.url}")
+            instance.failures = 0
+            instance.healthy = True
+            return
+        instance.failures += 1
+        if instance.healthy and instance.failures >= self.unhealthy_threshold:
+            instance.healthy = False
+            logger.warning(f"上游实例已摘除: {self.service} {instance.url}, 连续失败 {instance.failures} 次")
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取负载均衡器状态"""
+        return {
+            "strategy": self.strategy,
+            "instances": [instance.get_status() for instance in self.instances],
+        }
+
+
+class LoadBalancers:
+    """按上游服务管理负载均衡器和健康检查"""
+
+    def __init__(self):
+        self.balancers: Dict[str, LoadBalancer] = {}
+        self.health_task: Optional[asyncio.Task] = None
+
+    def start(self, routes: Dict[str, List[str]]) -> None:
+        """为每个上游服务创建负载均衡器
+
+        Args:
+            routes: 服务名称到实例地址列表的映射
+        """
+        for service, urls in routes.items():
+            self.balancers[service] = LoadBalancer(
+                service=service,
+                urls=urls,
+                strategy=get_service_option("GATEWAY_LB_STRATEGY", service, BALANCER_CONFIG["strategy"]),
+                hash_key=get_service_option("GATEWAY_LB_HASH_KEY", service, BALANCER_CONFIG["hash_key"]),
+                virtual_nodes=BALANCER_CONFIG["virtual_nodes"],
+                unhealthy_threshold=BALANCER_CONFIG["unhealthy_threshold"],
+            )
+            logger.info(f"负载均衡器已创建: {service}, 策略: {self.balancers[service].strategy}, 实例: {urls}")
+
+    def get(self, service: str) -> LoadBalancer:
+        """获取上游服务的负载均衡器"""
+        return self.balancers[service]
+
+    async def check_instance(self, service: str, instance: UpstreamInstance, client: httpx.AsyncClient) -> None:
+        """对单个实例执行健康检查，2xx/3xx 响应视为健康，健康检查路径不存在（404）也视为失败"""
+        health_path = get_service_option("GATEWAY_HEALTH_PATH", service, BALANCER_CONFIG["health_path"])
+        url = f"{instance.url}{health_path}"
+        try:
+            response = await client.get(url, timeout=BALANCER_CONFIG["health_timeout"])
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.balancers[service].report(instance, failed)
+
+    async def run_health_checks(self, clients) -> None:
+        """周期性地对所有实例执行主动健康检查"""
+        while True:
+            checks = [
+                self.check_instance(service, instance, clients.get(service))
+                for service, balancer in self.balancers.items()
+                if clients.get(service) is not None
+                for instance in balancer.instances
+            ]
+            await asyncio.gather(*checks, return_exceptions=True)
+            await asyncio.sleep(BALANCER_CONFIG["health_interval"])
+
+    def start_health_checks(self, clients) -> None:
+        """启动后台健康检查任务"""
+        self.health_task = asyncio.create_task(self.run_health_checks(clients))
+        logger.info(f"上游健康检查已启动, 间隔: {BALANCER_CONFIG['health_interval']}s")
+
+    async def stop_health_checks(self) -> None:
+        """停止后台健康检查任务"""
+        if self.health_task is not None:
+            self.health_task.cancel()
+            try:
+                await self.health_task
+            except asyncio.CancelledError:
+                pass
+            self.health_task = None
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有负载均衡器状态"""
+        return {service: balancer.get_status() for service, balancer in self.balancers.items()}
+
+
+# 全局负载均衡器
+load_balancers = LoadBalancers()
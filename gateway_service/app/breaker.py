@@ -0,0 +1,177 @@
+"""网关熔断器模块
+
+每个上游服务一个熔断器，基于最近若干次调用的失败率和慢调用率在
+closed/open/half_open 三种状态之间切换，熔断期间直接快速失败。
+"""
+
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Any, Tuple
+from utils.logger import setup_logger
+
+# 设置日志记录器
+logger = setup_logger("gateway_breaker", "gateway")
+
+# 熔断器状态
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# 熔断器配置，慢调用阈值可通过 GATEWAY_BREAKER_SLOW_CALL_SECONDS_<SERVICE> 按服务覆盖
+BREAKER_CONFIG = {
+    "enabled": os.getenv("GATEWAY_BREAKER_ENABLED", "true").lower() == "true",
+    "window_size": int(os.getenv("GATEWAY_BREAKER_WINDOW", "20")),
+    "min_calls": int(os.getenv("GATEWAY_BREAKER_MIN_CALLS", "10")),
+    "failure_rate": float(os.getenv("GATEWAY_BREAKER_FAILURE_RATE", "0.5")),
+    "slow_call_seconds": float(os.getenv("GATEWAY_BREAKER_SLOW_CALL_SECONDS", "5")),
+    "slow_call_rate": float(os.getenv("GATEWAY_BREAKER_SLOW_CALL_RATE", "0.8")),
+    "open_seconds": float(os.getenv("GATEWAY_BREAKER_OPEN_SECONDS", "30")),
+    "half_open_calls": int(os.getenv("GATEWAY_BREAKER_HALF_OPEN_CALLS", "3")),
+}
+
+
+class CircuitBreaker:
+    """单个上游服务的熔断器"""
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float,
+        half_open_calls: int
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        # 最近调用结果: (是否失败, 是否慢调用)
+        self.window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self.state = STATE_CLOSED
+        self.opened_at = 0.0
+        self.half_open_inflight = 0
+        self.half_open_successes = 0
+        self.rejected = 0
+
+    def _transition(self, state: str) -> None:
+        """切换熔断器状态"""
+        if state == self.state:
+            return
+        logger.warning(f"熔断器状态变更: {self.name} {self.state} -> {state}")
+        self.state = state
+        if state == STATE_OPEN:
+            self.opened_at = time.monotonic()
+        elif state == STATE_HALF_OPEN:
+            self.half_open_inflight = 0
+            self.half_open_successes = 0
+        else:
+            self.window.clear()
+
+    def retry_after(self) -> int:
+        """熔断状态下距离下次探测的秒数"""
+        remaining = self.opened_at + self.open_seconds - time.monotonic()
+        return max(1, int(remaining + 0.999))
+
+    def allow_request(self) -> bool:
+        """判断是否允许请求通过"""
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self._transition(STATE_HALF_OPEN)
+        if self.state == STATE_HALF_OPEN:
+            if self.half_open_inflight >= self.half_open_calls:
+                self.rejected += 1
+                return False
+            self.half_open_inflight += 1
+        return True
+
+    def release(self) -> None:
+        """请求未完成就被取消时释放半开状态的探测名额"""
+        if self.state == STATE_HALF_OPEN:
+            self.half_open_inflight = max(0, self.half_open_inflight - 1)
+
+    def record(self, failed: bool, duration: float) -> None:
+        """记录一次调用结果
+
+        Args:
+            failed: 调用是否失败（连接错误、超时或 5xx）
+            duration: 调用耗时（秒）
+        """
+        slow = duration >= self.slow_call_seconds
+        if self.state == STATE_HALF_OPEN:
+            self.half_open_inflight = max(0, self.half_open_inflight - 1)
+            if failed or slow:
+                self._transition(STATE_OPEN)
+                return
+            self.half_open_successes += 1
+            if self.half_open_successes >= self.half_open_calls:
+                self._transition(STATE_CLOSED)
+            return
+        if self.state == STATE_OPEN:
+            return
+
+        self.window.append((failed, slow))
+        calls = len(self.window)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self.window if f)
+        slow_calls = sum(1 for _, s in self.window if s)
+        if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+            self._transition(STATE_OPEN)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        calls = len(self.window)
+        failures = sum(1 for f, _ in self.window if f)
+        slow_calls = sum(1 for _, s in self.window if s)
+        return {
+            "state": self.state,
+            "calls": calls,
+            "failure_rate": round(failures / calls, 3) if calls else 0.0,
+            "slow_call_rate": round(slow_calls / calls, 3) if calls else 0.0,
+            "slow_call_seconds": self.slow_call_seconds,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state == STATE_OPEN else 0,
+        }
+
+
+class CircuitBreakers:
+    """按上游服务管理熔断器"""
+
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def start(self, services) -> None:
+        """为每个上游服务创建熔断器"""
+        for service in services:
+            slow_call_seconds = os.getenv(f"GATEWAY_BREAKER_SLOW_CALL_SECONDS_{service.upper()}")
+            self.breakers[service] = CircuitBreaker(
+                name=service,
+                window_size=BREAKER_CONFIG["window_size"],
+                min_calls=BREAKER_CONFIG["min_calls"],
+                failure_rate=BREAKER_CONFIG["failure_rate"],
+                slow_call_seconds=float(slow_call_seconds) if slow_call_seconds else BREAKER_CONFIG["slow_call_seconds"],
+                slow_call_rate=BREAKER_CONFIG["slow_call_rate"],
+                open_seconds=BREAKER_CONFIG["open_seconds"],
+                half_open_calls=BREAKER_CONFIG["half_open_calls"],
+            )
+
+    def get(self, service: str) -> CircuitBreaker:
+        """获取上游服务的熔断器"""
+        return self.breakers[service]
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有熔断器状态"""
+        return {service: breaker.get_status() for service, breaker in self.breakers.items()}
+
+
+# 全局熔断器
+circuit_breakers = CircuitBreakers()
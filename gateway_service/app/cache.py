@@ -0,0 +1,260 @@
+"""网关响应缓存模块
+
+对幂等的 GET 请求按路由配置 TTL 进行缓存，支持 LRU 与字节数淘汰、
+ETag/If-None-Match 协商以及并发未命中合并（single-flight）。
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Pattern, Tuple
+from utils.logger import setup_logger
+
+# 设置日志记录器
+logger = setup_logger("gateway_cache", "gateway")
+
+# 默认的路由缓存时间（秒），{name} 匹配单个路径段
+DEFAULT_CACHE_ROUTES = {
+    "/system/system": 5,
+    "/system/devices/statistics/summary": 30,
+    "/admin/menus": 60,
+    "/crawler/novels/{id}": 300,
+}
+
+# 写操作的级联失效：写入某个资源时，除了该资源自身，还要使依赖它的缓存路径失效
+DEFAULT_CACHE_DEPENDENCIES = {
+    # 角色的菜单分配决定 GET /admin/menus?role_id=... 的结果
+    "/admin/roles": ["/admin/menus"],
+}
+
+# 缓存配置
+CACHE_CONFIG = {
+    "enabled": os.getenv("GATEWAY_CACHE_ENABLED", "true").lower() == "true",
+    "max_entries": int(os.getenv("GATEWAY_CACHE_MAX_ENTRIES", "1024")),
+    "max_bytes": int(os.getenv("GATEWAY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    "max_entry_bytes": int(os.getenv("GATEWAY_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024))),
+    # JSON 格式的路由 TTL 配置，例如 {"/admin/menus": 120}，会覆盖默认配置
+    "routes": {**DEFAULT_CACHE_ROUTES, **json.loads(os.getenv("GATEWAY_CACHE_ROUTES", "{}"))},
+    # JSON 格式的级联失效配置，例如 {"/admin/roles": ["/admin/menus"]}，会覆盖默认配置
+    "dependencies": {**DEFAULT_CACHE_DEPENDENCIES, **json.loads(os.getenv("GATEWAY_CACHE_DEPENDENCIES", "{}"))},
+}
+
+
+def compile_route(route: str) -> Pattern:
+    """将路由模板编译为正则表达式"""
+    pattern = re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(route.rstrip("/")))
+    return re.compile(f"^{pattern}/?$")
+
+
+def make_etag(body: bytes) -> str:
+    """根据响应体生成 ETag"""
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+
+class CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ("path", "status_code", "headers", "body", "etag", "upstream_etag", "expires_at", "size")
+
+    def __init__(
+        self,
+        path: str,
+        status_code: int,
+        headers: Dict[str, str],
+        body: bytes,
+        ttl: float,
+        upstream_etag: Optional[str] = None
+    ):
+        self.path = path
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.etag = make_etag(body)
+        self.upstream_etag = upstream_etag
+        self.expires_at = time.monotonic() + ttl
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers.items())
+
+    @property
+    def fresh(self) -> bool:
+        """条目是否仍在有效期内"""
+        return time.monotonic() < self.expires_at
+
+    def refresh(self, ttl: float) -> None:
+        """上游确认未变更后延长有效期"""
+        self.expires_at = time.monotonic() + ttl
+
+
+class ResponseCache:
+    """基于 LRU 和字节数上限的响应缓存"""
+
+    def __init__(
+        self,
+        routes: Dict[str, float],
+        max_entries: int,
+        max_bytes: int,
+        max_entry_bytes: int,
+        dependencies: Optional[Dict[str, List[str]]] = None
+    ):
+        self.routes: List[Tuple[Pattern, float]] = [
+            (compile_route(route), float(ttl)) for route, ttl in routes.items()
+        ]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.dependencies = dependencies or {}
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "revalidated": 0,
+            "not_modified": 0,
+            "evictions": 0,
+        }
+
+    def get_ttl(self, path: str) -> Optional[float]:
+        """获取路径对应的缓存时间，未配置的路径返回 None"""
+        for pattern, ttl in self.routes:
+            if pattern.match(path):
+                return ttl
+        return None
+
+    @staticmethod
+    def build_key(method: str, path: str, query: str, subject: str) -> str:
+        """构建缓存键，包含方法、路径、查询参数和认证主体"""
+        return f"{method} {path}?{query}#{subject}"
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """查找缓存条目（可能已过期），命中时更新 LRU 顺序"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key: str, entry: CacheEntry) -> None:
+        """写入缓存条目，并按 LRU 淘汰超出上限的条目"""
+        if entry.status_code != 200 or entry.size > self.max_entry_bytes:
+            return
+        self.discard(key)
+        self.entries[key] = entry
+        self.total_bytes += entry.size
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.stats["evictions"] += 1
+
+    def discard(self, key: str) -> None:
+        """删除缓存条目"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """删除路径以指定前缀开头的所有缓存条目
+
+        Returns:
+            int: 删除的条目数
+        """
+        keys = [key for key, entry in self.entries.items() if entry.path.startswith(prefix)]
+        for key in keys:
+            self.discard(key)
+        if keys:
+            logger.info(f"缓存已失效: {prefix}, 条目数: {len(keys)}")
+        return len(keys)
+
+    def invalidate_write(self, service: str, path: str) -> int:
+        """写操作后使同一资源及依赖它的缓存失效
+
+        例如 PUT /admin/menus/1 使 /admin/menus 失效，POST /admin/roles/1/menus 同时使 /admin/menus 失效。
+        失效只作用于当前进程，其他网关进程的缓存在 TTL 到期后更新。
+
+        Returns:
+            int: 删除的条目数
+        """
+        resource = f"/{service}/{path.split('/', 1)[0]}"
+        return sum(self.invalidate_prefix(prefix) for prefix in [resource, *self.dependencies.get(resource, [])])
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        ttl: float,
+        loader: Callable[[Optional[CacheEntry]], Awaitable[CacheEntry]]
+    ) -> Tuple[CacheEntry, str]:
+        """获取缓存条目，未命中时调用 loader 回源
+
+        同一个键的并发未命中只会触发一次回源，其余请求等待同一结果；
+        回源请求被取消（如客户端断开）时，等待者重新竞争，由其中一个重新回源。
+
+        Args:
+            key: 缓存键
+            ttl: 缓存时间（秒）
+            loader: 回源函数，参数为已过期的旧条目（用于上游协商缓存）
+
+        Returns:
+            Tuple[CacheEntry, str]: 缓存条目和缓存状态（HIT/MISS/REVALIDATED）
+        """
+        while True:
+            entry = self.lookup(key)
+            if entry is not None and entry.fresh:
+                self.stats["hits"] += 1
+                return entry, "HIT"
+
+            inflight = self.inflight.get(key)
+            if inflight is None:
+                break
+            self.stats["coalesced"] += 1
+            # asyncio.wait 在自身被取消时抛出 CancelledError，但不会取消共享的回源结果
+            await asyncio.wait([inflight])
+            if not inflight.cancelled():
+                return inflight.result(), "HIT"
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            fetched = await loader(entry)
+            if fetched is entry:
+                # 上游返回 304，旧条目仍然有效
+                entry.refresh(ttl)
+                self.stats["revalidated"] += 1
+                status = "REVALIDATED"
+            else:
+                self.store(key, fetched)
+                status = "MISS"
+            future.set_result(fetched)
+            return fetched, status
+        except asyncio.CancelledError:
+            # 只通知等待者重新竞争，不把取消传给它们
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 避免没有等待者时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
+
+
+# 全局响应缓存
+response_cache = ResponseCache(
+    routes=CACHE_CONFIG["routes"],
+    max_entries=CACHE_CONFIG["max_entries"],
+    max_bytes=CACHE_CONFIG["max_bytes"],
+    max_entry_bytes=CACHE_CONFIG["max_entry_bytes"],
+    dependencies=CACHE_CONFIG["dependencies"],
+)
@@ -0,0 +1,84 @@
+"""网关身份验证模块
+
+网关对 Bearer Token 只验证一次，已验证的声明按 Token 哈希缓存到过期时间，
+再以签名身份头的形式转发给后端服务。缓存命中时仍检查令牌吊销表，
+已吊销的令牌和刷新令牌不生成身份头。
+"""
+
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from jose import JWTError, jwt
+from utils.auth import SECRET_KEY, ALGORITHM, sign_identity
+from utils.logger import setup_logger
+from utils.revocation import revocation_list
+
+# 设置日志记录器
+logger = setup_logger("gateway_identity", "gateway")
+
+# 身份验证配置
+IDENTITY_CONFIG = {
+    "enabled": os.getenv("GATEWAY_VERIFY_JWT", "true").lower() == "true",
+    "cache_size": int(os.getenv("GATEWAY_TOKEN_CACHE_SIZE", "10000")),
+}
+
+
+class TokenVerifier:
+    """带缓存的 JWT 验证器"""
+
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        # Token 哈希 -> (声明, 签名身份头, 过期时间戳)
+        self.cache: "OrderedDict[str, Tuple[dict, Tuple[str, str], float]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "rejected": 0, "revoked": 0}
+
+    def verify(self, token: str) -> Optional[Tuple[dict, Tuple[str, str]]]:
+        """验证 Token
+
+        Returns:
+            Optional[Tuple[dict, Tuple[str, str]]]: 声明和签名身份头，Token 无效或已过期时返回 None
+        """
+        key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            claims, identity_headers, exp = cached
+            if exp > time.time():
+                if revocation_list.is_revoked(claims):
+                    del self.cache[key]
+                    self.stats["revoked"] += 1
+                    return None
+                self.cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return claims, identity_headers
+            del self.cache[key]
+
+        self.stats["misses"] += 1
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            logger.warning(f"Token验证失败: {str(e)}")
+            self.stats["rejected"] += 1
+            return None
+        exp = claims.get("exp")
+        if exp is None or claims.get("type") == "refresh":
+            self.stats["rejected"] += 1
+            return None
+        if revocation_list.is_revoked(claims):
+            self.stats["revoked"] += 1
+            return None
+
+        identity_headers = sign_identity(claims)
+        self.cache[key] = (claims, identity_headers, float(exp))
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return claims, identity_headers
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取验证缓存统计信息"""
+        return {**self.stats, "entries": len(self.cache)}
+
+
+# 全局 Token 验证器
+token_verifier = TokenVerifier(cache_size=IDENTITY_CONFIG["cache_size"])
@@ -1,9 +1,8 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import os
-from dotenv import load_dotenv
 from utils.logger import setup_logger
 from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
@@ -13,26 +12,92 @@ from fastapi.openapi.docs import (
     get_swagger_ui_oauth2_redirect_html,
 )
 from utils.docs import setup_docs
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
+from starlette.background import BackgroundTask
+import hashlib
+import time
+from typing import Awaitable, Callable, List, Tuple
+# utils.config 导入时加载 .env，必须先于下面各模块导入，它们在导入时读取 GATEWAY_* 配置
+from utils.config import get_instance_ports
+from .upstream import upstream_clients, UPSTREAM_POOL_CONFIG
+from .cache import response_cache, CacheEntry, CACHE_CONFIG
+from .breaker import circuit_breakers, BREAKER_CONFIG
+from .balancer import load_balancers, UpstreamInstance
+from .identity import token_verifier, IDENTITY_CONFIG
+from .ratelimit import rate_limiter, RATE_LIMIT_CONFIG
+from utils.response import success_response, etag_matches
+from utils.auth import IDENTITY_HEADER, IDENTITY_SIGNATURE_HEADER
+from utils.revocation import revocation_list
+from utils.metrics import setup_metrics, merge_metrics
+from utils.compression import setup_compression
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import asyncio
 
 # 设置日志记录器
-logger = setup_logger("gateway", "gateway")
+logger = setup_logger("gateway", "gateway", hot_path=True)
 
-load_dotenv()
+# 服务端口配置
+SERVICE_PORTS = {
+    "admin": os.getenv('ADMIN_SERVICE_PORT'),
+    "system": os.getenv('SYSTEM_SERVICE_PORT'),
+    "crawler": os.getenv('CRAWLER_SERVICE_PORT'),
+    "ai": os.getenv('AI_SERVICE_PORT')
+}
+
+def build_service_routes() -> Dict[str, List[str]]:
+    """构建服务路由配置
+    
+    每个服务对应一组实例地址。可通过 GATEWAY_UPSTREAMS_<SERVICE> 显式配置
+    逗号分隔的实例地址，否则按 <SERVICE>_INSTANCES 在服务端口上连续展开，
+    与 services/server.py 启动的多实例保持一致。
+    """
+    routes = {}
+    for service, port in SERVICE_PORTS.items():
+        upstreams = os.getenv(f"GATEWAY_UPSTREAMS_{service.upper()}")
+        if upstreams:
+            routes[service] = [url.strip().rstrip("/") for url in upstreams.split(",") if url.strip()]
+        else:
+            routes[service] = [f"http://localhost:{p}" for p in get_instance_ports(service, int(port))]
+    return routes
 
 # 服务路由配置
-SERVICE_ROUTES = {
-    "admin": f"http://localhost:{os.getenv('ADMIN_SERVICE_PORT')}",
-    "system": f"http://localhost:{os.getenv('SYSTEM_SERVICE_PORT')}",
-    "crawler": f"http://localhost:{os.getenv('CRAWLER_SERVICE_PORT')}",
-    "ai": f"http://localhost:{os.getenv('AI_SERVICE_PORT')}"
+SERVICE_ROUTES = build_service_routes()
+
+# 代理模式: stream 为流式透传（默认），buffered 为缓冲整个响应后再返回
+PROXY_MODE = os.getenv("GATEWAY_PROXY_MODE", "stream").lower()
+
+# 逐跳头部，不应在代理两端之间转发
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
 }
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("API Gateway 启动")
     logger.info(f"服务路由配置: {SERVICE_ROUTES}")
+    logger.info(f"代理模式: {PROXY_MODE}")
+    logger.info(f"响应缓存: {'启用' if CACHE_CONFIG['enabled'] else '禁用'}, 路由: {CACHE_CONFIG['routes']}")
+    logger.info(f"上游连接池配置: {UPSTREAM_POOL_CONFIG}")
+    logger.info(f"网关 JWT 验证: {'启用' if IDENTITY_CONFIG['enabled'] else '禁用'}")
+    upstream_clients.start(SERVICE_ROUTES)
+    circuit_breakers.start(SERVICE_ROUTES)
+    load_balancers.start(SERVICE_ROUTES)
+    load_balancers.start_health_checks(upstream_clients)
+    if RATE_LIMIT_CONFIG["enabled"]:
+        await rate_limiter.start(RATE_LIMIT_CONFIG["redis"])
     yield
+    await rate_limiter.close()
+    await revocation_list.close()
+    await load_balancers.stop_health_checks()
+    await upstream_clients.close()
     logger.info("API Gateway 关闭")
 
 app = FastAPI(
@@ -57,58 +122,321 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# 初始化指标采集
+setup_metrics(app, "gateway")
+
+# 启用响应压缩（已由上游压缩的流式响应原样透传）
+setup_compression(app)
+
 # 挂载静态文件
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-async def forward_request(service: str, path: str, request: Request) -> Dict[str, Any]:
-    """转发请求到对应的微服务"""
+def resolve_upstream(
+    service: str,
+    path: str,
+    request: Request
+) -> Tuple[httpx.AsyncClient, UpstreamInstance, str]:
+    """为请求选择上游实例并构建转发地址"""
     if service not in SERVICE_ROUTES:
         logger.error(f"服务未找到: {service}")
         raise HTTPException(status_code=404, detail="Service not found")
     
-    service_url = SERVICE_ROUTES[service]
-    url = f"{service_url}{path}"
+    # 复用该服务的长连接客户端
+    client = upstream_clients.get(service)
+    if client is None:
+        logger.error(f"上游连接池未初始化: {service}")
+        raise HTTPException(status_code=503, detail="Service unavailable: upstream client not ready")
+    
+    instance = load_balancers.get(service).choose(request, path)
+    url = f"{instance.url}{path}"
+    if request.url.query:
+        url = f"{url}?{request.url.query}"
+    return client, instance, url
+
+async def send_upstream(
+    service: str,
+    instance: UpstreamInstance,
+    url: str,
+    send: Callable[[], Awaitable[httpx.Response]],
+    hold: bool = False
+) -> httpx.Response:
+    """经过熔断器向上游实例发送请求
+    
+    熔断器打开时直接返回 503，连接错误、超时和 5xx 响应计为失败。
+    hold 为 True 时请求成功后实例的未完成请求数由调用方在响应关闭时释放。
+    """
+    breaker = circuit_breakers.get(service) if BREAKER_CONFIG["enabled"] else None
+    if breaker is not None and not breaker.allow_request():
+        logger.warning(f"熔断器已打开，快速失败: {url}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service unavailable: circuit breaker open for {service}",
+            headers={"Retry-After": str(breaker.retry_after())}
+        )
+    
+    balancer = load_balancers.get(service)
+    instance.outstanding += 1
+    start_time = time.monotonic()
+    try:
+        response = await send()
+    except httpx.RequestError as e:
+        instance.outstanding -= 1
+        balancer.report(instance, True)
+        if breaker is not None:
+            breaker.record(True, time.monotonic() - start_time)
+        logger.error(f"服务请求失败 {url}: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
+    except BaseException:
+        # 请求被取消等非上游原因，只释放半开状态的探测名额
+        instance.outstanding -= 1
+        if breaker is not None:
+            breaker.release()
+        raise
+    
+    if not hold:
+        instance.outstanding -= 1
+    balancer.report(instance, response.status_code >= 500)
+    if breaker is not None:
+        breaker.record(response.status_code >= 500, time.monotonic() - start_time)
+    return response
+
+async def forward_request(service: str, path: str, request: Request) -> Dict[str, Any]:
+    """转发请求到对应的微服务"""
+    client, instance, url = resolve_upstream(service, path, request)
     logger.info(f"转发请求到: {url}")
     
-    async with httpx.AsyncClient() as client:
-        try:
-            # 获取原始请求的方法、头部和数据
-            method = request.method
-            headers = dict(request.headers)
-            body = await request.body()
-            
-            # 转发请求
-            response = await client.request(
-                method=method,
-                url=url,
-                headers=headers,
-                content=body
+    try:
+        # 获取原始请求的方法、头部和数据
+        method = request.method
+        headers = build_upstream_headers(request)
+        body = await request.body()
+        
+        # 转发请求
+        response = await send_upstream(service, instance, url, lambda: client.request(
+            method=method,
+            url=url,
+            headers=headers,
+            content=body
+        ))
+        
+        logger.info(f"请求成功: {url}")
+        
+        # 处理文档相关的响应
+        if path in ["/docs", "/redoc", "/openapi.json"]:
+            # 修改响应头，确保正确的内容类型
+            headers = dict(response.headers)
+            headers["content-type"] = "text/html"
+            return StreamingResponse(
+                content=iter([response.content]),
+                status_code=response.status_code,
+                headers=headers
             )
-            
-            logger.info(f"请求成功: {url}")
-            
-            # 处理文档相关的响应
-            if path in ["/docs", "/redoc", "/openapi.json"]:
-                # 修改响应头，确保正确的内容类型
-                headers = dict(response.headers)
-                headers["content-type"] = "text/html"
-                return StreamingResponse(
-                    content=iter([response.content]),
-                    status_code=response.status_code,
-                    headers=headers
-                )
-            return response.json()
-        except httpx.RequestError as e:
-            logger.error(f"服务请求失败 {url}: {str(e)}")
-            raise HTTPException(status_code=503, detail=f"Service unavailable: {str(e)}")
-        except Exception as e:
-            logger.error(f"转发请求时发生错误 {url}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        return response.json()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"转发请求时发生错误 {url}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def filter_headers(headers) -> Dict[str, str]:
+    """过滤逐跳头部"""
+    return {
+        key: value for key, value in headers.items()
+        if key.lower() not in HOP_BY_HOP_HEADERS
+    }
+
+def authenticate(request: Request) -> None:
+    """在网关验证 Bearer Token，已验证的声明保存到 request.state
+    
+    Token 无效时不在网关拒绝，交由后端服务按自身规则处理（例如登录接口）。
+    """
+    request.state.identity = None
+    request.state.identity_headers = None
+    if not IDENTITY_CONFIG["enabled"]:
+        return
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return
+    verified = token_verifier.verify(token)
+    if verified is not None:
+        request.state.identity, request.state.identity_headers = verified
+
+async def enforce_rate_limit(service: str, path: str, request: Request) -> None:
+    """按客户端 IP、JWT 主体和路由限流，超出配额时返回 429"""
+    if not RATE_LIMIT_CONFIG["enabled"]:
+        return
+    identity = getattr(request.state, "identity", None)
+    subject = str(identity["sub"]) if identity is not None and identity.get("sub") is not None else None
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await rate_limiter.check(request.method, f"/{service}/{path}", client_ip, subject)
+    if retry_after is not None:
+        logger.warning(f"请求超出限流: {request.method} /{service}/{path}, 客户端: {client_ip}, 主体: {subject}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+def build_upstream_headers(request: Request) -> Dict[str, str]:
+    """构建转发给上游的请求头
+    
+    去掉逐跳头部和 host，丢弃客户端自带的网关身份头以防伪造，
+    并附加网关签名的身份头。
+    """
+    headers = filter_headers(request.headers)
+    for name in ("host", IDENTITY_HEADER, IDENTITY_SIGNATURE_HEADER):
+        headers.pop(name, None)
+    identity_headers = getattr(request.state, "identity_headers", None)
+    if identity_headers is not None:
+        headers[IDENTITY_HEADER], headers[IDENTITY_SIGNATURE_HEADER] = identity_headers
+    return headers
+
+def has_request_body(request: Request) -> bool:
+    """判断请求是否携带请求体"""
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+async def close_stream(response: httpx.Response, instance: UpstreamInstance) -> None:
+    """关闭上游流式响应并释放实例的未完成请求数"""
+    try:
+        await response.aclose()
+    finally:
+        instance.outstanding -= 1
+
+async def stream_request(service: str, path: str, request: Request) -> StreamingResponse:
+    """以流式透传方式转发请求到对应的微服务
+    
+    请求体随到随发，上游响应的状态码、头部和字节流逐块返回给客户端，
+    网关不解析响应内容，因此适用于 SSE、大文件以及非 JSON 响应。
+    """
+    client, instance, url = resolve_upstream(service, path, request)
+    logger.info(f"流式转发请求到: {url}")
+    
+    # host 由上游地址决定，其余头部去掉逐跳头部后原样转发
+    headers = build_upstream_headers(request)
+    upstream_request = client.build_request(
+        method=request.method,
+        url=url,
+        headers=headers,
+        content=request.stream() if has_request_body(request) else None
+    )
+    
+    response = await send_upstream(
+        service, instance, url, lambda: client.send(upstream_request, stream=True), hold=True
+    )
+    
+    logger.info(f"上游已响应: {url}, 状态码: {response.status_code}")
+    
+    # 使用原始字节流，保留上游的 content-encoding 与 content-length
+    return StreamingResponse(
+        content=response.aiter_raw(),
+        status_code=response.status_code,
+        headers=filter_headers(response.headers),
+        background=BackgroundTask(close_stream, response, instance)
+    )
+
+def get_auth_subject(request: Request) -> str:
+    """获取请求的认证主体，用于区分不同用户的缓存"""
+    identity = getattr(request.state, "identity", None)
+    if identity is not None and identity.get("sub") is not None:
+        return f"sub:{identity['sub']}"
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return "anonymous"
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+async def cached_request(service: str, path: str, request: Request, ttl: float) -> Response:
+    """通过响应缓存转发幂等的 GET 请求"""
+    client, instance, url = resolve_upstream(service, path, request)
+    cache_path = f"/{service}{path}"
+    key = response_cache.build_key(request.method, cache_path, request.url.query, get_auth_subject(request))
+    
+    async def load(stale: Optional[CacheEntry]) -> CacheEntry:
+        """回源获取响应，旧条目带有上游 ETag 时进行协商"""
+        headers = build_upstream_headers(request)
+        for name in ("if-none-match", "accept-encoding"):
+            headers.pop(name, None)
+        if stale is not None and stale.upstream_etag:
+            headers["if-none-match"] = stale.upstream_etag
+        logger.info(f"缓存回源: {url}")
+        response = await send_upstream(service, instance, url, lambda: client.get(url, headers=headers))
+        if response.status_code == 304 and stale is not None:
+            return stale
+        # httpx 已解码响应体，去掉编码和长度相关的头部
+        response_headers = {
+            key: value for key, value in filter_headers(response.headers).items()
+            if key.lower() not in ("content-encoding", "content-length", "etag")
+        }
+        return CacheEntry(
+            path=cache_path,
+            status_code=response.status_code,
+            headers=response_headers,
+            body=response.content,
+            ttl=ttl,
+            upstream_etag=response.headers.get("etag")
+        )
+    
+    entry, cache_status = await response_cache.get_or_fetch(key, ttl, load)
+    
+    headers = {**entry.headers, "etag": entry.etag, "x-cache": cache_status}
+    if entry.status_code == 200 and etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.stats["not_modified"] += 1
+        return Response(status_code=304, headers={"etag": entry.etag, "x-cache": cache_status})
+    return Response(content=entry.body, status_code=entry.status_code, headers=headers)
+
+@app.get("/gateway/status")
+async def gateway_status():
+    """获取网关状态，包括熔断器、响应缓存和连接池配置"""
+    return success_response(data={
+        "routes": SERVICE_ROUTES,
+        "proxy_mode": PROXY_MODE,
+        "breakers": circuit_breakers.get_status(),
+        "balancers": load_balancers.get_status(),
+        "token_cache": token_verifier.get_stats(),
+        "rate_limit": rate_limiter.get_stats(),
+        "cache": response_cache.get_stats(),
+        "pool": UPSTREAM_POOL_CONFIG,
+    })
+
+async def fetch_instance_metrics(service: str, url: str) -> Optional[str]:
+    """获取单个上游实例的指标文本，失败时返回 None"""
+    client = upstream_clients.get(service)
+    if client is None:
+        return None
+    try:
+        response = await client.get(f"{url}/metrics", timeout=5)
+        if response.status_code == 200:
+            return response.text
+        logger.warning(f"获取实例指标失败 {url}: 状态码 {response.status_code}")
+    except httpx.HTTPError as e:
+        logger.warning(f"获取实例指标失败 {url}: {str(e)}")
+    return None
+
+@app.get("/gateway/metrics", include_in_schema=False)
+async def gateway_metrics():
+    """汇总网关自身及所有上游实例的指标，每个样本带有 instance 标签"""
+    instances = [(service, url) for service, urls in SERVICE_ROUTES.items() for url in urls]
+    results = await asyncio.gather(*(fetch_instance_metrics(service, url) for service, url in instances))
+    sources = [("gateway", generate_latest().decode())]
+    sources.extend((url, text) for (_, url), text in zip(instances, results) if text is not None)
+    return Response(content=merge_metrics(sources), media_type=CONTENT_TYPE_LATEST)
 
 @app.api_route("/{service}/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def gateway_route(service: str, path: str, request: Request):
     """通用路由处理器"""
+    authenticate(request)
+    await enforce_rate_limit(service, path, request)
+    if CACHE_CONFIG["enabled"] and request.method == "GET":
+        ttl = response_cache.get_ttl(f"/{service}/{path}")
+        if ttl is not None:
+            return await cached_request(service, f"/{path}", request, ttl)
+    if PROXY_MODE == "stream":
+        response = await stream_request(service, f"/{path}", request)
     # 处理文档路径
-    if path in ["docs", "redoc", "openapi.json"]:
-        return await forward_request(service, f"/{path}", request)
-    return await forward_request(service, f"/{path}", request) 
\ No newline at end of file
+    elif path in ["docs", "redoc", "openapi.json"]:
+        response = await forward_request(service, f"/{path}", request)
+    else:
+        response = await forward_request(service, f"/{path}", request)
+    if CACHE_CONFIG["enabled"] and request.method != "GET":
+        # 写操作使同一资源及依赖它的缓存失效
+        response_cache.invalidate_write(service, path)
+    return response
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""网关限流模块
+
+基于令牌桶按客户端 IP、JWT 主体和路由限流。默认在进程内存中保存令牌桶，
+开启 Redis 后端后多个网关进程共享同一份配额。
+一个请求涉及的令牌桶全部有令牌时才一起扣减，被拒绝的请求不消耗任何配额。
+"""
+
+import os
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Tuple
+from utils.logger import setup_logger
+from utils.metrics import instrument_redis
+from .cache import compile_route
+
+# 设置日志记录器
+logger = setup_logger("gateway_ratelimit", "gateway")
+
+# 默认的路由限流规则，格式为 "<请求数>/<秒数>"，作用于该路由的全部请求
+DEFAULT_ROUTE_LIMITS = {
+    "POST /crawler/novels/{id}/chapters": "5/60",
+    "GET /system/system/processes": "30/60",
+}
+
+# 限流配置，规则为空字符串时关闭对应的限流器
+RATE_LIMIT_CONFIG = {
+    "enabled": os.getenv("GATEWAY_RATE_LIMIT_ENABLED", "true").lower() == "true",
+    "ip": os.getenv("GATEWAY_RATE_LIMIT_IP", "200/10"),
+    "subject": os.getenv("GATEWAY_RATE_LIMIT_SUBJECT", "100/10"),
+    # JSON 格式的路由限流规则，例如 {"GET /system/system/processes": "10/60"}，会覆盖默认配置
+    "routes": {**DEFAULT_ROUTE_LIMITS, **json.loads(os.getenv("GATEWAY_RATE_LIMIT_ROUTES", "{}"))},
+    "redis": os.getenv("GATEWAY_RATE_LIMIT_REDIS", "false").lower() == "true",
+    "max_buckets": int(os.getenv("GATEWAY_RATE_LIMIT_MAX_BUCKETS", "100000")),
+}
+
+# Redis 令牌桶脚本，原子地补充一组令牌桶，全部有令牌时才各扣减一个
+# ARGV 为 now 后接每个桶的 capacity 和 rate，返回每个桶需要等待的秒数
+REDIS_TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local waits = {}
+local allowed = 1
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local data = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local current = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    current = math.min(capacity, current + math.max(0, now - ts) * rate)
+    tokens[i] = current
+    if current >= 1 then
+        waits[i] = '0'
+    else
+        waits[i] = tostring((1 - current) / rate)
+        allowed = 0
+    end
+end
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', KEYS[i], 'tokens', tokens[i] - allowed, 'ts', now)
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 1)
+end
+return waits
+"""
+
+
+def parse_limit(limit: str) -> Optional[Tuple[float, float]]:
+    """解析限流规则
+
+    Args:
+        limit: 形如 "100/10" 的规则，表示 10 秒内最多 100 个请求
+
+    Returns:
+        Optional[Tuple[float, float]]: 令牌桶容量和每秒补充速率，规则为空时返回 None
+    """
+    if not limit:
+        return None
+    count, _, seconds = limit.partition("/")
+    capacity = float(count)
+    return capacity, capacity / float(seconds or 1)
+
+
+class TokenBucket:
+    """内存令牌桶"""
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, capacity: float):
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, capacity: float, rate: float) -> float:
+        """按经过的时间补充令牌，不扣减
+
+        Returns:
+            float: 0 表示有可用令牌，否则为需要等待的秒数
+        """
+        now = time.monotonic()
+        self.tokens = min(capacity, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class RateLimiter:
+    """按 IP、主体和路由组合限流"""
+
+    def __init__(self, ip_limit: str, subject_limit: str, route_limits: Dict[str, str], max_buckets: int):
+        self.limits = {
+            "ip": parse_limit(ip_limit),
+            "subject": parse_limit(subject_limit),
+        }
+        self.routes: List[Tuple[str, Pattern, Tuple[float, float]]] = []
+        for rule, limit in route_limits.items():
+            method, _, route = rule.partition(" ")
+            parsed = parse_limit(limit)
+            if parsed is not None:
+                self.routes.append((method.upper(), compile_route(route), parsed))
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.redis = None
+        self.script = None
+        self.stats = {kind: {"hits": 0, "misses": 0} for kind in ("ip", "subject", "route")}
+
+    async def start(self, use_redis: bool) -> None:
+        """初始化 Redis 后端，Redis 不可用时退回内存令牌桶"""
+        if not use_redis:
+            return
+        try:
+            import redis.asyncio as aioredis
+            from utils.config import REDIS_CONFIG
+
+            self.redis = aioredis.Redis(
+                host=REDIS_CONFIG["host"],
+                port=REDIS_CONFIG["port"],
+                password=REDIS_CONFIG["password"] or None,
+                db=REDIS_CONFIG["db"],
+            )
+            instrument_redis(self.redis)
+            self.script = self.redis.register_script(REDIS_TOKEN_BUCKET_SCRIPT)
+            await self.redis.ping()
+            logger.info("限流已使用 Redis 后端")
+        except Exception as e:
+            logger.warning(f"Redis 限流后端初始化失败，使用内存令牌桶: {str(e)}")
+            self.redis = None
+            self.script = None
+
+    async def close(self) -> None:
+        """关闭 Redis 连接"""
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    def _take_local(self, checks: List[Tuple[str, str, Tuple[float, float]]]) -> List[float]:
+        """从内存令牌桶取出令牌，全部有令牌时才扣减"""
+        buckets = []
+        waits = []
+        for _, key, (capacity, rate) in checks:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(capacity)
+                if len(self.buckets) > self.max_buckets:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+            buckets.append(bucket)
+            waits.append(bucket.refill(capacity, rate))
+        if not any(waits):
+            for bucket in buckets:
+                bucket.tokens -= 1
+        return waits
+
+    async def _take(self, checks: List[Tuple[str, str, Tuple[float, float]]]) -> List[float]:
+        """取出令牌，返回每个令牌桶需要等待的秒数，全部为 0 时放行"""
+        if self.script is not None:
+            try:
+                args = [time.time()]
+                for _, _, (capacity, rate) in checks:
+                    args += [capacity, rate]
+                waits = await self.script(
+                    keys=[f"gateway:ratelimit:{key}" for _, key, _ in checks],
+                    args=args
+                )
+                return [float(wait) for wait in waits]
+            except Exception as e:
+                logger.warning(f"Redis 限流失败，使用内存令牌桶: {str(e)}")
+        return self._take_local(checks)
+
+    async def check(self, method: str, path: str, client_ip: str, subject: Optional[str]) -> Optional[int]:
+        """检查请求是否超出限流
+
+        Returns:
+            Optional[int]: 放行时返回 None，否则返回 Retry-After 秒数
+        """
+        checks = []
+        for rule_method, pattern, limit in self.routes:
+            if rule_method == method and pattern.match(path):
+                checks.append(("route", f"route:{rule_method} {pattern.pattern}", limit))
+                break
+        if subject is not None and self.limits["subject"] is not None:
+            checks.append(("subject", f"subject:{subject}", self.limits["subject"]))
+        elif self.limits["ip"] is not None:
+            checks.append(("ip", f"ip:{client_ip}", self.limits["ip"]))
+
+        if not checks:
+            return None
+        waits = await self._take(checks)
+        for (kind, _, _), wait in zip(checks, waits):
+            self.stats[kind]["misses" if wait > 0 else "hits"] += 1
+        wait = max(waits)
+        if wait > 0:
+            return max(1, math.ceil(wait))
+        return None
+
+    def get_stats(self) -> Dict[str, object]:
+        """获取限流统计信息"""
+        return {
+            "backend": "redis" if self.script is not None else "memory",
+            "buckets": len(self.buckets),
+            "counters": self.stats,
+        }
+
+
+# 全局限流器
+rate_limiter = RateLimiter(
+    ip_limit=RATE_LIMIT_CONFIG["ip"],
+    subject_limit=RATE_LIMIT_CONFIG["subject"],
+    route_limits=RATE_LIMIT_CONFIG["routes"],
+    max_buckets=RATE_LIMIT_CONFIG["max_buckets"],
+)
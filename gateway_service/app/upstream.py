@@ -0,0 +1,78 @@
+"""网关上游连接池管理模块"""
+
+import os
+import httpx
+from typing import Dict, List, Optional
+from utils.logger import setup_logger
+
+# 设置日志记录器
+logger = setup_logger("gateway_upstream", "gateway")
+
+# 连接池配置
+UPSTREAM_POOL_CONFIG = {
+    "max_connections": int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("GATEWAY_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    "keepalive_expiry": float(os.getenv("GATEWAY_KEEPALIVE_EXPIRY", "30")),
+}
+
+# 超时配置（秒），可通过 GATEWAY_TIMEOUT_<SERVICE> 按服务覆盖读取超时
+UPSTREAM_TIMEOUT_CONFIG = {
+    "connect": float(os.getenv("GATEWAY_CONNECT_TIMEOUT", "5")),
+    "read": float(os.getenv("GATEWAY_READ_TIMEOUT", "30")),
+    "write": float(os.getenv("GATEWAY_WRITE_TIMEOUT", "30")),
+    "pool": float(os.getenv("GATEWAY_POOL_TIMEOUT", "5")),
+}
+
+
+def get_upstream_timeout(service: str) -> httpx.Timeout:
+    """获取指定上游服务的超时配置
+
+    Args:
+        service: 服务名称
+
+    Returns:
+        httpx.Timeout: 超时配置
+    """
+    read_timeout = os.getenv(f"GATEWAY_TIMEOUT_{service.upper()}")
+    return httpx.Timeout(
+        connect=UPSTREAM_TIMEOUT_CONFIG["connect"],
+        read=float(read_timeout) if read_timeout else UPSTREAM_TIMEOUT_CONFIG["read"],
+        write=UPSTREAM_TIMEOUT_CONFIG["write"],
+        pool=UPSTREAM_TIMEOUT_CONFIG["pool"],
+    )
+
+
+class UpstreamClients:
+    """每个上游服务一个长连接客户端，在应用生命周期内复用"""
+
+    def __init__(self):
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+
+    def start(self, routes: Dict[str, List[str]]) -> None:
+        """为每个上游服务创建连接池，同一服务的多个实例共享一个客户端
+
+        Args:
+            routes: 服务名称到实例地址列表的映射
+        """
+        limits = httpx.Limits(**UPSTREAM_POOL_CONFIG)
+        for service, urls in routes.items():
+            self.clients[service] = httpx.AsyncClient(
+                limits=limits,
+                timeout=get_upstream_timeout(service),
+            )
+            logger.info(f"上游连接池已创建: {service} -> {urls}")
+
+    def get(self, service: str) -> Optional[httpx.AsyncClient]:
+        """获取上游服务的客户端"""
+        return self.clients.get(service)
+
+    async def close(self) -> None:
+        """关闭所有上游连接池"""
+        for service, client in self.clients.items():
+            await client.aclose()
+            logger.info(f"上游连接池已关闭: {service}")
+        self.clients.clear()
+
+
+# 全局上游客户端
+upstream_clients = UpstreamClients()
@@ -21,10 +21,13 @@ def start(
 ):
     """启动服务"""
     try:
-        from services.server import run_all, run_service
+        from services.server import SERVICES, run_all, run_service, get_service_ports
         
         if service == "all":
             run_all()
+        elif service in SERVICES and len(get_service_ports(service)) > 1:
+            # 配置了多实例的服务按连续端口启动多个进程
+            run_all([service])
         else:
             run_service(service)
             
@@ -0,0 +1,92 @@
+"""后台管理服务并发压测
+
+以固定并发持续请求后台管理服务的接口，统计吞吐量和延迟分位数。
+在同步数据库会话和异步数据库会话两个版本上分别运行，即可对比并发能力。
+
+用法:
+    python scripts/bench_admin_load.py --token <JWT> [--url http://localhost:8000/users?limit=10]
+        [--concurrency 1,10,50,100] [--requests 500]
+
+不传 --token 时使用 --username/--password 登录获取令牌。
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List
+import httpx
+
+
+async def login(base_url: str, username: str, password: str) -> str:
+    """登录获取访问令牌"""
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.post("/auth/login", data={"username": username, "password": password})
+        response.raise_for_status()
+        return response.json()["data"]["access_token"]
+
+
+async def run_level(url: str, token: str, concurrency: int, total: int) -> Dict[str, float]:
+    """以指定并发发送 total 个请求"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        "errors": errors,
+    }
+
+
+async def main(args) -> int:
+    token = args.token
+    if not token:
+        token = await login(args.base_url, args.username, args.password)
+    url = args.url or f"{args.base_url}/users?limit=10"
+
+    print(f"压测接口: {url}")
+    print(f"{'并发':>6} {'吞吐(req/s)':>12} {'P50(ms)':>10} {'P99(ms)':>10} {'错误':>6}")
+    print("-" * 50)
+    for concurrency in [int(value) for value in args.concurrency.split(",")]:
+        report = await run_level(url, token, concurrency, args.requests)
+        print(
+            f"{report['concurrency']:>6} {report['rps']:>12.1f} {report['p50_ms']:>10.1f} "
+            f"{report['p99_ms']:>10.1f} {report['errors']:>6}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="后台管理服务并发压测")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--url", help="压测的完整地址，默认为 <base-url>/users?limit=10")
+    parser.add_argument("--token", help="访问令牌")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrency", default="1,10,50,100", help="逗号分隔的并发级别")
+    parser.add_argument("--requests", type=int, default=500, help="每个并发级别的请求数")
+    sys.exit(asyncio.run(main(parser.parse_args())))
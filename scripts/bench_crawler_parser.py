@@ -0,0 +1,131 @@
+"""爬虫页面解析基准
+
+在保存的页面样本上比较各解析后端的单页解析耗时，并与原来的
+BeautifulSoup(html, 'html.parser') + select_one 做对照；同时检查各后端解析出的字段是否一致
+（忽略空白差异，各解析器对标签之间缩进空白的处理不同）。
+传入 --processes 时再测量进程池并行解析的吞吐量。
+
+页面样本按文件名前缀区分类型：novel*.html 为小说页，chapter*.html 为章节页，
+使用 crawler_service.app.parser 中的默认选择器。
+
+用法:
+    python scripts/bench_crawler_parser.py [--fixtures scripts/fixtures/crawler_pages]
+        [--iterations 200] [--backends selectolax,lxml,bs4] [--processes 4]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from crawler_service.app.parser import DEFAULT_SELECTORS, available_backends, parse_page
+
+FIXTURE_URL = "http://fixture.local/"
+
+
+def load_fixtures(directory: str) -> List[Tuple[str, str, str]]:
+    """读取页面样本，返回 (文件名, 页面类型, HTML) 列表"""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        name = os.path.basename(path)
+        page_type = next((page_type for page_type in DEFAULT_SELECTORS if name.startswith(page_type)), None)
+        if page_type is None:
+            continue
+        with open(path, encoding="utf-8") as f:
+            fixtures.append((name, page_type, f.read()))
+    return fixtures
+
+
+def parse_baseline(page_type: str, html: str) -> Dict[str, str]:
+    """原来的解析方式：html.parser 构建完整文档树后逐个 select_one"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return {field: soup.select_one(selector).text.strip() for field, selector in DEFAULT_SELECTORS[page_type].items()}
+
+
+def normalize(fields: Dict[str, str]) -> Dict[str, str]:
+    """合并空白后比较字段内容"""
+    return {field: " ".join(value.split()) for field, value in fields.items()}
+
+
+def measure(func, iterations: int) -> float:
+    """重复执行，返回单次耗时的中位数（毫秒）"""
+    func()  # 预热，包括选择器编译
+    samples = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(samples)
+
+
+def bench_pool(backend: str, fixtures: List[Tuple[str, str, str]], processes: int, iterations: int) -> float:
+    """进程池并行解析全部样本，返回每秒解析页数"""
+    jobs = [(backend, FIXTURE_URL, page_type, html) for _, page_type, html in fixtures] * iterations
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        # 预热：启动子进程并编译选择器
+        list(executor.map(parse_page, *zip(*jobs[:processes * 2])))
+        started_at = time.perf_counter()
+        list(executor.map(parse_page, *zip(*jobs), chunksize=8))
+        elapsed = time.perf_counter() - started_at
+    return len(jobs) / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="爬虫页面解析基准")
+    parser.add_argument("--fixtures", default=os.path.join(BASE_DIR, "scripts", "fixtures", "crawler_pages"))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--backends", default=",".join(available_backends()))
+    parser.add_argument("--processes", type=int, default=0)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"未找到页面样本: {args.fixtures}")
+        return 1
+    backends = [backend for backend in args.backends.split(",") if backend]
+    unavailable = [backend for backend in backends if backend not in available_backends()]
+    if unavailable:
+        print(f"以下后端不可用，跳过: {', '.join(unavailable)}")
+        backends = [backend for backend in backends if backend not in unavailable]
+
+    mismatches = []
+    print(f"{'页面':<16} {'大小(KB)':>9}  {'后端':<22} {'耗时(ms)':>9} {'加速比':>7}")
+    print("-" * 70)
+    for name, page_type, html in fixtures:
+        expected = normalize(parse_baseline(page_type, html))
+        baseline_ms = measure(lambda: parse_baseline(page_type, html), args.iterations)
+        print(f"{name:<16} {len(html.encode()) / 1024:>9.1f}  {'bs4 (html.parser 原实现)':<22} {baseline_ms:>9.3f} {1:>7.1f}")
+        for backend in backends:
+            fields = normalize(parse_page(backend, FIXTURE_URL, page_type, html))
+            if fields != expected:
+                mismatches.append(f"{name}: {backend}")
+            elapsed_ms = measure(lambda: parse_page(backend, FIXTURE_URL, page_type, html), args.iterations)
+            print(f"{'':<16} {'':>9}  {backend:<22} {elapsed_ms:>9.3f} {baseline_ms / elapsed_ms:>7.1f}")
+
+    if args.processes > 0:
+        print(f"\n进程池并行解析（{args.processes} 个进程）:")
+        for backend in backends:
+            pages_per_second = bench_pool(backend, fixtures, args.processes, args.iterations)
+            print(f"    {backend:<12} {pages_per_second:>10.0f} 页/秒")
+
+    if mismatches:
+        print("\n以下后端的解析结果与原实现不一致:")
+        for mismatch in mismatches:
+            print(f"    {mismatch}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
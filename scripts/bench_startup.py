@@ -0,0 +1,121 @@
+"""服务启动耗时基准
+
+使用 python -X importtime 分别测量 services/server.py 中各服务入口模块的导入耗时，
+并与启动耗时预算比较。超出预算时以非零状态码退出，可用于 CI。
+
+用法:
+    python scripts/bench_startup.py [服务名称 ...]
+
+环境变量:
+    STARTUP_BUDGET_MS: 默认的导入耗时预算（毫秒），默认 3000
+    STARTUP_BUDGET_MS_<SERVICE>: 单个服务的预算，例如 STARTUP_BUDGET_MS_AI=8000
+    STARTUP_BENCH_RUNS: 每个服务重复测量的次数，取中位数，默认 3
+"""
+
+import os
+import re
+import sys
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from services.server import SERVICES
+
+# importtime 输出格式: "import time: self [us] | cumulative | imported package"
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def get_budget_ms(service: str) -> float:
+    """获取服务的导入耗时预算"""
+    default = os.getenv("STARTUP_BUDGET_MS", "3000")
+    return float(os.getenv(f"STARTUP_BUDGET_MS_{service.upper()}", default))
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[float, str]]]:
+    """在独立进程中导入模块并解析 importtime 输出
+
+    Returns:
+        Tuple[float, List[Tuple[float, str]]]: 入口模块的累计导入耗时（毫秒），
+        以及其直接依赖的累计耗时列表
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+
+    total_ms = 0.0
+    packages: List[Tuple[float, str]] = []
+    children: List[Tuple[float, str]] = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        indent = len(match.group(3))
+        name = match.group(4)
+        # 子模块先于父模块输出，缩进比顶层多一级的是入口模块的直接依赖
+        if indent == 3:
+            children.append((cumulative_ms, name))
+        elif indent == 1:
+            if name == module:
+                total_ms = cumulative_ms
+                packages = children
+            children = []
+    return total_ms, packages
+
+
+def bench_service(service: str, runs: int) -> Dict[str, object]:
+    """测量单个服务的导入耗时"""
+    app_path, _ = SERVICES[service]
+    module = app_path.split(":", 1)[0]
+    samples = []
+    packages: List[Tuple[float, str]] = []
+    for _ in range(runs):
+        total_ms, packages = measure_import(module)
+        samples.append(total_ms)
+    return {
+        "service": service,
+        "module": module,
+        "import_ms": statistics.median(samples),
+        "budget_ms": get_budget_ms(service),
+        "slowest": sorted(packages, reverse=True)[:5],
+    }
+
+
+def main(service_names: List[str]) -> int:
+    runs = int(os.getenv("STARTUP_BENCH_RUNS", "3"))
+    service_names = service_names or list(SERVICES.keys())
+    over_budget = []
+
+    print(f"{'服务':<10} {'导入耗时(ms)':>14} {'预算(ms)':>10}  结果")
+    print("-" * 50)
+    for service in service_names:
+        try:
+            report = bench_service(service, runs)
+        except RuntimeError as e:
+            print(f"{service:<10} {'-':>14} {get_budget_ms(service):>10.0f}  失败")
+            print(str(e))
+            over_budget.append(service)
+            continue
+        passed = report["import_ms"] <= report["budget_ms"]
+        if not passed:
+            over_budget.append(service)
+        print(f"{service:<10} {report['import_ms']:>14.1f} {report['budget_ms']:>10.0f}  {'通过' if passed else '超出预算'}")
+        for ms, name in report["slowest"]:
+            print(f"    {name:<40} {ms:>8.1f}")
+
+    if over_budget:
+        print(f"\n超出启动耗时预算的服务: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
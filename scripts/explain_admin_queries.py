@@ -0,0 +1,99 @@
+"""检查后台管理列表查询的执行计划
+
+用与 /users、/roles/ 接口相同的筛选条件、排序键和分页语句生成查询，逐条执行 EXPLAIN，
+确认每个筛选和排序都命中索引，没有对 users、roles、user_roles 做全表扫描。
+存在全表扫描时以非零状态码退出，可在部署或修改索引后运行。
+
+MySQL 对很小的表可能直接选择全表扫描，估计行数低于 ADMIN_EXPLAIN_MIN_ROWS（默认 1000）
+的表只报告不判定失败，请在接近生产数据量的库上运行。
+
+用法:
+    python scripts/explain_admin_queries.py
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from sqlalchemy import select
+from admin_service.app.database import engine
+from admin_service.app.models import Role
+from admin_service.app.users.models import User
+from admin_service.app.pagination import encode_cursor, page_statement
+from admin_service.app.search import USER_SORTS, ROLE_SORTS, user_conditions, role_conditions
+
+# 需要检查的表
+CHECKED_TABLES = {"users", "roles", "user_roles"}
+
+
+def page_query(model, sorts, sort, conditions, seek_values=None, limit=20):
+    """通过 fetch_page 使用的 page_statement 生成分页查询，seek_values 为游标中的排序键值"""
+    sort_key = sorts[sort]
+    cursor = encode_cursor(sort_key, seek_values) if seek_values is not None else None
+    return page_statement(select(model).where(*conditions), sort_key, limit, cursor)
+
+
+def build_queries():
+    """列表接口的典型查询"""
+    now = datetime.utcnow()
+    month_ago = now - timedelta(days=30)
+    return [
+        ("用户: 默认排序", page_query(User, USER_SORTS, "id", [])),
+        ("用户: 游标翻页", page_query(User, USER_SORTS, "id", [], seek_values=[100000])),
+        ("用户: 用户名前缀", page_query(User, USER_SORTS, "username", user_conditions(username="adm"))),
+        ("用户: 邮箱前缀", page_query(User, USER_SORTS, "id", user_conditions(email="admin@"))),
+        ("用户: 启用状态", page_query(User, USER_SORTS, "id", user_conditions(is_active=True))),
+        ("用户: 启用状态+创建时间排序", page_query(User, USER_SORTS, "-created_at", user_conditions(is_active=True))),
+        ("用户: 创建时间范围", page_query(
+            User, USER_SORTS, "-created_at", user_conditions(created_from=month_ago, created_to=now)
+        )),
+        ("用户: 创建时间游标翻页", page_query(User, USER_SORTS, "created_at", [], seek_values=[month_ago, 100000])),
+        ("用户: 角色编码", page_query(User, USER_SORTS, "id", user_conditions(role_code="fcadmin"))),
+        ("角色: 编码前缀", page_query(Role, ROLE_SORTS, "code", role_conditions(code="sys"))),
+        ("角色: 名称前缀", page_query(Role, ROLE_SORTS, "name", role_conditions(name="管理"))),
+        ("角色: 创建时间排序", page_query(Role, ROLE_SORTS, "-created_at", [])),
+    ]
+
+
+def explain(connection, statement):
+    """执行 EXPLAIN，返回每行的字典"""
+    compiled = statement.compile(dialect=engine.dialect)
+    result = connection.exec_driver_sql(f"EXPLAIN {compiled.string}", compiled.params)
+    columns = list(result.keys())
+    return [dict(zip(columns, row)) for row in result]
+
+
+def main() -> int:
+    min_rows = int(os.getenv("ADMIN_EXPLAIN_MIN_ROWS", "1000"))
+    failures = []
+    with engine.connect() as connection:
+        for title, statement in build_queries():
+            print(title)
+            for row in explain(connection, statement):
+                table = row.get("table")
+                rows = int(row.get("rows") or 0)
+                full_scan = row.get("type") == "ALL" and table in CHECKED_TABLES
+                status = ""
+                if full_scan:
+                    status = "全表扫描" if rows >= min_rows else "全表扫描（表太小，跳过）"
+                    if rows >= min_rows:
+                        failures.append(f"{title}: {table}")
+                print(
+                    f"    {str(table):<12} type={str(row.get('type')):<8} key={str(row.get('key')):<36} "
+                    f"rows={rows:<8} {row.get('Extra') or ''} {status}"
+                )
+
+    if failures:
+        print("\n以下查询未命中索引:")
+        for failure in failures:
+            print(f"    {failure}")
+        return 1
+    print("\n所有列表查询均命中索引")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,36 +4,53 @@ import os
 import sys
 import signal
 import multiprocessing
-from typing import Dict, List
+from typing import Dict, List, Optional
 from utils.logger import setup_logger
-from utils.config import SERVICE_CONFIG
+from utils.config import get_service_settings, get_instance_ports, validate_config
 
 # 设置日志记录器
 logger = setup_logger("server", "server")
 
+service_settings = get_service_settings()
+
 # 服务映射
 SERVICES = {
-    "admin": ("admin_service.app.main:app", SERVICE_CONFIG["admin_port"]),
-    "crawler": ("crawler_service.app.main:app", SERVICE_CONFIG["crawler_port"]),
-    "system": ("system_service.app.main:app", SERVICE_CONFIG["system_port"]),
-    "ai": ("ai_service.app.main:app", SERVICE_CONFIG["ai_port"]),
-    "gateway": ("gateway_service.app.main:app", SERVICE_CONFIG["gateway_port"]),
+    "admin": ("admin_service.app.main:app", service_settings.admin_port),
+    "crawler": ("crawler_service.app.main:app", service_settings.crawler_port),
+    "system": ("system_service.app.main:app", service_settings.system_port),
+    "ai": ("ai_service.app.main:app", service_settings.ai_port),
+    "gateway": ("gateway_service.app.main:app", service_settings.gateway_port),
 }
 
-def run_service(service_name: str) -> None:
-    """运行单个服务
+def get_service_ports(service_name: str) -> List[int]:
+    """获取服务各实例的端口
+    
+    Args:
+        service_name: 服务名称
+    
+    Returns:
+        List[int]: 实例端口列表，通过 <NAME>_INSTANCES 配置多实例时为连续端口
+    """
+    _, port = SERVICES[service_name]
+    return get_instance_ports(service_name, port)
+
+def run_service(service_name: str, port: Optional[int] = None) -> None:
+    """运行单个服务实例
     
     Args:
         service_name: 服务名称
+        port: 实例端口，默认为服务端口
     """
     if service_name not in SERVICES:
         logger.error(f"未知的服务名称: {service_name}")
         sys.exit(1)
         
-    app_path, port = SERVICES[service_name]
+    app_path, default_port = SERVICES[service_name]
+    port = port or default_port
     logger.info(f"启动服务: {service_name}, 端口: {port}")
     
     try:
+        validate_config()
         import uvicorn
         # 在多进程管理模式下 (尤其是 Windows spawn 模式)，
         # uvicorn 的 `reload=True` 会启动额外的重载子进程，
@@ -54,9 +71,26 @@ def run_service(service_name: str) -> None:
         logger.error(f"服务启动失败: {str(e)}")
         sys.exit(1)
 
-def run_all() -> None:
-    """运行所有服务"""
+def run_all(service_names: Optional[List[str]] = None) -> None:
+    """运行所有服务
+    
+    每个服务按配置的实例数启动多个进程，各实例监听连续端口，
+    由网关在这些实例之间进行负载均衡。
+    
+    Args:
+        service_names: 要启动的服务名称列表，默认启动全部服务
+    """
     processes: Dict[str, multiprocessing.Process] = {}
+    service_names = service_names or list(SERVICES.keys())
+    
+    # 检查实例端口是否与其他服务冲突
+    used_ports: Dict[int, str] = {}
+    for name in service_names:
+        for port in get_service_ports(name):
+            if port in used_ports:
+                logger.error(f"端口冲突: {name} 与 {used_ports[port]} 都使用端口 {port}")
+                sys.exit(1)
+            used_ports[port] = name
     
     def signal_handler(signum, frame):
         """信号处理函数"""
@@ -79,16 +113,17 @@ def run_all() -> None:
     signal.signal(signal.SIGTERM, signal_handler)
     
     try:
-        # 启动所有服务
-        for name, (app_path, port) in SERVICES.items():
-            logger.info(f"启动服务: {name}, 端口: {port}")
-            process = multiprocessing.Process(
-                target=run_service,
-                args=(name,),
-                daemon=False  # 显式设置为非守护进程
-            )
-            process.start()
-            processes[name] = process
+        # 启动所有服务实例
+        for name in service_names:
+            for port in get_service_ports(name):
+                logger.info(f"启动服务: {name}, 端口: {port}")
+                process = multiprocessing.Process(
+                    target=run_service,
+                    args=(name, port),
+                    daemon=False  # 显式设置为非守护进程
+                )
+                process.start()
+                processes[f"{name}:{port}"] = process
             
         # 等待所有进程结束
         for process in processes.values():
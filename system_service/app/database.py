@@ -5,12 +5,13 @@ import redis
 from typing import Optional
 from utils.logger import setup_logger
 from utils.config import MONGODB_URL, MONGODB_CONFIG, REDIS_CONFIG
+from utils.metrics import MongoCommandListener, instrument_redis
 
 # 设置日志记录器
 logger = setup_logger("system_database", "system_database")
 
 # 创建MongoDB客户端
-client = AsyncIOMotorClient(MONGODB_URL)
+client = AsyncIOMotorClient(MONGODB_URL, event_listeners=[MongoCommandListener()])
 
 # 获取数据库
 db = client[MONGODB_CONFIG["database"]]
@@ -35,6 +36,7 @@ def get_redis() -> redis.Redis:
                 db=REDIS_CONFIG["db"],
                 decode_responses=True  # 自动解码响应
             )
+            instrument_redis(redis_client)
             logger.info("Redis连接已建立")
         except Exception as e:
             logger.error(f"Redis连接失败: {str(e)}")
@@ -18,6 +18,8 @@ from utils.response import (
 )
 from utils.auth import verify_token
 from utils.tracing import init_tracing, create_span, add_span_attribute, set_span_status, end_span
+from utils.metrics import setup_metrics
+from utils.compression import setup_compression
 from opentelemetry.trace import StatusCode
 
 # 设置日志记录器
@@ -44,6 +46,12 @@ app = FastAPI(
 # 初始化链路追踪
 init_tracing(app, "system-service")
 
+# 初始化指标采集
+setup_metrics(app, "system")
+
+# 启用响应压缩
+setup_compression(app)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -115,12 +123,11 @@ async def get_system_info(_: dict = Depends(verify_token)):
             set_span_status(span, StatusCode.ERROR, str(e))
             return server_error("获取系统信息失败")
 
-
-        # 健康检查端点（供网关或外部监控使用）
-        @app.get("/health", include_in_schema=False)
-        async def health_check():
-            """简单的健康检查接口，返回服务可用状态"""
-            return success_response({"status": "ok"})
+# 健康检查端点（供网关或外部监控使用）
+@app.get("/health", include_in_schema=False)
+async def health_check():
+    """简单的健康检查接口，返回服务可用状态"""
+    return success_response({"status": "ok"})
 
 @app.get("/system/cpu")
 async def get_cpu_info(_: dict = Depends(verify_token)):
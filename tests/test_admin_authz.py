@@ -0,0 +1,93 @@
+"""授权快照缓存测试（进程内后端）"""
+
+import asyncio
+
+import pytest
+
+from admin_service.app import authz
+from admin_service.app.authz import AuthzCache
+
+
+class FakeSession:
+    """只实现 run_sync 的异步会话，可在读取数据后、返回快照前暂停"""
+
+    def __init__(self):
+        self.builds = 0
+        self.pause = None
+
+    async def run_sync(self, fn, *args):
+        self.builds += 1
+        result = fn(None, *args)
+        if self.pause is not None:
+            await self.pause.wait()
+        return result
+
+
+@pytest.fixture
+def grants(monkeypatch):
+    grants = {1: ["dashboard"], 2: ["dashboard"]}
+    monkeypatch.setattr(authz, "build_snapshot", lambda db, user_id: {"menu_codes": list(grants[user_id])})
+    return grants
+
+
+async def test_snapshot_is_cached(grants):
+    cache = AuthzCache(ttl=300, max_entries=10)
+    db = FakeSession()
+    assert await cache.get_snapshot(db, 1) == {"menu_codes": ["dashboard"]}
+    assert await cache.get_snapshot(db, 1) == {"menu_codes": ["dashboard"]}
+    assert db.builds == 1
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+
+async def test_invalidate_user_only_affects_that_user(grants):
+    cache = AuthzCache(ttl=300, max_entries=10)
+    db = FakeSession()
+    await cache.get_snapshot(db, 1)
+    await cache.get_snapshot(db, 2)
+    grants[1] = ["system"]
+    await cache.invalidate_user(1)
+    assert await cache.get_snapshot(db, 1) == {"menu_codes": ["system"]}
+    await cache.get_snapshot(db, 2)
+    assert db.builds == 3
+
+
+async def test_invalidate_all(grants):
+    cache = AuthzCache(ttl=300, max_entries=10)
+    db = FakeSession()
+    await cache.get_snapshot(db, 1)
+    await cache.get_snapshot(db, 2)
+    await cache.invalidate_all()
+    await cache.get_snapshot(db, 1)
+    await cache.get_snapshot(db, 2)
+    assert db.builds == 4
+
+
+@pytest.mark.parametrize("invalidate", ["user", "all"])
+async def test_invalidation_during_build_is_not_overwritten(grants, invalidate):
+    cache = AuthzCache(ttl=300, max_entries=10)
+    db = FakeSession()
+    db.pause = asyncio.Event()
+    building = asyncio.ensure_future(cache.get_snapshot(db, 1))
+    await asyncio.sleep(0)
+
+    # 构建期间用户角色变更，构建结果已经过时
+    grants[1] = ["system"]
+    if invalidate == "user":
+        await cache.invalidate_user(1)
+    else:
+        await cache.invalidate_all()
+    db.pause.set()
+    assert await building == {"menu_codes": ["dashboard"]}
+
+    db.pause = None
+    assert await cache.get_snapshot(db, 1) == {"menu_codes": ["system"]}
+    assert db.builds == 2
+
+
+async def test_entries_are_bounded(grants):
+    grants.update({user_id: [] for user_id in range(3, 10)})
+    cache = AuthzCache(ttl=300, max_entries=3)
+    db = FakeSession()
+    for user_id in range(1, 10):
+        await cache.get_snapshot(db, user_id)
+    assert list(cache.entries) == [7, 8, 9]
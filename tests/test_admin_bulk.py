@@ -0,0 +1,160 @@
+"""批量 RBAC 操作测试，使用 SQLite 内存数据库"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from admin_service.app import bulk, models, schemas
+from admin_service.app.bulk import (
+    BulkResult, bulk_assign_roles, bulk_create_users, bulk_set_role_menus, bulk_update_users
+)
+from admin_service.app.database import Base
+from admin_service.app.users.models import User
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setitem(bulk.BULK_CONFIG, "batch_size", 2)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE role_menus (role_id INTEGER, menu_code VARCHAR(100))"))
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.Role(id=1, name="管理员", code="fcadmin"),
+        models.Role(id=2, name="编辑", code="editor"),
+        models.Role(id=3, name="访客", code="guest"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def user_roles(db, user_id):
+    rows = db.execute(models.user_roles.select().where(models.user_roles.c.user_id == user_id))
+    return sorted(row.role_id for row in rows)
+
+
+def create(db, *names, role_ids=None):
+    users = [schemas.UserCreate(username=name, email=f"{name}@example.com", password="x", role_ids=role_ids)
+             for name in names]
+    return bulk_create_users(db, users, [f"hash-{name}" for name in names]).to_dict()
+
+
+def test_bulk_result_counts():
+    result = BulkResult(3)
+    result.ok(0, id=1)
+    result.fail(2, "错误")
+    data = result.to_dict()
+    assert (data["total"], data["succeeded"], data["failed"]) == (3, 1, 2)
+    assert data["results"] == [{"index": 0, "success": True, "id": 1}, None,
+                               {"index": 2, "success": False, "error": "错误"}]
+
+
+def test_create_users_reports_each_item(db):
+    create(db, "alice")
+    users = [
+        schemas.UserCreate(username="bob", email="bob@example.com", password="x", role_ids=[2]),
+        schemas.UserCreate(username="alice", email="other@example.com", password="x"),
+        schemas.UserCreate(username="carol", email="bob@example.com", password="x"),
+        schemas.UserCreate(username="dave", email="dave@example.com", password="x", role_ids=[2, 99]),
+        schemas.UserCreate(username="erin", email="erin@example.com", password="x", role_ids=[2, 3]),
+    ]
+    data = bulk_create_users(db, users, ["h"] * len(users)).to_dict()
+
+    assert [item["success"] for item in data["results"]] == [True, False, False, False, True]
+    assert data["results"][1]["error"] == "用户名已存在"
+    # 同一批次内重复的邮箱也会被拒绝
+    assert data["results"][2]["error"] == "邮箱已存在"
+    assert data["results"][3]["error"] == "角色不存在: [99]"
+    erin = db.query(User).filter_by(username="erin").one()
+    assert user_roles(db, erin.id) == [2, 3]
+    assert db.query(User).count() == 3
+
+
+def test_failed_batch_marks_only_its_items(db, monkeypatch):
+    original = bulk.insert_user_roles
+    calls = []
+
+    def flaky(db, pairs):
+        calls.append(pairs)
+        if len(calls) == 2:
+            raise RuntimeError("deadlock")
+        original(db, pairs)
+
+    monkeypatch.setattr(bulk, "insert_user_roles", flaky)
+    data = create(db, "u1", "u2", "u3", "u4", "u5", role_ids=[2])
+
+    # 每批 2 项，第二批事务失败并回滚
+    assert [item["success"] for item in data["results"]] == [True, True, False, False, True]
+    assert data["results"][2]["error"].startswith("批次事务失败")
+    assert sorted(name for name, in db.query(User.username)) == ["u1", "u2", "u5"]
+
+
+def test_update_users_reports_changed_roles(db):
+    create(db, "alice", "bob")
+    alice, bob = db.query(User).order_by(User.id).all()
+    committed = []
+    items = [
+        schemas.UserBulkUpdateItem(id=alice.id, full_name="Alice", role_ids=[3]),
+        schemas.UserBulkUpdateItem(id=bob.id, username="alice"),
+        schemas.UserBulkUpdateItem(id=999, full_name="x"),
+    ]
+    data = bulk_update_users(db, items, [None] * 3, on_commit=committed.extend).to_dict()
+
+    assert [item["success"] for item in data["results"]] == [True, False, False]
+    assert committed == [alice.id]
+    assert user_roles(db, alice.id) == [3]
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("replace", [3]),
+    ("add", [2, 3]),
+    ("remove", []),
+])
+def test_assign_roles_modes(db, mode, expected):
+    create(db, "alice", role_ids=[2])
+    alice = db.query(User).one()
+    role_ids = [2] if mode == "remove" else [3]
+    committed = []
+    items = [
+        schemas.UserRoleAssignment(user_id=alice.id, role_ids=role_ids),
+        schemas.UserRoleAssignment(user_id=999, role_ids=[2]),
+        schemas.UserRoleAssignment(user_id=alice.id, role_ids=[42]),
+    ]
+    data = bulk_assign_roles(db, items, mode, on_commit=committed.extend).to_dict()
+
+    assert [item["success"] for item in data["results"]] == [True, False, False]
+    assert data["results"][1]["error"] == "用户不存在"
+    assert committed == [alice.id]
+    assert user_roles(db, alice.id) == expected
+
+
+def test_set_role_menus(db):
+    committed = []
+    bindings = [
+        schemas.RoleMenuBinding(role_id=2, menu_codes=["system", "system:user", "system"]),
+        schemas.RoleMenuBinding(role_id=1, menu_codes=["system"]),
+        schemas.RoleMenuBinding(role_id=2, menu_codes=["dashboard"]),
+        schemas.RoleMenuBinding(role_id=99, menu_codes=["dashboard"]),
+    ]
+    data = bulk_set_role_menus(db, bindings, "fcadmin", on_commit=committed.extend).to_dict()
+
+    results = data["results"]
+    assert [item["success"] for item in results] == [True, False, True, False]
+    assert results[0]["menu_count"] == 2
+    assert results[1]["error"] == "超级管理员权限不可修改"
+    assert results[3]["error"] == "角色不存在"
+    # 不同批次中的同一角色，后一批替换前一批
+    assert committed == [2, 2]
+    rows = db.execute(text("SELECT role_id, menu_code FROM role_menus ORDER BY menu_code")).fetchall()
+    assert [tuple(row) for row in rows] == [(2, "dashboard")]
+
+
+def test_set_role_menus_rejects_duplicate_role_in_batch(db):
+    bindings = [
+        schemas.RoleMenuBinding(role_id=2, menu_codes=["a"]),
+        schemas.RoleMenuBinding(role_id=2, menu_codes=["b"]),
+    ]
+    data = bulk_set_role_menus(db, bindings, "fcadmin", on_commit=lambda ids: None).to_dict()
+    assert data["results"][1]["error"] == "同一批次中重复的角色"
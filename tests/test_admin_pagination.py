@@ -0,0 +1,163 @@
+"""游标分页测试"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from admin_service.app import pagination
+from admin_service.app.database import Base
+from admin_service.app.pagination import (
+    CountCache, CursorError, count_matching, decode_cursor, encode_cursor, fetch_page
+)
+from admin_service.app.search import ROLE_SORTS, USER_SORTS
+from admin_service.app.users.models import User
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+class AsyncFacade:
+    """把同步会话包装成 fetch_page 和 CountCache 使用的异步接口，并记录执行的语句"""
+
+    def __init__(self, session):
+        self.session = session
+        self.statements = []
+
+    async def scalars(self, statement):
+        self.statements.append(statement)
+        return self.session.scalars(statement)
+
+    async def scalar(self, statement, params=None):
+        self.statements.append(statement)
+        return self.session.scalar(statement, params)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    # 每 3 个用户共用一个创建时间，检验复合排序键在相同值上的翻页
+    session.add_all([
+        User(id=user_id, username=f"user{user_id:02d}", email=f"user{user_id:02d}@example.com",
+             created_at=START + timedelta(minutes=user_id // 3))
+        for user_id in range(1, 21)
+    ])
+    session.commit()
+    yield AsyncFacade(session)
+    session.close()
+
+
+def expected_order(sort: str):
+    users = [(user_id, START + timedelta(minutes=user_id // 3), f"user{user_id:02d}") for user_id in range(1, 21)]
+    desc = sort.startswith("-")
+    field = sort.lstrip("-")
+    key = {"id": lambda u: (u[0],), "created_at": lambda u: (u[1], u[0]), "username": lambda u: (u[2], u[0])}[field]
+    return [user[0] for user in sorted(users, key=key, reverse=desc)]
+
+
+@pytest.mark.parametrize("sort", list(USER_SORTS))
+async def test_cursor_walk_visits_every_row_once(db, sort):
+    sort_key = USER_SORTS[sort]
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = await fetch_page(db, select(User), sort_key, 4, cursor)
+        seen.extend(user.id for user in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == expected_order(sort)
+    assert pages == 5
+
+
+@pytest.mark.parametrize("sort", list(USER_SORTS))
+async def test_cursor_walk_with_null_sort_values(db, sort):
+    # 创建时间和用户名为 NULL 的用户落在页边界上；NULL 小于任何值，与 MySQL 和 SQLite 的排序一致
+    db.session.add_all([User(id=user_id, email=f"null{user_id}@example.com") for user_id in (21, 22, 23)])
+    db.session.commit()
+    db.session.execute(update(User).where(User.id > 20).values(created_at=None))
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = await fetch_page(db, select(User), USER_SORTS[sort], 4, cursor)
+        seen.extend(user.id for user in rows)
+        if cursor is None:
+            break
+
+    field = sort.lstrip("-")
+    if field == "id":
+        expected = list(range(1, 24))
+    else:
+        expected = [21, 22, 23] + expected_order(field)
+    assert seen == (expected[::-1] if sort.startswith("-") else expected)
+
+
+async def test_last_full_page_has_no_cursor(db):
+    rows, cursor = await fetch_page(db, select(User), USER_SORTS["id"], 20)
+    assert len(rows) == 20 and cursor is None
+
+
+async def test_cursor_with_filter(db):
+    statement = select(User).where(User.id > 10)
+    rows, cursor = await fetch_page(db, statement, USER_SORTS["-id"], 3)
+    assert [user.id for user in rows] == [20, 19, 18]
+    rows, _ = await fetch_page(db, statement, USER_SORTS["-id"], 3, cursor)
+    assert [user.id for user in rows] == [17, 16, 15]
+
+
+async def test_skip_is_used_only_without_cursor(db):
+    rows, cursor = await fetch_page(db, select(User), USER_SORTS["id"], 3, skip=5)
+    assert [user.id for user in rows] == [6, 7, 8]
+    rows, _ = await fetch_page(db, select(User), USER_SORTS["id"], 3, cursor, skip=5)
+    assert [user.id for user in rows] == [9, 10, 11]
+
+
+def test_cursor_round_trip_composite_and_descending():
+    sort_key = USER_SORTS["-created_at"]
+    values = [datetime(2024, 5, 6, 7, 8, 9, 123456), 42]
+    token = encode_cursor(sort_key, values)
+    assert "=" not in token
+    assert decode_cursor(sort_key, token) == values
+
+    sort_key = ROLE_SORTS["-code"]
+    assert decode_cursor(sort_key, encode_cursor(sort_key, ["编辑_%", 3])) == ["编辑_%", 3]
+    assert decode_cursor(sort_key, encode_cursor(sort_key, [None, 3])) == [None, 3]
+
+
+def test_cursor_from_other_sort_is_rejected():
+    token = encode_cursor(USER_SORTS["created_at"], [START, 1])
+    with pytest.raises(CursorError, match="排序方式"):
+        decode_cursor(USER_SORTS["-created_at"], token)
+
+
+@pytest.mark.parametrize("token", ["not-base64!!", "e30", encode_cursor(USER_SORTS["id"], ["x", 1])[:-4]])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(CursorError):
+        decode_cursor(USER_SORTS["id"], token)
+
+
+def test_cursor_with_wrong_value_count_is_rejected():
+    token = encode_cursor(USER_SORTS["id"], [1, 2])
+    with pytest.raises(CursorError):
+        decode_cursor(USER_SORTS["id"], token)
+
+
+async def test_count_matching_caps_total(db, monkeypatch):
+    monkeypatch.setitem(pagination.PAGINATION_CONFIG, "filtered_count_limit", 5)
+    assert await count_matching(db, select(User.id).where(User.id > 17)) == (3, False)
+    assert await count_matching(db, select(User.id).where(User.id > 2)) == (5, True)
+
+
+async def test_count_cache_falls_back_to_exact_count_and_caches(db):
+    cache = CountCache(ttl=60, exact_threshold=10000)
+    # SQLite 没有 information_schema，退回精确 COUNT
+    assert await cache.get(db, User) == (20, False)
+    executed = len(db.statements)
+    assert await cache.get(db, User) == (20, False)
+    assert len(db.statements) == executed
+
+    cache.invalidate(User)
+    await cache.get(db, User)
+    assert len(db.statements) > executed
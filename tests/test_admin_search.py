@@ -0,0 +1,153 @@
+"""列表筛选与分页语句测试
+
+语句通过 fetch_page 使用的 page_statement 生成，按 MySQL 方言编译后检查
+前缀匹配、游标条件、排序和 LIMIT，与 scripts/explain_admin_queries.py 检查执行计划的语句一致。
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+
+from admin_service.app.database import Base
+from admin_service.app.models import Role
+from admin_service.app.pagination import encode_cursor, fetch_page, page_statement
+from admin_service.app.search import (
+    ROLE_SORTS, USER_SORTS, SearchError, escape_like, get_sort_key, role_conditions, user_conditions
+)
+from admin_service.app.users.models import User
+
+
+def compile_mysql(statement):
+    compiled = statement.compile(dialect=mysql.dialect())
+    return " ".join(str(compiled).split()), compiled.params
+
+
+def test_escape_like():
+    assert escape_like("a_b%c\\") == "a\\_b\\%c\\\\"
+
+
+def test_prefix_filters_are_escaped_constants():
+    statement = page_statement(
+        select(User).where(*user_conditions(username="adm_%", email="x@")), USER_SORTS["username"], 20
+    )
+    sql, params = compile_mysql(statement)
+    assert "users.username LIKE %s ESCAPE '\\\\'" in sql
+    assert "users.email LIKE %s ESCAPE '\\\\'" in sql
+    assert sorted(value for value in params.values() if isinstance(value, str)) == ["adm\\_\\%%", "x@%"]
+    assert sql.endswith("ORDER BY users.username ASC, users.id ASC LIMIT %s")
+    assert params["param_1"] == 21
+
+
+def test_first_page_has_no_seek_predicate():
+    sql, _ = compile_mysql(page_statement(select(User), USER_SORTS["-created_at"], 20))
+    assert " WHERE " not in sql
+    assert "ORDER BY users.created_at DESC, users.id DESC LIMIT %s" in sql
+
+
+def test_cursor_page_uses_expanded_seek_predicate():
+    sort_key = USER_SORTS["-created_at"]
+    created_at = datetime(2024, 1, 2, 3, 4, 5)
+    cursor = encode_cursor(sort_key, [created_at, 7])
+    statement = page_statement(select(User).where(*user_conditions(is_active=True)), sort_key, 50, cursor)
+    sql, params = compile_mysql(statement)
+
+    assert ("WHERE users.is_active = true AND "
+            "(users.created_at < %s OR users.created_at IS NULL OR users.created_at = %s AND users.id < %s) "
+            "ORDER BY users.created_at DESC, users.id DESC LIMIT %s") in sql
+    assert sorted(params.values(), key=str) == sorted([created_at, created_at, 7, 51], key=str)
+
+
+def test_ascending_seek_on_unique_column_breaks_ties_by_id():
+    sort_key = ROLE_SORTS["code"]
+    statement = page_statement(select(Role), sort_key, 10, encode_cursor(sort_key, ["sys", 3]))
+    sql, params = compile_mysql(statement)
+    assert ("WHERE roles.code > %s OR roles.code = %s AND roles.id > %s "
+            "ORDER BY roles.code ASC, roles.id ASC LIMIT %s") in sql
+    assert sorted(params.values(), key=str) == sorted(["sys", "sys", 3, 11], key=str)
+
+
+def test_seek_after_null_value():
+    # NULL 升序排在最前，之后是其余 NULL（按ID）和所有非 NULL 值；降序排在最后，之后只有其余 NULL
+    sort_key = ROLE_SORTS["code"]
+    sql, params = compile_mysql(page_statement(select(Role), sort_key, 10, encode_cursor(sort_key, [None, 3])))
+    assert "WHERE roles.code IS NOT NULL OR roles.code IS NULL AND roles.id > %s ORDER BY" in sql
+    assert set(params.values()) == {3, 11}
+
+    sort_key = ROLE_SORTS["-code"]
+    sql, _ = compile_mysql(page_statement(select(Role), sort_key, 10, encode_cursor(sort_key, [None, 3])))
+    assert "WHERE roles.code IS NULL AND roles.id < %s ORDER BY" in sql
+
+
+def test_skip_without_cursor_uses_offset():
+    sql, params = compile_mysql(page_statement(select(Role), ROLE_SORTS["id"], 10, skip=30))
+    assert sql.endswith("ORDER BY roles.id ASC LIMIT %s, %s")
+    assert set(params.values()) == {30, 11}
+
+
+def test_role_code_filter_is_semi_join():
+    sql, params = compile_mysql(select(User.id).where(*user_conditions(role_code="fcadmin")))
+    assert ("users.id IN (SELECT user_roles.user_id FROM user_roles "
+            "INNER JOIN roles ON roles.id = user_roles.role_id WHERE roles.code = %s)") in sql
+    assert list(params.values()) == ["fcadmin"]
+
+
+def test_created_range_is_half_open():
+    start, end = datetime(2024, 1, 1), datetime(2024, 2, 1)
+    sql, _ = compile_mysql(select(Role.id).where(*role_conditions(created_from=start, created_to=end)))
+    assert "roles.created_at >= %s AND roles.created_at < %s" in sql
+    with pytest.raises(SearchError):
+        role_conditions(created_from=end, created_to=start)
+
+
+def test_unknown_sort_is_rejected():
+    assert get_sort_key(USER_SORTS, "-id") == USER_SORTS["-id"]
+    with pytest.raises(SearchError, match="不支持的排序方式"):
+        get_sort_key(USER_SORTS, "password")
+
+
+class RecordingSession:
+    """记录 fetch_page 实际执行的语句，并在 SQLite 上执行"""
+
+    def __init__(self, session):
+        self.session = session
+        self.statements = []
+
+    async def scalars(self, statement):
+        self.statements.append(statement)
+        return self.session.scalars(statement)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        User(id=1, username="adm_1", email="a1@example.com"),
+        User(id=2, username="admx1", email="a2@example.com"),
+        User(id=3, username="adm%2", email="a3@example.com"),
+        User(id=4, username="adm_2", email="a4@example.com"),
+    ])
+    session.commit()
+    yield RecordingSession(session)
+    session.close()
+
+
+async def test_fetch_page_executes_page_statement(db):
+    sort_key = USER_SORTS["username"]
+    statement = select(User).where(*user_conditions(username="adm_"))
+    rows, cursor = await fetch_page(db, statement, sort_key, 1)
+
+    # 通配符按字面匹配，admx1 和 adm%2 不在结果中
+    assert [user.username for user in rows] == ["adm_1"]
+    assert compile_mysql(db.statements[0]) == compile_mysql(page_statement(statement, sort_key, 1))
+
+    rows, cursor = await fetch_page(db, statement, sort_key, 1, cursor)
+    assert [user.username for user in rows] == ["adm_2"]
+    assert cursor is None
+    assert compile_mysql(db.statements[1]) == compile_mysql(
+        page_statement(statement, sort_key, 1, encode_cursor(sort_key, ["adm_1", 1]))
+    )
@@ -0,0 +1,44 @@
+"""爬虫服务索引初始化测试"""
+
+from crawler_service.app import database
+from crawler_service.app.database import CHAPTER_NUMBER_INDEX
+
+
+class FakeCollection:
+    def __init__(self, indexes=None):
+        self.indexes = dict(indexes or {})
+        self.dropped = []
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def drop_index(self, name):
+        self.dropped.append(name)
+        del self.indexes[name]
+
+    def create_indexes(self, models):
+        for model in models:
+            document = model.document
+            existing = [name for name, info in self.indexes.items() if info["key"] == list(document["key"].items())]
+            # 与 MongoDB 一致：同键不同选项的索引无法共存
+            assert not existing, f"索引冲突: {existing}"
+            self.indexes[document["name"]] = {"key": list(document["key"].items()), "unique": document.get("unique", False)}
+
+
+async def test_init_indexes_replaces_legacy_chapter_indexes(monkeypatch):
+    chapters = FakeCollection({
+        "_id_": {"key": [("_id", 1)]},
+        "novel_id_1_chapter_id_1": {"key": [("novel_id", 1), ("chapter_id", 1)], "unique": True},
+        # 旧版本创建的非唯一章节序号索引
+        "novel_id_1_chapter_number_1": {"key": [("novel_id", 1), ("chapter_number", 1)]},
+    })
+    sync_db = type("Database", (), {"crawl_jobs": FakeCollection()})()
+    monkeypatch.setattr(database, "async_db", object())
+    monkeypatch.setattr(database, "sync_db", sync_db)
+    monkeypatch.setattr(database, "sync_novels", FakeCollection())
+    monkeypatch.setattr(database, "sync_chapters", chapters)
+
+    await database.init_indexes()
+
+    assert chapters.dropped == ["novel_id_1_chapter_id_1", "novel_id_1_chapter_number_1"]
+    assert chapters.indexes[CHAPTER_NUMBER_INDEX]["unique"] is True
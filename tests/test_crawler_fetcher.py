@@ -0,0 +1,78 @@
+"""页面抓取器测试（主机令牌桶和重试退避）"""
+
+import pytest
+
+from crawler_service.app import fetcher as fetcher_module
+from crawler_service.app.fetcher import Fetcher, HostBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fetcher_module.time, "monotonic", clock)
+    return clock
+
+
+def make_fetcher(**overrides):
+    config = {**fetcher_module.FETCH_CONFIG, "retry_base_delay": 0.5, "retry_max_delay": 10}
+    config.update(overrides)
+    return Fetcher(config)
+
+
+def test_bucket_allows_burst_then_spaces_requests(clock):
+    bucket = HostBucket(capacity=2, rate=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # 令牌用完后按欠下的令牌依次排开
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_bucket_refills_over_time_up_to_capacity(clock):
+    bucket = HostBucket(capacity=2, rate=2)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 0.5
+    assert bucket.reserve() == 0
+    clock.now += 100
+    assert bucket.reserve() == 0
+    assert bucket.tokens == pytest.approx(1)
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    fetcher = make_fetcher()
+    monkeypatch.setattr(fetcher_module.random, "uniform", lambda low, high: high)
+    assert fetcher.backoff(0) == 0.5
+    assert fetcher.backoff(3) == 4.0
+    assert fetcher.backoff(10) == 10
+    monkeypatch.setattr(fetcher_module.random, "uniform", lambda low, high: low)
+    assert fetcher.backoff(3) == 0
+
+
+def test_backoff_prefers_retry_after():
+    fetcher = make_fetcher()
+    assert fetcher.backoff(0, "3") == 3.0
+    assert fetcher.backoff(0, "120") == 10
+    # 无法解析的 Retry-After（如 HTTP 日期）退回指数退避
+    assert 0 <= fetcher.backoff(0, "Wed, 21 Oct 2026 07:28:00 GMT") <= 0.5
+
+
+async def test_throttle_returns_reserved_token_when_cancelled(clock, monkeypatch):
+    fetcher = make_fetcher(host_burst=1, host_rate=1)
+
+    async def cancelled_sleep(delay):
+        raise fetcher_module.asyncio.CancelledError()
+
+    await fetcher.throttle("http://example.com/1")
+    monkeypatch.setattr(fetcher_module.asyncio, "sleep", cancelled_sleep)
+    with pytest.raises(fetcher_module.asyncio.CancelledError):
+        await fetcher.throttle("http://example.com/2")
+    assert fetcher.buckets["example.com"].tokens == pytest.approx(0)
@@ -0,0 +1,146 @@
+"""爬取任务队列测试（工作协程容错）"""
+
+import asyncio
+
+from bson import ObjectId
+
+from crawler_service.app import jobs as jobs_module
+from crawler_service.app.jobs import JOB_CANCELLED, JOB_CONFIG, JOB_FAILED, JOB_QUEUED, CrawlJobQueue
+
+
+class FailingCollection:
+    """distinct 和 update_one 都失败的集合"""
+
+    def __init__(self):
+        self.updates = []
+
+    async def distinct(self, key, query):
+        raise ConnectionError("mongo down")
+
+    async def update_one(self, query, update):
+        self.updates.append(update["$set"])
+        raise ConnectionError("mongo down")
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.chapters = FailingCollection()
+        self.crawl_jobs = FailingCollection()
+
+
+def make_job():
+    return {"_id": ObjectId(), "novel_id": ObjectId(), "attempts": 1, "chapter_urls": [], "lease_token": "lease-1"}
+
+
+async def test_worker_survives_job_errors(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(jobs_module.database, "async_db", db, raising=False)
+    queue = CrawlJobQueue({**JOB_CONFIG, "poll_interval": 0.01})
+    queue.wakeup = asyncio.Event()
+    jobs = [make_job() for _ in range(2)]
+    claimed = []
+
+    async def claim():
+        claimed.append(None)
+        return jobs.pop(0) if jobs else None
+
+    monkeypatch.setattr(queue, "claim", claim)
+    worker = asyncio.ensure_future(queue.run_worker(0))
+    for _ in range(200):
+        if len(claimed) >= 3 or worker.done():
+            break
+        await asyncio.sleep(0.01)
+    assert not worker.done()
+    worker.cancel()
+    await asyncio.gather(worker, return_exceptions=True)
+
+    # 两个任务都尝试标记为失败，工作协程继续领取下一个任务
+    assert [update["status"] for update in db.crawl_jobs.updates] == [JOB_FAILED, JOB_FAILED]
+    assert queue.running == {}
+
+
+class HeartbeatCollection:
+    """按预设结果响应心跳的任务集合"""
+
+    def __init__(self, beats):
+        self.beats = list(beats)
+        self.beat_queries = []
+        self.updates = []
+
+    async def distinct(self, key, query):
+        return []
+
+    async def find_one_and_update(self, query, update, projection=None):
+        self.beat_queries.append(query)
+        result = self.beats.pop(0) if self.beats else {}
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update["$set"]))
+
+
+class FakeCrawler:
+    """爬取在 finish 设置前一直等待，记录是否被取消"""
+
+    def __init__(self):
+        self.finish = asyncio.Event()
+        self.cancelled = False
+
+    async def crawl_chapters(self, novel_id, chapter_urls, skip_numbers=(), on_progress=None):
+        try:
+            await self.finish.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"saved": 0, "failed": 0, "skipped": 0, "duplicates": 0, "chapters_per_second": 0.0}
+
+
+def make_queue(monkeypatch, beats):
+    collection = HeartbeatCollection(beats)
+    db = type("Database", (), {"chapters": collection, "crawl_jobs": collection})()
+    monkeypatch.setattr(jobs_module.database, "async_db", db, raising=False)
+    queue = CrawlJobQueue({**JOB_CONFIG, "heartbeat_interval": 0.01, "lease_timeout": 0.05})
+    queue.crawler = FakeCrawler()
+    return queue, collection
+
+
+async def test_heartbeat_survives_transient_errors(monkeypatch):
+    queue, collection = make_queue(monkeypatch, [ConnectionError("mongo down"), {}, {}])
+    job = make_job()
+    execution = asyncio.ensure_future(queue.execute(job))
+    while len(collection.beat_queries) < 3:
+        await asyncio.sleep(0.005)
+    queue.crawler.finish.set()
+    await execution
+
+    assert not queue.crawler.cancelled
+    # 心跳和最终状态都按租约令牌写入
+    assert all(query == {"_id": job["_id"], "lease_token": "lease-1"} for query in collection.beat_queries)
+    assert [update["status"] for _, update in collection.updates] == ["completed"]
+
+
+async def test_persistent_heartbeat_failure_stops_crawl_and_requeues(monkeypatch):
+    queue, collection = make_queue(monkeypatch, [ConnectionError("mongo down")] * 100)
+    await asyncio.wait_for(queue.execute(make_job()), timeout=1)
+
+    assert queue.crawler.cancelled
+    assert [update["status"] for _, update in collection.updates] == [JOB_QUEUED]
+
+
+async def test_lost_lease_requeues_with_stale_token(monkeypatch):
+    queue, collection = make_queue(monkeypatch, [None])
+    job = make_job()
+    await asyncio.wait_for(queue.execute(job), timeout=1)
+
+    # 租约已被接管，按旧令牌写入不会覆盖新的执行
+    assert collection.updates[0][0] == {"_id": job["_id"], "lease_token": "lease-1"}
+    assert collection.updates[0][1]["status"] == JOB_QUEUED
+
+
+async def test_cancel_request_marks_job_cancelled(monkeypatch):
+    queue, collection = make_queue(monkeypatch, [{"cancel_requested": True}])
+    await asyncio.wait_for(queue.execute(make_job()), timeout=1)
+
+    assert [update["status"] for _, update in collection.updates] == [JOB_CANCELLED]
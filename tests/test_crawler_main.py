@@ -0,0 +1,52 @@
+"""爬虫服务根路由测试"""
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from crawler_service.app import database
+from crawler_service.app import main
+from utils.auth import verify_token
+
+
+class FakeNovels:
+    def __init__(self, *novel_ids):
+        self.novel_ids = set(novel_ids)
+
+    async def find_one(self, query):
+        return {"_id": query["_id"]} if query["_id"] in self.novel_ids else None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    novel_id = ObjectId()
+    db = type("Database", (), {"novels": FakeNovels(novel_id)})()
+    monkeypatch.setattr(database, "async_db", db, raising=False)
+    enqueued = []
+
+    async def enqueue(novel_id, chapter_urls):
+        enqueued.append((novel_id, chapter_urls))
+        return {"_id": ObjectId(), "novel_id": novel_id, "status": "queued", "chapter_urls": chapter_urls}
+
+    monkeypatch.setattr(main.crawl_job_queue, "enqueue", enqueue)
+    main.app.dependency_overrides[verify_token] = lambda: {"sub": "1"}
+    yield TestClient(main.app), novel_id, enqueued
+    main.app.dependency_overrides.pop(verify_token, None)
+
+
+def test_root_chapters_route_queues_job(client):
+    client, novel_id, enqueued = client
+    urls = ["http://example.com/1", "http://example.com/2"]
+    response = client.post(f"/novels/{novel_id}/chapters", json=urls)
+    assert response.status_code == 202
+    data = response.json()["data"]
+    assert data["novel_id"] == str(novel_id)
+    assert data["status"] == "queued"
+    assert enqueued == [(novel_id, urls)]
+
+
+def test_root_chapters_route_rejects_unknown_novel(client):
+    client, _, enqueued = client
+    response = client.post(f"/novels/{ObjectId()}/chapters", json=["http://example.com/1"])
+    assert response.status_code == 404
+    assert enqueued == []
@@ -0,0 +1,101 @@
+"""章节重排缓冲区和抓取窗口测试"""
+
+import asyncio
+import random
+
+from bson import ObjectId
+
+from crawler_service.app import crawler as crawler_module
+from crawler_service.app.crawler import ChapterReorderBuffer, NovelCrawler
+
+
+def chapter(number):
+    return {"chapter_number": number}
+
+
+def test_buffer_releases_consecutive_chapters_in_order():
+    buffer = ChapterReorderBuffer()
+    buffer.put(3, chapter(3))
+    buffer.put(2, chapter(2))
+    assert buffer.pop_ready() == []
+    buffer.put(1, chapter(1))
+    assert [c["chapter_number"] for c in buffer.pop_ready()] == [1, 2, 3]
+    assert buffer.next_number == 4
+    assert buffer.pending == {}
+
+
+def test_buffer_steps_over_failed_and_skipped_chapters():
+    buffer = ChapterReorderBuffer(skip_numbers={1, 2, 5})
+    assert buffer.pop_ready() == []
+    assert buffer.next_number == 3
+    buffer.put(4, chapter(4))
+    buffer.put(3, None)
+    buffer.put(6, chapter(6))
+    assert [c["chapter_number"] for c in buffer.pop_ready()] == [4, 6]
+    assert buffer.next_number == 7
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+        self.updates = []
+
+    async def update_one(self, query, update):
+        self.updates.append(update["$set"])
+
+    async def insert_many(self, batch, ordered=True):
+        self.inserted.extend(batch)
+        return type("Result", (), {"inserted_ids": [c["chapter_number"] for c in batch]})()
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.novels = FakeCollection()
+        self.chapters = FakeCollection()
+
+
+async def test_crawl_chapters_bounds_in_flight_window(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(crawler_module.database, "async_db", db, raising=False)
+    monkeypatch.setitem(crawler_module.FETCH_CONFIG, "chapter_window", 4)
+    in_flight = peak = 0
+    rng = random.Random(7)
+
+    async def fetch_chapter(self, number, url):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(rng.random() / 1000)
+        in_flight -= 1
+        return number, None if number == 7 else chapter(number)
+
+    monkeypatch.setattr(NovelCrawler, "fetch_chapter", fetch_chapter)
+    urls = [f"http://example.com/{n}" for n in range(1, 31)]
+    result = await NovelCrawler().crawl_chapters(str(ObjectId()), urls, skip_numbers={1, 2, 3, 10})
+
+    assert peak <= 4
+    assert [c["chapter_number"] for c in db.chapters.inserted] == [n for n in range(4, 31) if n not in (7, 10)]
+    assert result["saved"] == 25
+    assert result["failed"] == 1
+    assert result["skipped"] == 4
+
+
+async def test_cancelled_crawl_resets_novel_status(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(crawler_module.database, "async_db", db, raising=False)
+    started = asyncio.Event()
+
+    async def fetch_chapter(self, number, url):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(NovelCrawler, "fetch_chapter", fetch_chapter)
+    crawl = asyncio.ensure_future(NovelCrawler().crawl_chapters(str(ObjectId()), ["http://example.com/1"]))
+    await started.wait()
+    crawl.cancel()
+    try:
+        await crawl
+    except asyncio.CancelledError:
+        pass
+    assert crawl.cancelled()
+    assert [update["status"] for update in db.novels.updates] == ["crawling", "pending"]
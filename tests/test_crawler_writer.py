@@ -0,0 +1,94 @@
+"""章节批量写入测试"""
+
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from crawler_service.app import writer as writer_module
+from crawler_service.app.writer import DUPLICATE_KEY_ERROR, ChapterWriter
+
+
+class FakeChapters:
+    """按章节序号模拟唯一索引的 insert_many(ordered=False)"""
+
+    def __init__(self, existing=()):
+        self.saved = set(existing)
+        self.batches = []
+        self.broken = set()
+
+    async def insert_many(self, batch, ordered=True):
+        self.batches.append([chapter["chapter_number"] for chapter in batch])
+        inserted, errors = [], []
+        for index, chapter in enumerate(batch):
+            number = chapter["chapter_number"]
+            if number in self.broken:
+                errors.append({"index": index, "code": 2, "errmsg": "bad value"})
+            elif number in self.saved:
+                errors.append({"index": index, "code": DUPLICATE_KEY_ERROR, "errmsg": "E11000 duplicate key"})
+            else:
+                self.saved.add(number)
+                inserted.append(number)
+        if errors:
+            raise BulkWriteError({"nInserted": len(inserted), "writeErrors": errors, "writeConcernErrors": []})
+        return type("Result", (), {"inserted_ids": inserted})()
+
+
+@pytest.fixture
+def chapters(monkeypatch):
+    chapters = FakeChapters()
+    db = type("Database", (), {"chapters": chapters})()
+    monkeypatch.setattr(writer_module.database, "async_db", db, raising=False)
+    return chapters
+
+
+def chapter(number):
+    return {"chapter_number": number, "source_url": f"http://example.com/{number}"}
+
+
+async def test_writes_in_batches_and_flushes_rest_on_exit(chapters):
+    flushes = []
+    async with ChapterWriter(batch_size=2, flush_interval=60, on_flush=lambda: flushes.append(None)) as writer:
+        for number in range(1, 6):
+            await writer.add(chapter(number))
+        assert chapters.batches == [[1, 2], [3, 4]]
+    assert chapters.batches == [[1, 2], [3, 4], [5]]
+    assert writer.inserted == 5
+    assert len(flushes) == 3
+
+
+async def test_reports_duplicates_and_failures_per_chapter(chapters):
+    chapters.saved.update({2, 4})
+    chapters.broken.add(3)
+    async with ChapterWriter(batch_size=10, flush_interval=60) as writer:
+        for number in range(1, 6):
+            await writer.add(chapter(number))
+    assert writer.inserted == 2
+    assert writer.duplicates == [2, 4]
+    assert writer.failed == [3]
+    stats = writer.get_stats()
+    assert (stats["inserted"], stats["duplicates"], stats["write_failed"]) == (2, 2, 1)
+
+
+async def test_timer_flushes_partial_batch(chapters):
+    async with ChapterWriter(batch_size=10, flush_interval=0.01) as writer:
+        await writer.add(chapter(1))
+        await writer.add(chapter(2))
+        assert chapters.batches == []
+        await asyncio.sleep(0.05)
+        assert chapters.batches == [[1, 2]]
+        assert writer.timer is None
+        await writer.add(chapter(3))
+    assert chapters.batches == [[1, 2], [3]]
+
+
+async def test_timer_flush_error_surfaces_on_next_add(chapters, monkeypatch):
+    async def failing_insert(batch, ordered=True):
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(chapters, "insert_many", failing_insert)
+    writer = ChapterWriter(batch_size=10, flush_interval=0.01)
+    await writer.add(chapter(1))
+    await asyncio.sleep(0.05)
+    with pytest.raises(ConnectionError):
+        await writer.add(chapter(2))
@@ -0,0 +1,128 @@
+"""网关负载均衡测试"""
+
+import httpx
+from starlette.requests import Request
+
+from gateway_service.app.balancer import (
+    STRATEGY_CONSISTENT_HASH,
+    STRATEGY_LEAST_OUTSTANDING,
+    STRATEGY_ROUND_ROBIN,
+    LoadBalancer,
+    LoadBalancers,
+)
+
+URLS = ["http://a", "http://b", "http://c"]
+
+
+def make_balancer(strategy=STRATEGY_ROUND_ROBIN, hash_key="", threshold=2) -> LoadBalancer:
+    return LoadBalancer("admin", URLS, strategy, hash_key, virtual_nodes=50, unhealthy_threshold=threshold)
+
+
+def make_request(headers=None, client=("10.0.0.1", 1234)) -> Request:
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers, "client": client})
+
+
+def test_round_robin_cycles_through_instances():
+    balancer = make_balancer()
+    chosen = [balancer.choose(make_request(), "users").url for _ in range(6)]
+    assert chosen == URLS * 2
+
+
+def test_least_outstanding_prefers_idle_instance():
+    balancer = make_balancer(STRATEGY_LEAST_OUTSTANDING)
+    balancer.instances[0].outstanding = 3
+    balancer.instances[1].outstanding = 1
+    balancer.instances[2].outstanding = 2
+    assert balancer.choose(make_request(), "users").url == "http://b"
+
+
+def test_consistent_hash_is_stable_per_key_and_skips_unhealthy():
+    balancer = make_balancer(STRATEGY_CONSISTENT_HASH, hash_key="header:X-User-Id")
+    chosen = {balancer.choose(make_request({"X-User-Id": "42"}), "users") for _ in range(5)}
+    assert len(chosen) == 1
+    instance = chosen.pop()
+    # 不同的键分布到多个实例
+    spread = {balancer.choose(make_request({"X-User-Id": str(n)}), "users").url for n in range(50)}
+    assert len(spread) == 3
+
+    instance.healthy = False
+    fallback = balancer.choose(make_request({"X-User-Id": "42"}), "users")
+    assert fallback is not instance
+    assert balancer.choose(make_request({"X-User-Id": "42"}), "users") is fallback
+
+
+def test_consistent_hash_by_path_segment_and_client_ip():
+    balancer = make_balancer(STRATEGY_CONSISTENT_HASH, hash_key="path:1")
+    first = balancer.choose(make_request(client=("10.0.0.1", 1)), "novels/7/chapters")
+    second = balancer.choose(make_request(client=("10.0.0.2", 1)), "novels/7/chapters")
+    assert first is second
+
+    by_ip = make_balancer(STRATEGY_CONSISTENT_HASH)
+    assert by_ip.choose(make_request(client=("10.0.0.9", 1)), "a") is by_ip.choose(make_request(client=("10.0.0.9", 2)), "b")
+
+
+def test_instance_is_ejected_after_threshold_and_recovers():
+    balancer = make_balancer(threshold=2)
+    instance = balancer.instances[0]
+    balancer.report(instance, True)
+    assert instance.healthy
+    balancer.report(instance, True)
+    assert not instance.healthy
+    chosen = {balancer.choose(make_request(), "users").url for _ in range(6)}
+    assert chosen == {"http://b", "http://c"}
+
+    balancer.report(instance, False)
+    assert instance.healthy and instance.failures == 0
+    chosen = {balancer.choose(make_request(), "users").url for _ in range(6)}
+    assert chosen == set(URLS)
+
+
+def test_all_unhealthy_falls_back_to_every_instance():
+    balancer = make_balancer(threshold=1)
+    for instance in balancer.instances:
+        balancer.report(instance, True)
+    chosen = {balancer.choose(make_request(), "users").url for _ in range(3)}
+    assert chosen == set(URLS)
+
+
+async def test_health_check_treats_missing_path_and_5xx_as_failures():
+    statuses = {"a": 200, "b": 404, "c": 503}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/health"
+        return httpx.Response(statuses[request.url.host])
+
+    balancers = LoadBalancers()
+    balancers.start({"admin": URLS})
+    balancer = balancers.get("admin")
+    balancer.unhealthy_threshold = 1
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        for instance in balancer.instances:
+            await balancers.check_instance("admin", instance, client)
+    assert [instance.healthy for instance in balancer.instances] == [True, False, False]
+
+
+async def test_upstream_5xx_counts_as_instance_failure(monkeypatch):
+    from gateway_service.app import main as gateway_main
+
+    balancers = LoadBalancers()
+    balancers.start({"admin": URLS})
+    monkeypatch.setattr(gateway_main, "load_balancers", balancers)
+    monkeypatch.setitem(gateway_main.BREAKER_CONFIG, "enabled", False)
+    balancer = balancers.get("admin")
+    instance = balancer.instances[0]
+
+    async def send_error():
+        return httpx.Response(500)
+
+    for _ in range(balancer.unhealthy_threshold):
+        await gateway_main.send_upstream("admin", instance, "http://a/users", send_error)
+    assert not instance.healthy
+    assert instance.outstanding == 0
+
+    async def send_ok():
+        return httpx.Response(200)
+
+    await gateway_main.send_upstream("admin", instance, "http://a/users", send_ok)
+    assert instance.healthy
@@ -0,0 +1,103 @@
+"""网关熔断器测试"""
+
+import pytest
+
+from gateway_service.app import breaker as breaker_module
+from gateway_service.app.breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = {"name": "admin", "window_size": 10, "min_calls": 4, "failure_rate": 0.5,
+               "slow_call_seconds": 1.0, "slow_call_rate": 0.8, "open_seconds": 30, "half_open_calls": 2}
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_opens_on_failure_rate(clock):
+    breaker = make_breaker()
+    for failed in (False, True, False, True):
+        breaker.record(failed, 0.1)
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+    assert breaker.get_status()["retry_after"] == 30
+
+
+def test_opens_on_slow_call_rate(clock):
+    breaker = make_breaker()
+    for duration in (2.0, 2.0, 2.0, 0.1):
+        breaker.record(False, duration)
+    assert breaker.state == STATE_CLOSED
+    breaker.record(False, 2.0)
+    assert breaker.state == STATE_OPEN
+
+
+def test_window_only_counts_recent_calls(clock):
+    breaker = make_breaker(window_size=4)
+    for failed in (True, False, False, False, False, True):
+        breaker.record(failed, 0.1)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.get_status()["failure_rate"] == 0.25
+
+
+def test_half_open_limits_probes_and_closes_after_successes(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(True, 0.1)
+    clock.now += 30
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record(False, 0.1)
+    assert breaker.state == STATE_HALF_OPEN
+    breaker.record(False, 0.1)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.get_status()["calls"] == 0
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(True, 0.1)
+    clock.now += 31
+    assert breaker.allow_request()
+    breaker.record(False, 5.0)
+    assert breaker.state == STATE_OPEN
+    assert breaker.opened_at == clock.now
+    assert not breaker.allow_request()
+
+
+def test_release_frees_half_open_slot(clock):
+    breaker = make_breaker(half_open_calls=1)
+    for _ in range(4):
+        breaker.record(True, 0.1)
+    clock.now += 30
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
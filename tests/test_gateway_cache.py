@@ -0,0 +1,184 @@
+"""网关响应缓存测试"""
+
+import asyncio
+
+import pytest
+
+from gateway_service.app.cache import CacheEntry, ResponseCache, compile_route
+
+
+def make_cache(**kwargs) -> ResponseCache:
+    options = {"routes": {"/admin/menus": 60, "/crawler/novels/{id}": 300}, "max_entries": 10,
+               "max_bytes": 1024 * 1024, "max_entry_bytes": 1024}
+    options.update(kwargs)
+    return ResponseCache(**options)
+
+
+def make_entry(path: str = "/admin/menus", body: bytes = b"{}", status_code: int = 200, ttl: float = 60) -> CacheEntry:
+    return CacheEntry(path, status_code, {"content-type": "application/json"}, body, ttl)
+
+
+def test_compile_route():
+    pattern = compile_route("/crawler/novels/{id}")
+    assert pattern.match("/crawler/novels/42")
+    assert pattern.match("/crawler/novels/42/")
+    assert not pattern.match("/crawler/novels/42/chapters")
+
+
+def test_get_ttl():
+    cache = make_cache()
+    assert cache.get_ttl("/crawler/novels/1") == 300
+    assert cache.get_ttl("/admin/menus") == 60
+    assert cache.get_ttl("/admin/users") is None
+
+
+async def test_concurrent_misses_are_coalesced():
+    cache = make_cache()
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader(stale):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return make_entry(body=b'{"v": 1}')
+
+    tasks = [asyncio.ensure_future(cache.get_or_fetch("k", 60, loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert calls == 1
+    assert len({id(entry) for entry, _ in results}) == 1
+    assert sorted(status for _, status in results) == ["HIT"] * 4 + ["MISS"]
+    assert cache.stats["coalesced"] == 4
+    assert "k" not in cache.inflight
+
+    entry, status = await cache.get_or_fetch("k", 60, loader)
+    assert status == "HIT" and calls == 1
+
+
+async def test_loader_error_reaches_every_waiter_and_is_not_cached():
+    cache = make_cache()
+    release = asyncio.Event()
+
+    async def loader(stale):
+        await release.wait()
+        raise RuntimeError("upstream down")
+
+    tasks = [asyncio.ensure_future(cache.get_or_fetch("k", 60, loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert "k" not in cache.inflight
+    assert cache.lookup("k") is None
+
+
+async def test_cancelled_waiter_does_not_cancel_the_fetch():
+    cache = make_cache()
+    release = asyncio.Event()
+
+    async def loader(stale):
+        await release.wait()
+        return make_entry()
+
+    leader = asyncio.ensure_future(cache.get_or_fetch("k", 60, loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(cache.get_or_fetch("k", 60, loader))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    release.set()
+    entry, status = await leader
+    assert status == "MISS"
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+
+async def test_cancelled_leader_hands_fetch_to_a_waiter():
+    cache = make_cache()
+    started = []
+    release = asyncio.Event()
+
+    async def loader(stale):
+        started.append(None)
+        await release.wait()
+        return make_entry()
+
+    leader = asyncio.ensure_future(cache.get_or_fetch("k", 60, loader))
+    await asyncio.sleep(0)
+    waiters = [asyncio.ensure_future(cache.get_or_fetch("k", 60, loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+    # 一个等待者接替回源，其余等待者共享它的结果
+    assert len(started) == 2
+    assert sorted(status for _, status in results) == ["HIT", "HIT", "MISS"]
+    assert len({id(entry) for entry, _ in results}) == 1
+    assert cache.inflight == {}
+
+
+async def test_stale_entry_is_revalidated():
+    cache = make_cache()
+    stale = make_entry(ttl=-1)
+    cache.store("k", stale)
+
+    async def loader(previous):
+        assert previous is stale
+        return previous
+
+    entry, status = await cache.get_or_fetch("k", 60, loader)
+    assert entry is stale and status == "REVALIDATED"
+    assert entry.fresh
+
+
+def test_store_skips_errors_and_large_entries():
+    cache = make_cache(max_entry_bytes=64)
+    cache.store("error", make_entry(status_code=500))
+    cache.store("large", make_entry(body=b"x" * 100))
+    assert cache.entries == {}
+    assert cache.total_bytes == 0
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = make_cache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.store(key, make_entry())
+    assert list(cache.entries) == ["b", "c"]
+
+    cache.lookup("b")
+    cache.store("d", make_entry())
+    assert list(cache.entries) == ["b", "d"]
+
+    size = make_entry(body=b"x" * 100).size
+    cache = make_cache(max_bytes=size * 2)
+    for key in ("a", "b", "c"):
+        cache.store(key, make_entry(body=b"x" * 100))
+    assert list(cache.entries) == ["b", "c"]
+    assert cache.total_bytes == size * 2
+    assert cache.stats["evictions"] == 1
+
+
+def test_invalidate_prefix():
+    cache = make_cache()
+    cache.store("menus", make_entry("/admin/menus"))
+    cache.store("novel", make_entry("/crawler/novels/1"))
+    assert cache.invalidate_prefix("/admin") == 1
+    assert list(cache.entries) == ["novel"]
+    assert cache.total_bytes == cache.entries["novel"].size
+
+
+def test_role_writes_invalidate_dependent_menu_entries():
+    cache = make_cache(dependencies={"/admin/roles": ["/admin/menus"]})
+    cache.store("GET /admin/menus?role_id=2#u1", make_entry("/admin/menus"))
+    cache.store("GET /admin/roles/?#u1", make_entry("/admin/roles/"))
+    cache.store("GET /crawler/novels/1?#u1", make_entry("/crawler/novels/1"))
+    assert cache.invalidate_write("admin", "roles/2/menus") == 2
+    assert list(cache.entries) == ["GET /crawler/novels/1?#u1"]
+    # 没有依赖的资源只使自身失效
+    assert cache.invalidate_write("crawler", "novels/1/chapters") == 1
@@ -0,0 +1,67 @@
+"""网关限流器测试（内存令牌桶）"""
+
+from gateway_service.app.ratelimit import RateLimiter, TokenBucket, parse_limit
+
+
+def make_limiter(ip: str = "", subject: str = "", routes=None) -> RateLimiter:
+    return RateLimiter(ip, subject, routes or {}, max_buckets=100)
+
+
+def test_parse_limit():
+    assert parse_limit("100/10") == (100.0, 10.0)
+    assert parse_limit("5") == (5.0, 5.0)
+    assert parse_limit("") is None
+
+
+def test_token_bucket_refill_does_not_consume():
+    bucket = TokenBucket(2)
+    assert bucket.refill(2, 0.01) == 0
+    assert bucket.refill(2, 0.01) == 0
+    assert bucket.tokens >= 2 - 1e-6
+
+
+async def test_rejects_after_capacity_with_retry_after():
+    limiter = make_limiter(ip="2/100")
+    assert await limiter.check("GET", "/a", "1.1.1.1", None) is None
+    assert await limiter.check("GET", "/a", "1.1.1.1", None) is None
+    # 每秒补充 0.02 个令牌，约 50 秒后才有新令牌
+    retry_after = await limiter.check("GET", "/a", "1.1.1.1", None)
+    assert 49 <= retry_after <= 50
+    # 其他 IP 不受影响
+    assert await limiter.check("GET", "/a", "2.2.2.2", None) is None
+
+
+async def test_subject_limit_replaces_ip_limit():
+    limiter = make_limiter(ip="1/100", subject="3/100")
+    for _ in range(3):
+        assert await limiter.check("GET", "/a", "1.1.1.1", "alice") is None
+    assert await limiter.check("GET", "/a", "1.1.1.1", "alice") is not None
+    assert await limiter.check("GET", "/a", "1.1.1.1", None) is None
+
+
+async def test_rejected_request_does_not_drain_route_bucket():
+    limiter = make_limiter(subject="1/100", routes={"POST /novels/{id}/chapters": "3/100"})
+    assert await limiter.check("POST", "/novels/1/chapters", "1.1.1.1", "alice") is None
+    # alice 的主体配额已用完，被拒绝的请求不应消耗路由配额
+    for _ in range(10):
+        assert await limiter.check("POST", "/novels/1/chapters", "1.1.1.1", "alice") is not None
+    assert await limiter.check("POST", "/novels/2/chapters", "1.1.1.1", "bob") is None
+    assert await limiter.check("POST", "/novels/3/chapters", "1.1.1.1", "carol") is None
+    assert await limiter.check("POST", "/novels/4/chapters", "1.1.1.1", "dave") is not None
+    assert limiter.stats["route"]["misses"] == 1
+    assert limiter.stats["subject"]["misses"] == 10
+
+
+async def test_route_rule_matches_method():
+    limiter = make_limiter(routes={"POST /novels/{id}/chapters": "1/100"})
+    assert await limiter.check("POST", "/novels/1/chapters", "1.1.1.1", None) is None
+    assert await limiter.check("POST", "/novels/1/chapters", "1.1.1.1", None) is not None
+    assert await limiter.check("GET", "/novels/1/chapters", "1.1.1.1", None) is None
+
+
+async def test_bucket_count_is_bounded():
+    limiter = RateLimiter("10/10", "", {}, max_buckets=3)
+    for index in range(10):
+        await limiter.check("GET", "/a", f"10.0.0.{index}", None)
+    assert len(limiter.buckets) == 3
+    assert list(limiter.buckets) == ["ip:10.0.0.7", "ip:10.0.0.8", "ip:10.0.0.9"]
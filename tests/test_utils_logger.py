@@ -0,0 +1,67 @@
+"""队列日志监听线程测试"""
+
+import logging
+import queue
+
+from utils import logger as logger_module
+from utils.logger import BatchingQueueListener, DroppingQueueHandler
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class BrokenHandler(logging.Handler):
+    """处理和刷新都抛出异常的处理器"""
+
+    def __init__(self):
+        super().__init__()
+        self.errors = 0
+
+    def emit(self, record):
+        raise ValueError("I/O operation on closed file.")
+
+    def flush(self):
+        raise ValueError("I/O operation on closed file.")
+
+    def handleError(self, record):
+        self.errors += 1
+
+
+def make_record(message):
+    return logging.LogRecord("test", logging.INFO, __file__, 0, message, None, None)
+
+
+def test_listener_keeps_running_when_a_handler_fails():
+    log_queue = queue.Queue()
+    recording, broken = RecordingHandler(), BrokenHandler()
+    listener = BatchingQueueListener(log_queue, broken, recording, batch_size=2)
+    listener.start()
+    for index in range(5):
+        log_queue.put(make_record(f"message {index}"))
+    listener.stop()
+    assert recording.messages == [f"message {index}" for index in range(5)]
+    assert broken.errors >= 5
+    assert listener._thread is None
+
+
+def test_full_queue_drops_and_reports(monkeypatch):
+    monkeypatch.setattr(logger_module._queue_logging, "dropped", 0)
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    for index in range(5):
+        handler.handle(make_record(f"message {index}"))
+    assert log_queue.qsize() == 2
+    assert logger_module._queue_logging.dropped == 3
+
+    recording = RecordingHandler()
+    listener = BatchingQueueListener(log_queue, recording)
+    listener.start()
+    listener.stop()
+    assert recording.messages[:2] == ["message 0", "message 1"]
+    assert "3" in recording.messages[2]
@@ -0,0 +1,87 @@
+"""令牌吊销表测试（刷新令牌认领）"""
+
+import asyncio
+import time
+
+from utils.revocation import CLAIMED_TOKEN_KEY_PREFIX, REVOKED_TOKENS_KEY, RevocationList
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def zadd(self, key, mapping):
+        self.redis.zsets.setdefault(key, {}).update(mapping)
+
+    def publish(self, channel, message):
+        self.redis.published.append(message)
+
+    async def execute(self):
+        return []
+
+
+class FakeRedis:
+    """多个进程共用的 Redis，只实现认领和发布用到的命令"""
+
+    def __init__(self):
+        self.keys = {}
+        self.zsets = {}
+        self.published = []
+        self.fail = False
+
+    async def set(self, key, value, nx=False, ex=None):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise ConnectionError("redis down")
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = (value, ex)
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def make_list(redis=None):
+    revocations = RevocationList(use_redis=redis is not None, sync_interval=30, user_cutoff_ttl=3600)
+    revocations.redis = redis
+    revocations.started = True
+    return revocations
+
+
+async def test_claim_is_single_use_in_process():
+    revocations = make_list()
+    exp = time.time() + 60
+    results = await asyncio.gather(*(revocations.claim_token("jti-1", exp) for _ in range(5)))
+    assert results.count(True) == 1
+    assert revocations.is_revoked({"jti": "jti-1", "sub": "1"})
+
+
+async def test_claim_is_single_use_across_processes():
+    redis = FakeRedis()
+    first, second = make_list(redis), make_list(redis)
+    exp = time.time() + 60
+    results = await asyncio.gather(first.claim_token("jti-1", exp), second.claim_token("jti-1", exp))
+    assert sorted(results) == [False, True]
+    assert f"{CLAIMED_TOKEN_KEY_PREFIX}jti-1" in redis.keys
+    assert "jti-1" in redis.zsets[REVOKED_TOKENS_KEY]
+    assert redis.published == [f"token:jti-1:{exp}"]
+
+
+async def test_claim_fails_closed_when_redis_errors():
+    redis = FakeRedis()
+    redis.fail = True
+    revocations = make_list(redis)
+    assert not await revocations.claim_token("jti-1", time.time() + 60)
+
+
+async def test_claim_rejects_missing_or_expired_jti():
+    revocations = make_list()
+    assert not await revocations.claim_token(None, time.time() + 60)
+    assert not await revocations.claim_token("jti-1", time.time() - 1)
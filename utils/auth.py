@@ -1,8 +1,16 @@
-from fastapi import Depends, HTTPException, status
+import os
+import json
+import hmac
+import time
+import base64
+import hashlib
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime
 from utils.logger import setup_logger
+from utils.revocation import revocation_list
 
 logger = setup_logger("auth", "auth")
 
@@ -10,11 +18,83 @@ logger = setup_logger("auth", "auth")
 SECRET_KEY = "your-secret-key"  # 应该从环境变量获取
 ALGORITHM = "HS256"
 
+# 网关身份头配置
+# 网关验证 JWT 后通过身份头转发已验证的声明，并用 HMAC 签名防止伪造
+IDENTITY_HEADER = "x-gateway-identity"
+IDENTITY_SIGNATURE_HEADER = "x-gateway-signature"
+IDENTITY_SECRET = os.getenv("GATEWAY_IDENTITY_SECRET", SECRET_KEY)
+# 开启后后端信任网关签名的身份头，跳过 jwt.decode
+TRUST_GATEWAY_IDENTITY = os.getenv("TRUST_GATEWAY_IDENTITY", "false").lower() == "true"
+
 # 安全模式
 security = HTTPBearer()
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """验证token"""
+def check_claims(claims: dict) -> None:
+    """检查已验证声明的令牌类型和吊销状态
+
+    Raises:
+        HTTPException: 刷新令牌被当作访问令牌使用，或令牌已吊销
+    """
+    if claims.get("type") == "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="刷新令牌不能用于访问接口"
+        )
+    if revocation_list.is_revoked(claims):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token已失效"
+        )
+
+def _sign(payload: str) -> str:
+    """计算身份头签名"""
+    return hmac.new(IDENTITY_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+def sign_identity(claims: dict) -> Tuple[str, str]:
+    """将已验证的声明编码为网关身份头
+    
+    Args:
+        claims: 已验证的 JWT 声明
+    
+    Returns:
+        Tuple[str, str]: 身份头和签名头的值
+    """
+    payload = base64.urlsafe_b64encode(
+        json.dumps(claims, separators=(",", ":"), default=str).encode()
+    ).decode()
+    return payload, _sign(payload)
+
+def verify_identity(payload: str, signature: str) -> Optional[dict]:
+    """校验网关身份头，签名无效或已过期时返回 None"""
+    if not hmac.compare_digest(_sign(payload), signature):
+        return None
+    claims = json.loads(base64.urlsafe_b64decode(payload.encode()))
+    exp = claims.get("exp")
+    if exp is None or exp < time.time():
+        return None
+    return claims
+
+async def verify_token(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """验证token
+    
+    TRUST_GATEWAY_IDENTITY 开启且请求携带网关签名的身份头时，直接使用网关
+    已验证的声明；否则在本服务内解码 JWT。
+    """
+    if TRUST_GATEWAY_IDENTITY:
+        payload = request.headers.get(IDENTITY_HEADER)
+        signature = request.headers.get(IDENTITY_SIGNATURE_HEADER)
+        if payload and signature:
+            try:
+                claims = verify_identity(payload, signature)
+            except ValueError:
+                claims = None
+            if claims is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="无效的网关身份"
+                )
+            check_claims(claims)
+            return claims
     try:
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -33,8 +113,11 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
                 detail="Token已过期"
             )
         
+        check_claims(payload)
         return payload
         
+    except HTTPException:
+        raise
     except JWTError as e:
         logger.error(f"Token验证失败: {str(e)}")
         raise HTTPException(
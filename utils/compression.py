@@ -0,0 +1,190 @@
+"""响应压缩模块
+
+根据 Accept-Encoding 协商 brotli 或 gzip 压缩响应体，小于阈值的响应、
+已压缩的响应以及 SSE 流不做处理。brotli 为可选依赖，未安装时只使用 gzip。
+"""
+
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+# 压缩配置
+COMPRESSION_CONFIG = {
+    "minimum_size": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+}
+
+# 可压缩的内容类型前缀
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class GzipCompressor:
+    """gzip 流式压缩器"""
+
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        # wbits=31 输出带 gzip 头的数据
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    """brotli 流式压缩器"""
+
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """根据 Accept-Encoding 选择压缩算法，优先 brotli"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """响应压缩 ASGI 中间件"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_CONFIG["minimum_size"]):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class CompressionResponder:
+    """处理单个响应的压缩"""
+
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.compressor = None
+        # None 表示尚未决定，False 表示原样透传
+        self.compressing: Optional[bool] = None
+
+    def create_compressor(self):
+        if self.encoding == "br":
+            return BrotliCompressor(COMPRESSION_CONFIG["brotli_quality"])
+        return GzipCompressor(COMPRESSION_CONFIG["gzip_level"])
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    def should_compress(self, headers: Headers) -> bool:
+        """判断响应是否适合压缩"""
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("text/event-stream"):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def send_with_compression(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # 等到第一个响应体消息再决定是否压缩
+            self.start_message = message
+            return
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressing is None:
+            headers = Headers(raw=self.start_message["headers"])
+            self.compressing = self.should_compress(headers) and (more_body or len(body) >= self.minimum_size)
+            if not self.compressing:
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.compressor = self.create_compressor()
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                # 流式响应逐块压缩，长度未知
+                del headers["Content-Length"]
+                await self.send(self.start_message)
+                await self.send({
+                    "type": "http.response.body",
+                    "body": self.compressor.compress(body) + self.compressor.flush(),
+                    "more_body": True,
+                })
+            else:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        if not self.compressing:
+            await self.send(message)
+            return
+
+        if more_body:
+            chunk = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            chunk = self.compressor.compress(body) + self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+def setup_compression(app) -> None:
+    """为 FastAPI 应用启用响应压缩"""
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_CONFIG["minimum_size"])
@@ -1,9 +1,19 @@
-"""统一配置管理模块"""
+"""统一配置管理模块
+
+配置按数据库、MongoDB、Redis 和服务四个部分组织为类型化的设置对象，
+首次访问时才从环境变量构建并缓存，导入本模块只加载 .env 文件。
+配置校验需显式调用 validate_config()。
+
+原有的 DB_CONFIG、MONGODB_CONFIG、REDIS_CONFIG、SERVICE_CONFIG、
+SQLALCHEMY_DATABASE_URL 和 MONGODB_URL 仍可直接导入，访问时按需构建。
+"""
 
 import os
+from dataclasses import dataclass, asdict
+from functools import cached_property, lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Any, List
 from utils.logger import setup_logger
 
 # 设置日志记录器
@@ -14,23 +24,38 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # 加载主目录下的.env文件
 env_path = BASE_DIR / '.env'
-if not env_path.exists():
-    logger.error("未找到 .env 文件，请确保配置文件存在")
-    raise FileNotFoundError("未找到 .env 文件")
 
-load_dotenv(env_path)
+
+@lru_cache(maxsize=None)
+def load_env() -> bool:
+    """加载 .env 文件，只执行一次
+
+    各服务模块在导入时通过 os.getenv 读取自身配置，因此本模块导入时即加载 .env。
+    文件不存在时只记录警告，配置从进程环境变量和默认值读取。
+
+    Returns:
+        bool: 是否找到并加载了 .env 文件
+    """
+    if not env_path.exists():
+        logger.warning("未找到 .env 文件，使用环境变量和默认配置")
+        return False
+    load_dotenv(env_path)
+    return True
+
+
+load_env()
 
 def get_env_value(key: str, default: Any = None, required: bool = False) -> Any:
     """获取环境变量值，支持类型转换和必填验证
-    
+
     Args:
         key: 环境变量名
         default: 默认值
         required: 是否必填
-    
+
     Returns:
         环境变量值
-    
+
     Raises:
         ValueError: 当必填项未设置时
     """
@@ -39,90 +64,243 @@ def get_env_value(key: str, default: Any = None, required: bool = False) -> Any:
         raise ValueError(f"环境变量 {key} 未设置")
     return value
 
-# 数据库配置
-DB_CONFIG = {
-    "host": get_env_value("DB_HOST", "localhost"),
-    "port": int(get_env_value("DB_PORT", "3306")),
-    "user": get_env_value("DB_USER", "root"),
-    "password": get_env_value("DB_PASSWORD", "123456"),
-    "database": get_env_value("DB_NAME", "admin_service"),
-    "pool_size": int(get_env_value("DB_POOL_SIZE", "5")),
-    "max_overflow": int(get_env_value("DB_MAX_OVERFLOW", "10")),
-    "pool_timeout": int(get_env_value("DB_POOL_TIMEOUT", "30")),
-    "pool_recycle": int(get_env_value("DB_POOL_RECYCLE", "1800")),
-}
 
-# MongoDB配置
-MONGODB_CONFIG = {
-    "host": get_env_value("MONGODB_HOST", "localhost"),
-    "port": int(get_env_value("MONGODB_PORT", "27017")),
-    "username": get_env_value("MONGODB_USER", ""),
-    "password": get_env_value("MONGODB_PASSWORD", ""),
-    "database": get_env_value("MONGODB_DB", "novel_db"),
-    "auth_source": get_env_value("MONGODB_AUTH_SOURCE", "admin"),
-}
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """数据库配置"""
 
-# Redis配置
-REDIS_CONFIG = {
-    "host": get_env_value("REDIS_HOST", "localhost"),
-    "port": int(get_env_value("REDIS_PORT", "6379")),
-    "password": get_env_value("REDIS_PASSWORD", ""),
-    "db": int(get_env_value("REDIS_DB", "0")),
-}
+    host: str
+    port: int
+    user: str
+    password: str
+    database: str
+    pool_size: int
+    max_overflow: int
+    pool_timeout: int
+    pool_recycle: int
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        return cls(
+            host=get_env_value("DB_HOST", "localhost"),
+            port=int(get_env_value("DB_PORT", "3306")),
+            user=get_env_value("DB_USER", "root"),
+            password=get_env_value("DB_PASSWORD", "123456"),
+            database=get_env_value("DB_NAME", "admin_service"),
+            pool_size=int(get_env_value("DB_POOL_SIZE", "5")),
+            max_overflow=int(get_env_value("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=int(get_env_value("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(get_env_value("DB_POOL_RECYCLE", "1800")),
+        )
+
+    @property
+    def url(self) -> str:
+        """SQLAlchemy 数据库 URL"""
+        return (
+            f"mysql+pymysql://{self.user}:{self.password}"
+            f"@{self.host}:{self.port}/{self.database}"
+        )
+
+
+@dataclass(frozen=True)
+class MongoSettings:
+    """MongoDB配置"""
+
+    host: str
+    port: int
+    username: str
+    password: str
+    database: str
+    auth_source: str
+
+    @classmethod
+    def from_env(cls) -> "MongoSettings":
+        return cls(
+            host=get_env_value("MONGODB_HOST", "localhost"),
+            port=int(get_env_value("MONGODB_PORT", "27017")),
+            username=get_env_value("MONGODB_USER", ""),
+            password=get_env_value("MONGODB_PASSWORD", ""),
+            database=get_env_value("MONGODB_DB", "novel_db"),
+            auth_source=get_env_value("MONGODB_AUTH_SOURCE", "admin"),
+        )
+
+    @property
+    def url(self) -> str:
+        """MongoDB 连接 URL"""
+        if self.username and self.password:
+            return (
+                f"mongodb://{self.username}:{self.password}"
+                f"@{self.host}:{self.port}/{self.database}"
+                f"?authSource={self.auth_source}"
+            )
+        return f"mongodb://{self.host}:{self.port}/{self.database}"
+
+
+@dataclass(frozen=True)
+class RedisSettings:
+    """Redis配置"""
+
+    host: str
+    port: int
+    password: str
+    db: int
+
+    @classmethod
+    def from_env(cls) -> "RedisSettings":
+        return cls(
+            host=get_env_value("REDIS_HOST", "localhost"),
+            port=int(get_env_value("REDIS_PORT", "6379")),
+            password=get_env_value("REDIS_PASSWORD", ""),
+            db=int(get_env_value("REDIS_DB", "0")),
+        )
+
+
+@dataclass(frozen=True)
+class ServiceSettings:
+    """服务配置"""
+
+    admin_host: str
+    admin_port: int
+    crawler_host: str
+    crawler_port: int
+    system_host: str
+    system_port: int
+    ai_host: str
+    ai_port: int
+    gateway_host: str
+    gateway_port: int
+    enable_tracing: bool
+
+    @classmethod
+    def from_env(cls) -> "ServiceSettings":
+        return cls(
+            admin_host=get_env_value("ADMIN_HOST", "0.0.0.0"),
+            admin_port=int(get_env_value("ADMIN_PORT", "8000")),
+            crawler_host=get_env_value("CRAWLER_HOST", "0.0.0.0"),
+            crawler_port=int(get_env_value("CRAWLER_PORT", "8001")),
+            system_host=get_env_value("SYSTEM_HOST", "0.0.0.0"),
+            system_port=int(get_env_value("SYSTEM_PORT", "8002")),
+            ai_host=get_env_value("AI_HOST", "0.0.0.0"),
+            ai_port=int(get_env_value("AI_PORT", "8003")),
+            gateway_host=get_env_value("GATEWAY_HOST", "0.0.0.0"),
+            gateway_port=int(get_env_value("GATEWAY_PORT", "8999")),
+            enable_tracing=get_env_value("ENABLE_TRACING", "false").lower() == "true",
+        )
+
+
+class Settings:
+    """应用配置，各部分在首次访问时构建并缓存"""
+
+    @cached_property
+    def db(self) -> DatabaseSettings:
+        return DatabaseSettings.from_env()
+
+    @cached_property
+    def mongodb(self) -> MongoSettings:
+        return MongoSettings.from_env()
+
+    @cached_property
+    def redis(self) -> RedisSettings:
+        return RedisSettings.from_env()
 
-# 服务配置
-SERVICE_CONFIG = {
-    "admin_host": get_env_value("ADMIN_HOST", "0.0.0.0"),
-    "admin_port": int(get_env_value("ADMIN_PORT", "8000")),
-    "crawler_host": get_env_value("CRAWLER_HOST", "0.0.0.0"),
-    "crawler_port": int(get_env_value("CRAWLER_PORT", "8001")),
-    "system_host": get_env_value("SYSTEM_HOST", "0.0.0.0"),
-    "system_port": int(get_env_value("SYSTEM_PORT", "8002")),
-    "ai_host": get_env_value("AI_HOST", "0.0.0.0"),
-    "ai_port": int(get_env_value("AI_PORT", "8003")),
-    "gateway_host": get_env_value("GATEWAY_HOST", "0.0.0.0"),
-    "gateway_port": int(get_env_value("GATEWAY_PORT", "8999")),
-    "enable_tracing": get_env_value("ENABLE_TRACING", "false").lower() == "true",
+    @cached_property
+    def service(self) -> ServiceSettings:
+        return ServiceSettings.from_env()
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """获取全局配置对象"""
+    return Settings()
+
+
+def get_db_settings() -> DatabaseSettings:
+    """获取数据库配置"""
+    return get_settings().db
+
+
+def get_mongodb_settings() -> MongoSettings:
+    """获取MongoDB配置"""
+    return get_settings().mongodb
+
+
+def get_redis_settings() -> RedisSettings:
+    """获取Redis配置"""
+    return get_settings().redis
+
+
+def get_service_settings() -> ServiceSettings:
+    """获取服务配置"""
+    return get_settings().service
+
+
+def get_instance_ports(name: str, port: int) -> List[int]:
+    """获取服务各实例的端口列表
+
+    服务可通过 <NAME>_INSTANCES 配置实例数，各实例从 <NAME>_INSTANCE_PORT
+    （默认为服务端口）开始依次使用连续端口。
+
+    Args:
+        name: 服务名称
+        port: 服务端口
+
+    Returns:
+        List[int]: 实例端口列表
+    """
+    instances = int(get_env_value(f"{name.upper()}_INSTANCES", "1"))
+    base_port = int(get_env_value(f"{name.upper()}_INSTANCE_PORT", str(port)))
+    return [base_port + i for i in range(max(1, instances))]
+
+
+# 兼容旧的模块级配置名称，访问时才构建
+_LEGACY_CONFIG = {
+    "DB_CONFIG": lambda: asdict(get_db_settings()),
+    "MONGODB_CONFIG": lambda: asdict(get_mongodb_settings()),
+    "REDIS_CONFIG": lambda: asdict(get_redis_settings()),
+    "SERVICE_CONFIG": lambda: asdict(get_service_settings()),
+    "SQLALCHEMY_DATABASE_URL": lambda: get_db_settings().url,
+    "MONGODB_URL": lambda: get_mongodb_settings().url,
 }
 
-# 构建数据库URL
-SQLALCHEMY_DATABASE_URL = (
-    f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}"
-    f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-)
-
-# 构建MongoDB URL
-MONGODB_URL = (
-    f"mongodb://{MONGODB_CONFIG['username']}:{MONGODB_CONFIG['password']}"
-    f"@{MONGODB_CONFIG['host']}:{MONGODB_CONFIG['port']}/{MONGODB_CONFIG['database']}"
-    f"?authSource={MONGODB_CONFIG['auth_source']}"
-) if MONGODB_CONFIG['username'] and MONGODB_CONFIG['password'] else (
-    f"mongodb://{MONGODB_CONFIG['host']}:{MONGODB_CONFIG['port']}/{MONGODB_CONFIG['database']}"
-)
-
-def validate_config() -> None:
-    """验证配置是否有效"""
+
+def __getattr__(name: str) -> Any:
+    factory = _LEGACY_CONFIG.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = factory()
+    globals()[name] = value
+    return value
+
+
+def validate_config(settings: Settings = None) -> None:
+    """验证配置是否有效
+
+    Args:
+        settings: 要验证的配置，默认为全局配置
+
+    Raises:
+        ValueError: 配置不完整时
+    """
+    settings = settings or get_settings()
     try:
         # 验证数据库配置
-        if not all([DB_CONFIG["host"], DB_CONFIG["user"], DB_CONFIG["password"], DB_CONFIG["database"]]):
+        db = settings.db
+        if not all([db.host, db.user, db.password, db.database]):
             raise ValueError("数据库配置不完整")
-            
+
         # 验证MongoDB配置
-        if not all([MONGODB_CONFIG["host"], MONGODB_CONFIG["database"]]):
+        if not all([settings.mongodb.host, settings.mongodb.database]):
             raise ValueError("MongoDB配置不完整")
-            
+
         # 验证Redis配置
-        if not all([REDIS_CONFIG["host"]]):
+        if not all([settings.redis.host]):
             raise ValueError("Redis配置不完整")
-            
+
         # 验证服务配置
-        if not all([SERVICE_CONFIG["admin_host"], SERVICE_CONFIG["admin_port"]]):
+        if not all([settings.service.admin_host, settings.service.admin_port]):
             raise ValueError("服务配置不完整")
-            
+
         logger.info("配置验证通过")
     except Exception as e:
         logger.error(f"配置验证失败: {str(e)}")
         raise
-
-# 验证配置
-validate_config() 
\ No newline at end of file
@@ -1,8 +1,22 @@
+"""日志工具模块
+
+默认使用队列模式：业务代码只把日志记录放入内存队列，由每个进程唯一的后台
+监听线程负责格式化、写控制台和批量写文件，避免在事件循环中阻塞磁盘 IO。
+队列有长度上限，写满时丢弃新日志并计数，监听线程处理器出错时报告错误后继续运行。
+设置 LOG_ASYNC=false 可退回同步写日志。
+"""
+
 import logging
 import sys
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import atexit
+import weakref
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from multiprocessing import util as multiprocessing_util
 import os
 from datetime import datetime
+from typing import Dict
 from pythonjsonlogger import jsonlogger
 
 # 创建日志目录
@@ -10,51 +24,302 @@ LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-def setup_logger(name: str, log_file: str) -> logging.Logger:
+# 日志配置
+LOG_CONFIG = {
+    # 是否使用队列模式异步写日志
+    "async": os.getenv("LOG_ASYNC", "true").lower() == "true",
+    # 监听线程每批最多处理的日志条数，处理完一批后统一刷新文件
+    "batch_size": int(os.getenv("LOG_BATCH_SIZE", "256")),
+    # 日志队列最大长度，写满时丢弃新日志
+    "queue_size": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    # 热点路径日志记录器的 INFO 日志采样率（0~1），WARNING 及以上级别不采样
+    "hot_path_sample_rate": float(os.getenv("LOG_HOT_PATH_SAMPLE_RATE", "1.0")),
+}
+
+# JSON格式化器
+json_formatter = jsonlogger.JsonFormatter(
+    json_ensure_ascii=False,
+    fmt="%(asctime)s %(name)s %(levelname)s %(message)s"
+)
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """写入后不立即刷新的文件处理器，由批量监听器统一刷新"""
+
+    def flush(self):
+        pass
+
+    def flush_buffer(self):
+        """将缓冲区写入磁盘"""
+        super().flush()
+
+
+class FileRoutingHandler(logging.Handler):
+    """根据日志记录上的 log_file 属性把日志写入对应的文件"""
+
+    def __init__(self):
+        super().__init__()
+        self.file_handlers: Dict[str, BufferedRotatingFileHandler] = {}
+
+    def get_file_handler(self, log_file: str) -> BufferedRotatingFileHandler:
+        handler = self.file_handlers.get(log_file)
+        if handler is None:
+            today = datetime.now().strftime("%Y-%m-%d")
+            handler = BufferedRotatingFileHandler(
+                f"{LOG_DIR}/{log_file}_{today}.log",
+                maxBytes=10*1024*1024,  # 10MB
+                backupCount=5,
+                encoding="utf-8"
+            )
+            handler.setFormatter(json_formatter)
+            self.file_handlers[log_file] = handler
+        return handler
+
+    def emit(self, record):
+        log_file = getattr(record, "log_file", None)
+        if not log_file:
+            return
+        try:
+            handler = self.get_file_handler(log_file)
+        except Exception:
+            # 日志文件无法打开时报告错误，不影响其他文件
+            self.handleError(record)
+            return
+        handler.handle(record)
+
+    def flush(self):
+        # 逐个刷新，某个文件出错不影响其他文件，全部刷新后再抛出错误
+        error = None
+        for handler in self.file_handlers.values():
+            try:
+                handler.flush_buffer()
+            except Exception as e:
+                error = e
+        if error is not None:
+            raise error
+
+    def close(self):
+        for handler in self.file_handlers.values():
+            handler.close()
+        super().close()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """队列写满时丢弃日志并计数，不阻塞业务代码"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _queue_logging.dropped += 1
+
+
+class BatchingQueueListener(QueueListener):
+    """批量处理日志的队列监听器
+
+    每次阻塞取出一条日志后，继续取出队列中已有的日志（最多 batch_size 条），
+    全部处理完后再统一刷新控制台和文件。处理器出错时交给 handleError 报告，监听线程继续运行。
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.reported_dropped = 0
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            batch = [self.dequeue(True)]
+            while batch[-1] is not self._sentinel and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not self._sentinel]
+            for record in records:
+                self.handle(record)
+            self._report_dropped()
+            if records:
+                self._flush_handlers(records[-1])
+            if hasattr(q, "task_done"):
+                for _ in batch:
+                    q.task_done()
+            if batch[-1] is self._sentinel:
+                break
+
+    def handle(self, record):
+        record = self.prepare(record)
+        for handler in self.handlers:
+            if record.levelno < handler.level:
+                continue
+            try:
+                handler.handle(record)
+            except Exception:
+                self._handle_error(handler, record)
+
+    def _flush_handlers(self, record):
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                self._handle_error(handler, record)
+
+    @staticmethod
+    def _handle_error(handler, record):
+        try:
+            handler.handleError(record)
+        except Exception:
+            # 标准错误已关闭时 handleError 本身也会出错，此时只能忽略
+            pass
+
+    def _report_dropped(self):
+        """队列写满丢弃过日志时输出一条警告"""
+        dropped = _queue_logging.dropped
+        if dropped > self.reported_dropped:
+            record = logging.LogRecord(
+                "logger", logging.WARNING, __file__, 0,
+                f"日志队列已满，已丢弃 {dropped - self.reported_dropped} 条日志（累计 {dropped} 条）", None, None,
+            )
+            self.reported_dropped = dropped
+            self.handle(record)
+
+    def enqueue_sentinel(self):
+        # 队列写满时等待监听线程腾出空间，监听线程已退出时放弃
+        try:
+            self.queue.put(self._sentinel, timeout=5)
+        except queue.Full:
+            pass
+
+
+class LogFileFilter(logging.Filter):
+    """为日志记录标记目标文件，供监听线程路由"""
+
+    def __init__(self, log_file: str):
+        super().__init__()
+        self.log_file = log_file
+
+    def filter(self, record):
+        record.log_file = self.log_file
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """按比例采样 INFO 及以下级别的日志，WARNING 及以上级别全部保留"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class _QueueLogging:
+    """进程内共享的日志队列和监听线程"""
+
+    def __init__(self):
+        self.queue = None
+        self.listener = None
+        self.queue_handlers = weakref.WeakSet()
+        # 队列写满丢弃的日志条数
+        self.dropped = 0
+
+    def start(self):
+        """创建日志队列并启动监听线程"""
+        self.queue = queue.Queue(maxsize=LOG_CONFIG["queue_size"])
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(json_formatter)
+        self.listener = BatchingQueueListener(
+            self.queue,
+            console_handler,
+            FileRoutingHandler(),
+            batch_size=LOG_CONFIG["batch_size"]
+        )
+        self.listener.start()
+
+    def get_queue(self):
+        if self.listener is None:
+            self.start()
+        return self.queue
+
+    def stop(self):
+        """停止监听线程并写出剩余日志"""
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+    def after_fork(self):
+        """fork 出的子进程中没有监听线程，需要重新创建队列和监听线程"""
+        if self.listener is None:
+            return
+        self.listener = None
+        self.dropped = 0
+        new_queue = self.get_queue()
+        for handler in list(self.queue_handlers):
+            handler.queue = new_queue
+
+    def register_finalizer(self):
+        """fork 模式的 multiprocessing 子进程退出时不执行 atexit，需通过 Finalize 写出剩余日志"""
+        multiprocessing_util.Finalize(self, self.stop, exitpriority=0)
+
+
+_queue_logging = _QueueLogging()
+atexit.register(_queue_logging.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_queue_logging.after_fork)
+# multiprocessing 子进程启动时会清空已注册的 Finalize，需在其后重新注册
+multiprocessing_util.register_after_fork(_queue_logging, _QueueLogging.register_finalizer)
+
+
+def setup_logger(name: str, log_file: str, hot_path: bool = False) -> logging.Logger:
     """设置日志记录器
     
+    同名日志记录器重复调用时直接返回已配置的实例，不会重复添加处理器。
+    
     Args:
         name: 日志记录器名称
         log_file: 日志文件名（不含扩展名）
+        hot_path: 是否为热点路径日志记录器，是则按 LOG_HOT_PATH_SAMPLE_RATE 采样 INFO 日志
         
     Returns:
         logging.Logger: 配置好的日志记录器
     """
-    # 创建日志目录
-    os.makedirs("logs", exist_ok=True)
-    
     # 创建日志记录器
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    if getattr(logger, "_setup_done", False):
+        return logger
     
-    # 日志格式
-    log_format = {
-        "time": "%(asctime)s",
-        "name": "%(name)s",
-        "level": "%(levelname)s",
-        "message": "%(message)s",
-    }
-    
-    # JSON格式处理器
-    json_formatter = jsonlogger.JsonFormatter(
-        json_ensure_ascii=False,
-        fmt="%(asctime)s %(name)s %(levelname)s %(message)s"
-    )
+    # 创建日志目录
+    os.makedirs("logs", exist_ok=True)
+    logger.setLevel(logging.INFO)
     
-    # 控制台处理器
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(json_formatter)
-    logger.addHandler(console_handler)
+    if hot_path and LOG_CONFIG["hot_path_sample_rate"] < 1.0:
+        logger.addFilter(SamplingFilter(LOG_CONFIG["hot_path_sample_rate"]))
     
-    # 文件处理器
-    today = datetime.now().strftime("%Y-%m-%d")
-    file_handler = RotatingFileHandler(
-        f"logs/{log_file}_{today}.log",
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5,
-        encoding="utf-8"
-    )
-    file_handler.setFormatter(json_formatter)
-    logger.addHandler(file_handler)
+    if LOG_CONFIG["async"]:
+        # 队列处理器只负责入队，格式化和写入由监听线程完成
+        queue_handler = DroppingQueueHandler(_queue_logging.get_queue())
+        queue_handler.addFilter(LogFileFilter(log_file))
+        _queue_logging.queue_handlers.add(queue_handler)
+        logger.addHandler(queue_handler)
+    else:
+        # 控制台处理器
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(json_formatter)
+        logger.addHandler(console_handler)
+        
+        # 文件处理器
+        today = datetime.now().strftime("%Y-%m-%d")
+        file_handler = RotatingFileHandler(
+            f"logs/{log_file}_{today}.log",
+            maxBytes=10*1024*1024,  # 10MB
+            backupCount=5,
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(json_formatter)
+        logger.addHandler(file_handler)
     
-    return logger 
\ No newline at end of file
+    logger._setup_done = True
+    return logger
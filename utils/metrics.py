@@ -0,0 +1,253 @@
+"""指标监控工具模块
+
+提供 Prometheus 文本格式的指标采集：HTTP 请求耗时、状态码、请求/响应大小、
+并发请求数，以及 SQLAlchemy、MongoDB（Motor/PyMongo）和 Redis 的调用耗时。
+"""
+
+import os
+import time
+import inspect
+from typing import Dict, Iterable, List, Tuple
+from fastapi import FastAPI, Response
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+from prometheus_client.utils import floatToGoString
+from pymongo import monitoring
+from starlette.routing import Match
+from utils.logger import setup_logger
+
+logger = setup_logger("metrics", "metrics")
+
+# 当前进程的服务名称，由 setup_metrics 设置
+service_name = os.getenv("SERVICE_NAME", "python-admin")
+
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP请求耗时",
+    ["service", "method", "route"],
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP请求数",
+    ["service", "method", "route", "status"],
+)
+HTTP_REQUEST_SIZE = Histogram(
+    "http_request_size_bytes",
+    "HTTP请求体大小",
+    ["service", "method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP响应体大小",
+    ["service", "method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "正在处理的HTTP请求数",
+    ["service", "method"],
+)
+DB_CALL_DURATION = Histogram(
+    "db_call_duration_seconds",
+    "数据库调用耗时",
+    ["service", "system", "operation"],
+)
+DB_CALL_ERRORS = Counter(
+    "db_call_errors_total",
+    "数据库调用失败次数",
+    ["service", "system", "operation"],
+)
+
+
+def get_route_template(scope) -> str:
+    """获取请求匹配的路由模板，避免路径参数导致标签基数膨胀"""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for candidate in getattr(router, "routes", []):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """记录 HTTP 请求指标的 ASGI 中间件
+
+    使用纯 ASGI 实现，不会缓冲流式响应。
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(self.service, method)
+        in_progress.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            in_progress.dec()
+            route = get_route_template(scope)
+            HTTP_REQUEST_DURATION.labels(self.service, method, route).observe(duration)
+            HTTP_REQUESTS.labels(self.service, method, route, str(status["code"])).inc()
+            HTTP_REQUEST_SIZE.labels(self.service, method, route).observe(sizes["request"])
+            HTTP_RESPONSE_SIZE.labels(self.service, method, route).observe(sizes["response"])
+
+
+def setup_metrics(app: FastAPI, service: str) -> None:
+    """为 FastAPI 应用启用指标采集并暴露 /metrics 端点
+
+    Args:
+        app: FastAPI 应用
+        service: 服务名称，作为指标的 service 标签
+    """
+    global service_name
+    service_name = service
+    app.add_middleware(MetricsMiddleware, service=service)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    logger.info(f"指标采集已启用: {service}")
+
+
+def observe_db_call(system: str, operation: str, duration: float, failed: bool = False) -> None:
+    """记录一次数据库调用"""
+    DB_CALL_DURATION.labels(service_name, system, operation).observe(duration)
+    if failed:
+        DB_CALL_ERRORS.labels(service_name, system, operation).inc()
+
+
+def instrument_sqlalchemy(engine) -> None:
+    """为 SQLAlchemy 引擎记录 SQL 执行耗时"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_time = conn.info["metrics_start_time"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        observe_db_call("sqlalchemy", operation, time.perf_counter() - start_time)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("metrics_start_time") if context.connection is not None else None
+        if starts:
+            start_time = starts.pop()
+            statement = context.statement or ""
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+            observe_db_call("sqlalchemy", operation, time.perf_counter() - start_time, failed=True)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """记录 MongoDB 命令耗时，传给 MongoClient/AsyncIOMotorClient 的 event_listeners"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        observe_db_call("mongodb", event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        observe_db_call("mongodb", event.command_name, event.duration_micros / 1e6, failed=True)
+
+
+def instrument_redis(client):
+    """为 Redis 客户端（同步或 asyncio）记录命令耗时
+
+    Returns:
+        传入的客户端
+    """
+    execute_command = client.execute_command
+
+    if inspect.iscoroutinefunction(execute_command):
+        async def timed_execute_command(*args, **options):
+            start_time = time.perf_counter()
+            try:
+                result = await execute_command(*args, **options)
+            except Exception:
+                observe_db_call("redis", str(args[0]).upper(), time.perf_counter() - start_time, failed=True)
+                raise
+            observe_db_call("redis", str(args[0]).upper(), time.perf_counter() - start_time)
+            return result
+    else:
+        def timed_execute_command(*args, **options):
+            start_time = time.perf_counter()
+            try:
+                result = execute_command(*args, **options)
+            except Exception:
+                observe_db_call("redis", str(args[0]).upper(), time.perf_counter() - start_time, failed=True)
+                raise
+            observe_db_call("redis", str(args[0]).upper(), time.perf_counter() - start_time)
+            return result
+
+    client.execute_command = timed_execute_command
+    return client
+
+
+def _escape_label(value: str) -> str:
+    """转义标签值"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def merge_metrics(sources: Iterable[Tuple[str, str]]) -> str:
+    """合并多个实例的指标文本，并为每个样本添加 instance 标签
+
+    Args:
+        sources: (实例名称, 指标文本) 列表
+
+    Returns:
+        str: 合并后的 Prometheus 文本格式指标
+    """
+    families: Dict[str, Tuple[str, str, List[str]]] = {}
+    for instance, text in sources:
+        for family in text_string_to_metric_families(text):
+            name = family.name
+            # 解析器会去掉计数器的 _total 后缀，输出时补回以保持与样本名一致
+            if family.type == "counter":
+                name = f"{family.name}_total"
+            _, _, lines = families.setdefault(name, (family.type, family.documentation, []))
+            for sample in family.samples:
+                labels = {**sample.labels, "instance": instance}
+                label_text = ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels.items())
+                lines.append(f"{sample.name}{{{label_text}}} {floatToGoString(sample.value)}")
+
+    output = []
+    for name, (metric_type, documentation, lines) in families.items():
+        output.append(f"# HELP {name} {documentation}")
+        output.append(f"# TYPE {name} {metric_type}")
+        output.extend(lines)
+    return "\n".join(output) + "\n"
@@ -1,6 +1,61 @@
+import os
+import json
+import enum
+import decimal
+from datetime import date, datetime, time
 from typing import Any, Optional
-from fastapi.responses import JSONResponse
-from fastapi import status
+from fastapi.responses import JSONResponse, Response
+from fastapi import Request, status
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
+try:
+    from bson import ObjectId
+except ImportError:
+    ObjectId = None
+
+# 是否使用快速 JSON 序列化
+FAST_JSON = os.getenv("FAST_JSON_RESPONSE", "true").lower() == "true"
+
+def json_default(obj: Any) -> Any:
+    """序列化标准 JSON 不支持的类型：ObjectId、ORM 对象、Pydantic 模型、日期时间等"""
+    if ObjectId is not None and isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # SQLAlchemy ORM 对象，只序列化列字段，不触发关系的懒加载
+    table = getattr(obj, "__table__", None)
+    if table is not None:
+        return {column.name: getattr(obj, column.name) for column in table.columns}
+    # Pydantic 模型 (v2 / v1)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """使用 orjson（未安装时退回标准库 json）序列化的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            default=json_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
 
 def create_response(
     code: int,
@@ -9,7 +64,8 @@ def create_response(
     status_code: int = status.HTTP_200_OK
 ) -> JSONResponse:
     """创建统一响应格式"""
-    return JSONResponse(
+    response_class = FastJSONResponse if FAST_JSON else JSONResponse
+    return response_class(
         status_code=status_code,
         content={
             "code": code,
@@ -27,6 +83,54 @@ def success_response(
     """成功响应"""
     return create_response(200, message, data, status_code)
 
+def page_response(
+    items: Any,
+    next_cursor: Optional[str],
+    limit: int,
+    total: Optional[int] = None,
+    total_estimated: bool = False,
+    message: str = "Success",
+    **extra: Any
+) -> JSONResponse:
+    """游标分页响应
+
+    Args:
+        items: 当前页数据
+        next_cursor: 下一页的不透明游标令牌，没有下一页时为 None
+        limit: 单页条数
+        total: 总数，未请求时为 None 且不返回该字段
+        total_estimated: 总数是否为估计值
+    """
+    data = {"items": items, "next_cursor": next_cursor, "has_more": next_cursor is not None, "limit": limit}
+    if total is not None:
+        data["total"] = total
+        data["total_estimated"] = total_estimated
+    data.update(extra)
+    return success_response(data, message)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 是否命中 ETag（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+def etag_response(
+    request: Request,
+    data: Any,
+    etag: str,
+    message: str = "Success"
+) -> Response:
+    """带 ETag 的成功响应，客户端缓存的 ETag 未变化时返回 304"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response = success_response(data, message)
+    response.headers.update(headers)
+    return response
+
 def error_response(
     message: str,
     status_code: int = status.HTTP_400_BAD_REQUEST,
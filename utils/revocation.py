@@ -0,0 +1,230 @@
+"""令牌吊销模块
+
+JWT 本身无状态，吊销信息保存在每个进程内存中的两张表里：
+- 已吊销令牌：jti -> 过期时间，用于注销、刷新令牌轮换；
+- 用户吊销时间：用户ID -> 时间戳，签发时间早于该时间的令牌全部失效，用于强制下线。
+
+verify_token 每次只做两次字典查找，不访问网络。吊销记录通常只有几百到几千条
+（过期后即清理），精确的哈希表比布隆过滤器更省事且没有误判。
+
+吊销记录默认写入 Redis 有序集合（分数为过期时间），并通过发布订阅通知所有服务进程；
+各进程启动时全量加载，之后按固定间隔重新同步，以补上订阅断开期间漏掉的消息。
+显式设置 TOKEN_REVOCATION_REDIS=false 时吊销只在当前进程生效，仅适用于单进程部署。
+
+刷新令牌轮换通过 claim_token 认领旧令牌：本进程内先检查再登记（中间没有 await），
+跨进程由 Redis SET NX 保证同一个刷新令牌只能被兑换一次。
+"""
+
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger("token_revocation", "auth")
+
+# 令牌吊销配置
+REVOCATION_CONFIG = {
+    "redis": os.getenv("TOKEN_REVOCATION_REDIS", "true").lower() == "true",
+    # 全量同步间隔（秒）
+    "sync_interval": float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "30")),
+    # 用户吊销时间的保留时长（秒），应不短于最长的令牌有效期
+    "user_cutoff_ttl": int(os.getenv("TOKEN_REVOCATION_USER_TTL", str(30 * 24 * 3600))),
+}
+
+REVOKED_TOKENS_KEY = "auth:revoked:tokens"
+REVOKED_USERS_KEY = "auth:revoked:users"
+REVOCATION_CHANNEL = "auth:revocations"
+CLAIMED_TOKEN_KEY_PREFIX = "auth:refresh:claimed:"
+
+
+class RevocationList:
+    """进程内的令牌吊销表，可选 Redis 同步"""
+
+    def __init__(self, use_redis: bool, sync_interval: float, user_cutoff_ttl: int):
+        self.use_redis = use_redis
+        self.sync_interval = sync_interval
+        self.user_cutoff_ttl = user_cutoff_ttl
+        # jti -> 令牌过期时间戳
+        self.tokens: Dict[str, float] = {}
+        # 用户ID -> 吊销时间戳
+        self.users: Dict[str, float] = {}
+        self.redis = None
+        self.task: Optional[asyncio.Task] = None
+        self.started = False
+
+    def is_revoked(self, claims: dict) -> bool:
+        """判断令牌是否已吊销"""
+        if not self.started:
+            self.start()
+        jti = claims.get("jti")
+        if jti is not None and jti in self.tokens:
+            return True
+        cutoff = self.users.get(str(claims.get("sub")))
+        return cutoff is not None and float(claims.get("iat") or 0) < cutoff
+
+    def start(self) -> None:
+        """首次检查时在当前事件循环中启动 Redis 同步任务"""
+        if not self.use_redis:
+            self.started = True
+            logger.warning("TOKEN_REVOCATION_REDIS 已关闭，令牌吊销只在当前进程生效，多进程部署下注销和刷新令牌轮换不可靠")
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.started = True
+        try:
+            import redis.asyncio as aioredis
+            from utils.config import get_redis_settings
+            from utils.metrics import instrument_redis
+
+            settings = get_redis_settings()
+            self.redis = instrument_redis(aioredis.Redis(
+                host=settings.host,
+                port=settings.port,
+                password=settings.password or None,
+                db=settings.db,
+            ))
+            self.task = loop.create_task(self._sync_loop())
+        except Exception as e:
+            logger.error(f"Redis 令牌吊销同步初始化失败，吊销只在当前进程生效: {str(e)}")
+            self.redis = None
+
+    async def close(self) -> None:
+        """停止同步任务并关闭 Redis 连接"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+        self.started = False
+
+    def _apply(self, message: str) -> None:
+        """应用一条吊销通知，格式为 token:<jti>:<过期时间> 或 user:<用户ID>:<吊销时间>"""
+        head, _, timestamp = message.rpartition(":")
+        kind, _, key = head.partition(":")
+        if kind == "token":
+            self.tokens[key] = float(timestamp)
+        elif kind == "user":
+            self.users[key] = max(float(timestamp), self.users.get(key, 0.0))
+
+    async def _load(self) -> None:
+        """从 Redis 全量加载未过期的吊销记录，并清理过期记录"""
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+            pipe.zremrangebyscore(REVOKED_USERS_KEY, "-inf", now - self.user_cutoff_ttl)
+            pipe.zrange(REVOKED_TOKENS_KEY, 0, -1, withscores=True)
+            pipe.zrange(REVOKED_USERS_KEY, 0, -1, withscores=True)
+            _, _, tokens, users = await pipe.execute()
+        self.tokens = {jti.decode(): exp for jti, exp in tokens}
+        self.users = {sub.decode(): cutoff for sub, cutoff in users}
+
+    async def _sync_loop(self) -> None:
+        """订阅吊销通知，并定期全量同步"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                await self._load()
+                logger.info(f"令牌吊销表已同步: {len(self.tokens)} 个令牌, {len(self.users)} 个用户")
+                next_sync = time.monotonic() + self.sync_interval
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._apply(message["data"].decode())
+                    if time.monotonic() >= next_sync:
+                        await self._load()
+                        next_sync = time.monotonic() + self.sync_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"令牌吊销同步失败，其他进程的吊销暂不可见，{self.sync_interval} 秒后重试: {str(e)}")
+                await asyncio.sleep(self.sync_interval)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def _prune(self) -> None:
+        """清理已过期的本地记录"""
+        now = time.time()
+        self.tokens = {jti: exp for jti, exp in self.tokens.items() if exp > now}
+        self.users = {sub: cutoff for sub, cutoff in self.users.items() if cutoff > now - self.user_cutoff_ttl}
+
+    async def revoke_token(self, jti: Optional[str], exp: float) -> None:
+        """吊销单个令牌，记录保留到令牌过期"""
+        if not jti or exp <= time.time():
+            return
+        self._prune()
+        self.tokens[jti] = float(exp)
+        await self._publish(REVOKED_TOKENS_KEY, jti, float(exp), f"token:{jti}:{exp}")
+
+    async def claim_token(self, jti: Optional[str], exp: float) -> bool:
+        """认领一次性令牌（刷新令牌轮换），令牌已被认领或已吊销时返回 False
+
+        本进程内的检查和登记之间没有 await，并发请求只有一个能通过；
+        开启 Redis 时再用 SET NX 在所有进程间认领，Redis 出错时拒绝认领。
+        """
+        if not jti or exp <= time.time() or jti in self.tokens:
+            return False
+        self.tokens[jti] = float(exp)
+        if not self.started:
+            self.start()
+        if self.redis is None:
+            return True
+        try:
+            ttl = max(1, int(exp - time.time()) + 1)
+            claimed = await self.redis.set(f"{CLAIMED_TOKEN_KEY_PREFIX}{jti}", 1, nx=True, ex=ttl)
+        except Exception as e:
+            logger.error(f"Redis 认领刷新令牌失败: {str(e)}")
+            return False
+        if not claimed:
+            return False
+        await self._publish(REVOKED_TOKENS_KEY, jti, float(exp), f"token:{jti}:{exp}")
+        return True
+
+    async def revoke_user(self, user_id) -> None:
+        """吊销用户此前签发的全部令牌"""
+        sub = str(user_id)
+        cutoff = time.time()
+        self._prune()
+        self.users[sub] = cutoff
+        await self._publish(REVOKED_USERS_KEY, sub, cutoff, f"user:{sub}:{cutoff}")
+
+    async def _publish(self, key: str, member: str, score: float, message: str) -> None:
+        """写入 Redis 并通知其他进程"""
+        if not self.started:
+            self.start()
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(key, {member: score})
+                pipe.publish(REVOCATION_CHANNEL, message)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"写入 Redis 令牌吊销记录失败: {str(e)}")
+
+    def get_stats(self) -> Dict[str, object]:
+        """获取吊销表统计信息"""
+        return {
+            "backend": "redis" if self.redis is not None else "memory",
+            "tokens": len(self.tokens),
+            "users": len(self.users),
+        }
+
+
+# 全局令牌吊销表
+revocation_list = RevocationList(
+    use_redis=REVOCATION_CONFIG["redis"],
+    sync_interval=REVOCATION_CONFIG["sync_interval"],
+    user_cutoff_ttl=REVOCATION_CONFIG["user_cutoff_ttl"],
+)